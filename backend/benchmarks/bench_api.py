@@ -0,0 +1,370 @@
+"""
+Benchmark the API endpoints and bulk commands at several data sizes.
+
+Seeds a test database with places and thumbnails, topping it up to each
+requested size in turn, and measures every case at each size: latency
+percentiles and throughput over ``--repeat`` timed runs, plus the queries and
+peak Python memory of one untimed run. Results are written as JSON for
+``benchmarks.compare``. Run from the backend directory:
+
+    python -m benchmarks.bench_api --places 1000 100000 1000000
+    python -m benchmarks.bench_api --database postgresql --output pg.json
+
+SQLite runs in memory. PostgreSQL uses the DB_* settings and, like the test
+runner, creates and drops a separate test database.
+"""
+
+import argparse
+import itertools
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import namedtuple
+from datetime import datetime, timezone
+from io import BytesIO, StringIO
+
+import django
+
+SETTINGS = {
+    "sqlite": "django_project.settings_test",
+    "postgresql": "django_project.settings",
+}
+
+# Records in the file timed by the import_places case
+IMPORT_SIZE = 10_000
+
+# Users the seeded places are spread over
+AUTHORS = 100
+
+# Images queued before each run of the process_jobs case
+JOB_BATCH = 20
+
+# name: the case; run(): one timed run; setup(): untimed, before each run;
+# units: records handled per run, for throughput
+Case = namedtuple("Case", ["name", "run", "setup", "units", "unit"])
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--places",
+        type=int,
+        nargs="+",
+        default=[1_000, 100_000],
+        help="Data sizes to measure at, seeded in increasing order.",
+    )
+    parser.add_argument("--database", choices=SETTINGS, default="sqlite")
+    parser.add_argument(
+        "--repeat", type=int, default=20, help="Timed runs per request case."
+    )
+    parser.add_argument(
+        "--command-repeat",
+        type=int,
+        default=1,
+        help="Timed runs per bulk command case.",
+    )
+    parser.add_argument(
+        "--only", nargs="+", help="Only run the cases with these names."
+    )
+    parser.add_argument("--output", help="JSON file to write; printed when omitted.")
+    return parser.parse_args()
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def jpeg_upload(number=0):
+    """Return a JPEG upload; distinct numbers give distinct files."""
+    from django.core.files.uploadedfile import SimpleUploadedFile
+    from PIL import Image
+
+    buffer = BytesIO()
+    color = (number % 256, number // 256 % 256, 128)
+    Image.new("RGB", (1200, 900), color=color).save(buffer, format="JPEG")
+    return SimpleUploadedFile("bench.jpg", buffer.getvalue(), content_type="image/jpeg")
+
+
+def request_cases(context):
+    """Return the cases for the API endpoints."""
+    from django.core.cache import cache
+
+    client, author_client = context["client"], context["author_client"]
+    ids, own_ids = context["ids"], context["own_ids"]
+    rng = random.Random(0)
+
+    def get(url, params=None):
+        def run():
+            response = client.get(url() if callable(url) else url, params)
+            assert response.status_code == 200, response.status_code
+            return response
+
+        return run
+
+    def create():
+        response = author_client.post(
+            "/api/v1/",
+            {
+                "name": "Benchmark place",
+                "subtitle": "Created by the benchmark",
+                "description": "A place created while benchmarking.",
+                "longitude": rng.uniform(-180, 180),
+                "latitude": rng.uniform(-90, 90),
+                "category": "city",
+                "rating": 4.5,
+                "images_files": [jpeg_upload()],
+                "images_captions": ["Benchmark"],
+                "images_thumbnails": ["true"],
+            },
+            format="multipart",
+        )
+        assert response.status_code == 201, response.content
+        return response
+
+    def edit():
+        place_id = rng.choice(own_ids)
+        response = author_client.put(
+            f"/api/v1/{place_id}/",
+            {
+                "name": f"Edited {place_id}",
+                "subtitle": "Edited by the benchmark",
+                "description": "A place edited while benchmarking.",
+                "longitude": rng.uniform(-180, 180),
+                "latitude": rng.uniform(-90, 90),
+                "category": "nature",
+                "rating": 3.5,
+            },
+            format="multipart",
+        )
+        assert response.status_code == 200, response.content
+        return response
+
+    one = (1, "requests")
+    return [
+        Case("geojson", get("/api/v1/geojson/"), cache.clear, *one),
+        Case("geojson_cached", get("/api/v1/geojson/"), None, *one),
+        Case(
+            "geojson_viewport",
+            get("/api/v1/geojson/", {"bbox": "-10,35,30,60", "zoom": 6}),
+            cache.clear,
+            *one,
+        ),
+        Case("list", get("/api/v1/"), None, *one),
+        Case("list_page_200", get("/api/v1/", {"page_size": 200}), None, *one),
+        Case("detail", get(lambda: f"/api/v1/{rng.choice(ids)}/"), None, *one),
+        Case(
+            "nearby",
+            get("/api/v1/nearby/", {"lat": 48.85, "lon": 2.35, "radius_km": 1000}),
+            None,
+            *one,
+        ),
+        Case("top", get("/api/v1/top/", {"limit": 20}), None, *one),
+        Case("search", get("/api/v1/search/", {"q": "har"}), None, *one),
+        Case("create", create, None, *one),
+        Case("edit", edit, None, *one),
+    ]
+
+
+def command_cases(context):
+    """Return the cases for the bulk management commands."""
+    from django.core.management import call_command
+    from posts.jobs import run_pending_jobs
+    from posts.models import Place, PlaceImage
+
+    directory = context["directory"]
+    export_path = os.path.join(directory, "export.ndjson")
+    import_path = os.path.join(directory, "import.csv")
+    with open(import_path, "w") as file:
+        file.write("name,subtitle,longitude,latitude,category,rating\n")
+        for i in range(IMPORT_SIZE):
+            lon, lat = (i * 0.031) % 360 - 180, (i * 0.017) % 180 - 90
+            file.write(f"Imported {i},Imported place,{lon},{lat},city,{i % 11 / 2}\n")
+
+    numbers = itertools.count(1)
+
+    def queue_images():
+        run_pending_jobs()
+        for _ in range(JOB_BATCH):
+            PlaceImage.objects.create(
+                place_id=context["own_ids"][0], image=jpeg_upload(next(numbers))
+            )
+
+    def command(*args):
+        return lambda: call_command(*args, verbosity=0, stdout=StringIO())
+
+    places = Place.objects.count()
+    return [
+        Case(
+            "process_jobs",
+            command("process_jobs", "--once"),
+            queue_images,
+            JOB_BATCH,
+            "jobs",
+        ),
+        Case(
+            "export_places",
+            command("export_places", export_path),
+            None,
+            places,
+            "places",
+        ),
+        Case(
+            "backfill_quadkeys",
+            command("backfill_quadkeys", "--all"),
+            None,
+            places,
+            "places",
+        ),
+        Case(
+            "import_places",
+            command("import_places", import_path),
+            None,
+            IMPORT_SIZE,
+            "places",
+        ),
+    ]
+
+
+def measure(case, repeat):
+    """Run ``case`` once for its queries and memory, then ``repeat`` times timed."""
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from posts.metrics import percentile
+
+    if case.setup:
+        case.setup()
+    tracemalloc.start()
+    with CaptureQueriesContext(connection) as queries:
+        response = case.run()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    # Read now; the captured log is cleared by the next request
+    query_count = len(queries)
+
+    timings = []
+    for _ in range(repeat):
+        if case.setup:
+            case.setup()
+        start = time.perf_counter()
+        case.run()
+        timings.append(time.perf_counter() - start)
+
+    timings.sort()
+    result = {
+        "name": case.name,
+        "runs": repeat,
+        "mean_ms": statistics.fmean(timings) * 1000,
+        "p50_ms": percentile(timings, 0.5) * 1000,
+        "p95_ms": percentile(timings, 0.95) * 1000,
+        "p99_ms": percentile(timings, 0.99) * 1000,
+        "throughput": case.units * repeat / sum(timings),
+        "throughput_unit": f"{case.unit}/s",
+        "queries": query_count,
+        "peak_memory_kb": peak // 1024,
+    }
+    if hasattr(response, "streaming") and not response.streaming:
+        result["response_bytes"] = len(response.content)
+    return result
+
+
+def main():
+    args = parse_args()
+    os.environ["DJANGO_SETTINGS_MODULE"] = SETTINGS[args.database]
+    django.setup()
+
+    from benchmarks.seed import seed_places, seed_users
+    from django.conf import settings
+    from django.db import connection
+    from posts.models import Place
+    from rest_framework.test import APIClient
+
+    # Query logging would grow without bound over a million requests
+    settings.DEBUG = False
+    directory = tempfile.mkdtemp(prefix="map-mates-bench-")
+    settings.MEDIA_ROOT = os.path.join(directory, "media")
+    settings.CHUNKED_UPLOAD_DIR = os.path.join(directory, "uploads")
+
+    database_name = connection.settings_dict["NAME"]
+    connection.creation.create_test_db(verbosity=0)
+    try:
+        authors = seed_users(AUTHORS)
+        author_client = APIClient()
+        author_client.force_authenticate(authors[0])
+        if connection.vendor == "sqlite":
+            version = connection.Database.sqlite_version
+        else:
+            version = str(connection.pg_version)
+        report = {
+            "commit": git_commit(),
+            "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "database": {"vendor": connection.vendor, "version": version},
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "results": [],
+        }
+
+        seeded = 0
+        for size in sorted(args.places):
+            start = time.perf_counter()
+            seed_places(size - seeded, start=seeded, authors=authors)
+            seeded = size
+            print(
+                f"Seeded {size} places in {time.perf_counter() - start:.1f}s",
+                file=sys.stderr,
+            )
+            ids = list(Place.objects.values_list("id", flat=True))
+            own = Place.objects.filter(author=authors[0])
+            context = {
+                "client": APIClient(),
+                "author_client": author_client,
+                "ids": ids,
+                "own_ids": list(own.values_list("id", flat=True)),
+                "directory": directory,
+            }
+
+            for kind, repeat in [
+                (request_cases, args.repeat),
+                (command_cases, args.command_repeat),
+            ]:
+                for case in kind(context):
+                    if args.only and case.name not in args.only:
+                        continue
+                    result = {"places": size, **measure(case, repeat)}
+                    report["results"].append(result)
+                    print(
+                        f"{size:>9} {case.name:<18} p50 {result['p50_ms']:9.1f} ms"
+                        f"  {result['throughput']:10.1f} {result['throughput_unit']}",
+                        file=sys.stderr,
+                    )
+            # Imports add to the data; later sizes are topped up from the count
+            seeded = Place.objects.count()
+    finally:
+        connection.creation.destroy_test_db(database_name, verbosity=0)
+        shutil.rmtree(directory, ignore_errors=True)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
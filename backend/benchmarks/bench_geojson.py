@@ -0,0 +1,73 @@
+"""
+Benchmark the GeoJSON fast path against PlaceGeoJSONSerializer.
+
+Seeds an in-memory SQLite database and times rendering the full collection
+both ways. Run from the backend directory:
+
+    python -m benchmarks.bench_geojson --places 10000 --repeat 5
+"""
+
+import argparse
+import os
+import statistics
+import time
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "django_project.settings_test")
+django.setup()
+
+from benchmarks.seed import seed_places  # noqa: E402
+from django.db import connection  # noqa: E402
+from posts.geojson import encode_feature_collection, iter_features  # noqa: E402
+from posts.models import Place  # noqa: E402
+from posts.serializers import PlaceGeoJSONSerializer  # noqa: E402
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+from rest_framework.request import Request  # noqa: E402
+from rest_framework.test import APIRequestFactory  # noqa: E402
+
+
+def serializer_path(queryset, request):
+    serializer = PlaceGeoJSONSerializer(
+        queryset, many=True, context={"request": request}
+    )
+    return JSONRenderer().render(
+        {"type": "FeatureCollection", "features": serializer.data}
+    )
+
+
+def fast_path(queryset, request):
+    return encode_feature_collection(iter_features(queryset, request))
+
+
+def timed(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        content = func()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings), content
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--places", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    connection.creation.create_test_db(verbosity=0)
+    seed_places(args.places)
+    request = Request(APIRequestFactory().get("/api/v1/geojson/"))
+    queryset = Place.objects.with_thumbnail().order_by("-rating")
+
+    baseline, expected = timed(lambda: serializer_path(queryset, request), args.repeat)
+    fast, content = timed(lambda: fast_path(queryset, request), args.repeat)
+
+    assert content == expected, "fast path output differs from the serializer"
+    print(f"places:     {args.places}")
+    print(f"serializer: {baseline * 1000:.1f} ms")
+    print(f"fast path:  {fast * 1000:.1f} ms ({baseline / fast:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
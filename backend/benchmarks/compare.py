@@ -0,0 +1,62 @@
+"""
+Compare two benchmark results files written by ``benchmarks.bench_api``.
+
+Cases are matched by name and data size. A case whose median latency or
+query count grew by more than the threshold is reported as a regression,
+and the exit status is 1 when there is any:
+
+    python -m benchmarks.compare before.json after.json --threshold 0.1
+"""
+
+import argparse
+import json
+import sys
+
+
+def load(path):
+    with open(path) as file:
+        report = json.load(file)
+    return report, {(r["name"], r["places"]): r for r in report["results"]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("before")
+    parser.add_argument("after")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="Relative growth in median latency reported as a regression.",
+    )
+    args = parser.parse_args()
+
+    before_report, before = load(args.before)
+    after_report, after = load(args.after)
+    print(f"before: {before_report['commit']} ({before_report['database']['vendor']})")
+    print(f"after:  {after_report['commit']} ({after_report['database']['vendor']})")
+    print(
+        f"{'case':<18} {'places':>9} {'p50 before':>11} {'p50 after':>11} {'change':>8}"
+    )
+
+    regressions = 0
+    for key in sorted(before.keys() & after.keys(), key=lambda key: (key[1], key[0])):
+        old, new = before[key], after[key]
+        change = new["p50_ms"] / old["p50_ms"] - 1 if old["p50_ms"] else 0.0
+        flags = []
+        if change > args.threshold:
+            flags.append("slower")
+        if new["queries"] > old["queries"]:
+            flags.append(f"queries {old['queries']} -> {new['queries']}")
+        regressions += bool(flags)
+        print(
+            f"{key[0]:<18} {key[1]:>9} {old['p50_ms']:>9.1f}ms {new['p50_ms']:>9.1f}ms"
+            f" {change:>+8.1%} {', '.join(flags)}"
+        )
+
+    print(f"{regressions} regression(s).")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
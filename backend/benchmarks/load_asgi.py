@@ -0,0 +1,239 @@
+"""
+Load test the async read endpoints under ASGI against the sync ones under WSGI.
+
+Both paths run in this process against the same seeded in-memory database,
+without a network in between. Every simulated client makes ``--requests``
+GETs one after the other and reads each response slowly, ``--read-delay``
+per body chunk, as a client on a slow connection would:
+
+- wsgi: the DRF endpoint under the WSGI handler, on a pool of ``--threads``
+  threads, as a threaded WSGI server such as gunicorn's gthread worker
+  serves it; a thread is held until its client has read the whole response.
+- asgi: the async endpoint under the ASGI handler, every client a task on
+  one event loop; a request waiting on its client holds no thread.
+
+Reports throughput and the most requests in flight at once for each:
+
+    python -m benchmarks.load_asgi --endpoint nearby --clients 200
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+
+import django
+
+# endpoint: (sync path, async path, query parameters); detail takes an id
+ENDPOINTS = {
+    "geojson": ("/api/v1/geojson/", "/api/v1/async/geojson/", {"zoom": 4}),
+    "detail": ("/api/v1/{id}/", "/api/v1/async/{id}/", {}),
+    "nearby": (
+        "/api/v1/nearby/",
+        "/api/v1/async/nearby/",
+        {"lat": 48.85, "lon": 2.35, "radius_km": 1000},
+    ),
+    "top": ("/api/v1/top/", "/api/v1/async/top/", {"limit": 20}),
+}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--endpoint", choices=ENDPOINTS, default="nearby")
+    parser.add_argument("--places", type=int, default=10_000)
+    parser.add_argument("--clients", type=int, default=100)
+    parser.add_argument(
+        "--requests", type=int, default=5, help="Requests made by each client."
+    )
+    parser.add_argument(
+        "--threads", type=int, default=8, help="Threads of the WSGI server."
+    )
+    parser.add_argument(
+        "--read-delay",
+        type=float,
+        default=0.05,
+        help="Seconds each client takes to read a response chunk.",
+    )
+    return parser.parse_args()
+
+
+class InFlight:
+    """Counts the requests in progress and remembers the peak."""
+
+    def __init__(self):
+        self.current = self.peak = 0
+        self.lock = threading.Lock()
+
+    def __enter__(self):
+        with self.lock:
+            self.current += 1
+            self.peak = max(self.peak, self.current)
+
+    def __exit__(self, *exc_info):
+        with self.lock:
+            self.current -= 1
+
+
+def summarize(name, requests, elapsed, in_flight):
+    return {
+        "server": name,
+        "requests": requests,
+        "seconds": round(elapsed, 3),
+        "requests_per_second": round(requests / elapsed, 1),
+        "peak_in_flight": in_flight.peak,
+    }
+
+
+def run_wsgi(paths, args):
+    from django.core.wsgi import get_wsgi_application
+
+    application = get_wsgi_application()
+    in_flight = InFlight()
+
+    def request(path):
+        path, _, query = path.partition("?")
+        environ = {
+            "REQUEST_METHOD": "GET",
+            "PATH_INFO": path,
+            "QUERY_STRING": query,
+            "SERVER_NAME": "testserver",
+            "SERVER_PORT": "80",
+            "SERVER_PROTOCOL": "HTTP/1.1",
+            "wsgi.url_scheme": "http",
+            "wsgi.input": sys.stdin.buffer,
+            "wsgi.errors": sys.stderr,
+        }
+        statuses = []
+        with in_flight:
+            body = application(environ, lambda status, headers: statuses.append(status))
+            try:
+                for _ in body:
+                    time.sleep(args.read_delay)
+            finally:
+                body.close()
+        assert statuses[0].startswith("200"), statuses[0]
+
+    def client(client_paths):
+        for path in client_paths:
+            request(path)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        list(pool.map(client, paths))
+    requests = sum(map(len, paths))
+    return summarize("wsgi", requests, time.perf_counter() - start, in_flight)
+
+
+def run_asgi(paths, args):
+    from django.core.asgi import get_asgi_application
+
+    application = get_asgi_application()
+    in_flight = InFlight()
+
+    async def request(path):
+        path, _, query = path.partition("?")
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "root_path": "",
+            "query_string": query.encode(),
+            "headers": [(b"host", b"testserver")],
+            "server": ("testserver", 80),
+            "client": ("127.0.0.1", 0),
+        }
+        received = asyncio.Event()
+        statuses = []
+
+        async def receive():
+            if received.is_set():
+                # The client stays connected until the response is done
+                await asyncio.Future()
+            received.set()
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                statuses.append(message["status"])
+            elif message["type"] == "http.response.body":
+                await asyncio.sleep(args.read_delay)
+
+        with in_flight:
+            await application(scope, receive, send)
+        assert statuses[0] == 200, statuses[0]
+
+    async def client(client_paths):
+        for path in client_paths:
+            await request(path)
+
+    async def main():
+        await asyncio.gather(*(client(client_paths) for client_paths in paths))
+
+    start = time.perf_counter()
+    asyncio.run(main())
+    requests = sum(map(len, paths))
+    return summarize("asgi", requests, time.perf_counter() - start, in_flight)
+
+
+def client_paths(path, params, ids, args, client):
+    """Return the paths requested by one client."""
+    paths = []
+    for number in range(args.requests):
+        place_id = ids[(client * args.requests + number) % len(ids)]
+        query = urlencode(params)
+        paths.append(path.format(id=place_id) + (f"?{query}" if query else ""))
+    return paths
+
+
+def main():
+    args = parse_args()
+    os.environ["DJANGO_SETTINGS_MODULE"] = "django_project.settings_test"
+    django.setup()
+
+    from benchmarks.seed import seed_places
+    from django.conf import settings
+    from django.db import connection
+    from posts.models import Place
+
+    settings.DEBUG = False
+    database_name = connection.settings_dict["NAME"]
+    connection.creation.create_test_db(verbosity=0)
+    try:
+        seed_places(args.places)
+        ids = list(Place.objects.values_list("id", flat=True))
+        sync_path, async_path, params = ENDPOINTS[args.endpoint]
+        results = []
+        for run, path in [(run_wsgi, sync_path), (run_asgi, async_path)]:
+            paths = [
+                client_paths(path, params, ids, args, client)
+                for client in range(args.clients)
+            ]
+            result = run(paths, args)
+            results.append(result)
+            print(
+                f"{result['server']}: {result['requests_per_second']:8.1f} req/s"
+                f"  peak in flight {result['peak_in_flight']}",
+                file=sys.stderr,
+            )
+    finally:
+        connection.creation.destroy_test_db(database_name, verbosity=0)
+
+    print(
+        json.dumps(
+            {"endpoint": args.endpoint, "clients": args.clients, "results": results},
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Synthetic data for the benchmarks.
+
+Rows are bulk created in batches, so seeding a million places keeps memory
+flat. Values are derived from the row number, so every run seeds the same
+data.
+"""
+
+from django.contrib.auth import get_user_model
+from posts.models import Place, PlaceImage
+
+CATEGORIES = ("nature", "city", "other")
+
+# Steps of the R2 sequence, which fills the plane without clumping
+LONGITUDE_STEP = 0.7548776662466927
+LATITUDE_STEP = 0.5698402909980532
+
+WORDS = ("lake", "forest", "harbour", "castle", "market", "trail", "bridge", "summit")
+
+
+def seed_users(count):
+    """Create ``count`` users, who cannot log in with a password."""
+    User = get_user_model()
+    return User.objects.bulk_create(
+        User(username=f"bench{i}", email=f"bench{i}@example.com", password="!")
+        for i in range(count)
+    )
+
+
+def seed_places(count, start=0, authors=(), batch_size=10_000):
+    """
+    Create ``count`` places numbered from ``start``, each with a thumbnail.
+
+    Places are spread evenly over the globe by a low-discrepancy sequence,
+    and over ``authors`` in turn.
+    """
+    for offset in range(start, start + count, batch_size):
+        places = [
+            Place(
+                name=f"{WORDS[i % len(WORDS)].title()} {i}",
+                subtitle=f"A {WORDS[i * 7 % len(WORDS)]} worth the visit",
+                description=f"Description of place {i}, near the {WORDS[i % 5]}.",
+                longitude=(i * LONGITUDE_STEP) % 1 * 360 - 180,
+                latitude=(i * LATITUDE_STEP) % 1 * 170 - 85,
+                category=CATEGORIES[i % len(CATEGORIES)],
+                rating=(i % 11) * 0.5,
+                author=authors[i % len(authors)] if authors else None,
+            )
+            for i in range(offset, min(offset + batch_size, start + count))
+        ]
+        for place in places:
+            place.set_quadkey()
+        places = Place.objects.bulk_create(places)
+        PlaceImage.objects.bulk_create(
+            PlaceImage(
+                place=place,
+                image=f"place_pics/{place.id}/t.jpg",
+                is_thumbnail=True,
+                status=PlaceImage.READY,
+            )
+            for place in places
+        )
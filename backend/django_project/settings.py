@@ -11,9 +11,12 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 import os
+import tempfile
 from datetime import timedelta
+from importlib.util import find_spec
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -63,6 +66,11 @@ MIDDLEWARE = [
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
+# Per-view query count and latency metrics, served at /api/debug/metrics
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "false").lower() == "true"
+if METRICS_ENABLED:
+    MIDDLEWARE.insert(0, "posts.middleware.MetricsMiddleware")
+
 ROOT_URLCONF = "django_project.urls"
 
 TEMPLATES = [
@@ -86,16 +94,85 @@ WSGI_APPLICATION = "django_project.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    "default": {
+# Connections are kept open for DB_CONN_MAX_AGE seconds and checked before
+# reuse. DB_POOL=true uses Django's connection pool instead, which needs
+# psycopg 3 ("psycopg[pool]") and suits ASGI, where persistent connections
+# are not reused; DB_POOL_MIN_SIZE and DB_POOL_MAX_SIZE are per process and
+# per database. DB_REPLICA_HOSTS lists read replicas, comma separated, as
+# host or host:port; GET requests to the posts views read from them.
+
+DB_PORT = os.getenv("DB_PORT", "5432")
+DB_POOL = os.getenv("DB_POOL", "false").lower() == "true"
+DB_CONN_HEALTH_CHECKS = os.getenv("DB_CONN_HEALTH_CHECKS", "true").lower() == "true"
+
+if DB_POOL and not (find_spec("psycopg") and find_spec("psycopg_pool")):
+    raise ImproperlyConfigured(
+        'DB_POOL=true needs psycopg 3 with its pool: pip install "psycopg[pool]"'
+    )
+
+
+def database_settings(host, port):
+    options = {}
+    if DB_POOL:
+        options["pool"] = {
+            "min_size": int(os.getenv("DB_POOL_MIN_SIZE", "2")),
+            "max_size": int(os.getenv("DB_POOL_MAX_SIZE", "10")),
+            "timeout": float(os.getenv("DB_POOL_TIMEOUT", "10")),
+        }
+    return {
         "ENGINE": "django.db.backends.postgresql",
         "NAME": os.getenv("DB_NAME"),
         "USER": os.getenv("DB_USER"),
         "PASSWORD": os.getenv("DB_PASSWORD"),
-        "HOST": os.getenv("DB_HOST", "localhost"),
-        "PORT": os.getenv("DB_PORT", "5432"),
+        "HOST": host,
+        "PORT": port,
+        # Pooled connections go back to the pool at the end of each request
+        "CONN_MAX_AGE": 0 if DB_POOL else int(os.getenv("DB_CONN_MAX_AGE", "60")),
+        "CONN_HEALTH_CHECKS": DB_CONN_HEALTH_CHECKS,
+        "OPTIONS": options,
+    }
+
+
+DATABASES = {"default": database_settings(os.getenv("DB_HOST", "localhost"), DB_PORT)}
+
+DATABASE_REPLICAS = []
+for number, address in enumerate(os.getenv("DB_REPLICA_HOSTS", "").split(","), 1):
+    if not address.strip():
+        continue
+    host, _, port = address.strip().partition(":")
+    alias = f"replica{number}"
+    DATABASES[alias] = {
+        **database_settings(host, port or DB_PORT),
+        "TEST": {"MIRROR": "default"},
+    }
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ["posts.routers.ReplicaRouter"]
+if DATABASE_REPLICAS:
+    # First, so that reads made by the other middleware are routed too
+    MIDDLEWARE.insert(0, "posts.middleware.ReplicaReadsMiddleware")
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# The places version, cached map data and leaderboards must be shared by
+# every process serving requests and running commands, so the default is
+# a file-based cache, shared by the processes of one host. Point
+# CACHE_BACKEND and CACHE_LOCATION at a database, Redis or Memcached cache
+# when serving from several hosts. The posts app refuses to start with a
+# per-process backend unless REQUIRE_SHARED_CACHE is off, as in tests.
+
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv(
+            "CACHE_BACKEND", "django.core.cache.backends.filebased.FileBasedCache"
+        ),
+        "LOCATION": os.getenv(
+            "CACHE_LOCATION", os.path.join(tempfile.gettempdir(), "map-mates-cache")
+        ),
     }
 }
+REQUIRE_SHARED_CACHE = True
 
 
 # Password validation
@@ -136,11 +213,21 @@ STATIC_URL = "static/"
 
 MEDIA_URL = "/media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
-# This is default but will be changed when using s3. I made it explicit here:
-DEFAULT_FILE_STORAGE = "django.core.files.storage.FileSystemStorage"
+# This is default but will be changed when using s3. I made it explicit here.
+# Place images are content addressed, so duplicate uploads are stored once.
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+    "place_images": {"BACKEND": "posts.storage.ContentAddressedStorage"},
+}
 
 MAX_IMAGE_UPLOAD_SIZE = 5 * 1024 * 1024
 
+# Partial files of resumable uploads, kept outside MEDIA_ROOT until finished
+CHUNKED_UPLOAD_DIR = os.getenv(
+    "CHUNKED_UPLOAD_DIR", os.path.join(tempfile.gettempdir(), "map-mates-uploads")
+)
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
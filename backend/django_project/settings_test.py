@@ -1,11 +1,31 @@
+import tempfile
+
 from .settings import *  # noqa: F403,F401
 
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": ":memory:",
+    },
+    # A separate database standing in for a replica that lags the primary;
+    # tests opt in with DATABASE_REPLICAS and fill it with stale rows
+    "lagging": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": ":memory:",
+    },
+}
+DATABASE_REPLICAS = []
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "map-mates",
     }
 }
+REQUIRE_SHARED_CACHE = False
+
+# Files saved by tests never land in the project's media directory
+MEDIA_ROOT = tempfile.mkdtemp(prefix="map-mates-test-media-")
 
 
 class DisableMigrations:
@@ -8,6 +8,7 @@ from drf_spectacular.views import (
     SpectacularRedocView,
     SpectacularSwaggerView,
 )
+from posts.views import MetricsView
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 
 urlpatterns = [
@@ -19,6 +20,7 @@ urlpatterns = [
     path("api/token/refresh/", TokenRefreshView.as_view(), name="refresh"),
     path("api/v1/users/", include("accounts.urls")),
     path("api-auth/", include("rest_framework.urls")),
+    path("api/debug/metrics", MetricsView.as_view(), name="metrics"),
     # Dynamic API Schema and Docuemntation Routes
     path("api/schema/", SpectacularAPIView.as_view(), name="schema"),
     path(
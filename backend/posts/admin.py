@@ -1,6 +1,7 @@
 from django.contrib import admin
 
-from .models import Place, PlaceImage
+from .models import Job, Place, PlaceImage
 
 admin.site.register(Place)
 admin.site.register(PlaceImage)
+admin.site.register(Job)
@@ -1,4 +1,5 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class PostsConfig(AppConfig):
@@ -7,3 +8,9 @@ class PostsConfig(AppConfig):
 
     def ready(self):
         import posts.signals  # noqa: F401
+        import posts.tasks  # noqa: F401
+        from posts.caching import require_shared_cache
+        from posts.search import install_search_index
+
+        require_shared_cache()
+        post_migrate.connect(install_search_index, sender=self)
@@ -0,0 +1,211 @@
+"""
+Async-native versions of the read-heavy endpoints, served under ``async/``.
+
+DRF views are synchronous, so under ASGI each request to them holds a thread
+from start to finish. These are plain Django async views that reuse the
+parameter parsing and querysets of their DRF counterparts, but read the
+cache and the database through the async APIs and never block the event
+loop. A process served by an ASGI server keeps many more of them in flight
+than it has threads, which pays off when requests wait on slow clients, the
+cache or the network rather than on the database itself:
+
+    uvicorn django_project.asgi:application --workers 4
+
+Responses are byte for byte those of the synchronous endpoints, with the
+same ETag and Last-Modified validators. Only GET is served; writes stay on
+the DRF views.
+"""
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+from django.views import View
+from rest_framework.exceptions import APIException, AuthenticationFailed, NotFound
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from .caching import (
+    CACHE_TIMEOUT,
+    aget_places_modified,
+    aget_places_version,
+    aversioned_key,
+)
+from .geojson import alist_features, encode_feature_collection
+from .leaderboard import atop_place_ids
+from .mixins import places_etag
+from .models import Place
+from .nearby import anearest_features
+from .routers import use_replicas
+from .views import NearbyPlacesView, PlaceDetailView, PlaceGeoJSONView, TopPlacesView
+
+_renderer = JSONRenderer()
+
+
+def json_response(content, status=200):
+    """Return an ``application/json`` response of already encoded ``content``."""
+    return HttpResponse(content, status=status, content_type="application/json")
+
+
+async def authenticate(request):
+    """
+    Return the user of the request's JWT, or None when it carries none.
+
+    Tokens are checked exactly as by JWTAuthentication, but the user is
+    loaded with the async ORM.
+
+    Raises:
+        AuthenticationFailed: For an invalid token or an unknown or inactive
+            user, as JWTAuthentication would.
+    """
+    authentication = JWTAuthentication()
+    header = authentication.get_header(request)
+    if header is None:
+        return None
+    raw_token = authentication.get_raw_token(header)
+    if raw_token is None:
+        return None
+    token = authentication.get_validated_token(raw_token)
+
+    try:
+        user_id = token[jwt_settings.USER_ID_CLAIM]
+    except KeyError:
+        raise InvalidToken("Token contained no recognizable user identification")
+    users = get_user_model().objects.filter(**{jwt_settings.USER_ID_FIELD: user_id})
+    user = await users.afirst()
+    if user is None:
+        raise AuthenticationFailed("User not found", code="user_not_found")
+    if not user.is_active:
+        raise AuthenticationFailed("User is inactive", code="user_inactive")
+    return user
+
+
+class AsyncReadView(View):
+    """
+    Base for async GET views backed by the DRF view ``drf_view_class``.
+
+    Subclasses implement ``render``, which returns the response to a GET
+    that the validators did not answer. DRF exceptions raised while parsing
+    parameters are rendered as DRF's exception handler would.
+    """
+
+    drf_view_class = None
+    # Set on views whose output depends on the requesting user (is_owner)
+    etag_per_user = False
+
+    def get_drf_view(self, request, user=None, **kwargs):
+        """Return an instance of ``drf_view_class`` set up for ``request``."""
+        drf_request = Request(request)
+        drf_request.user = user or AnonymousUser()
+        return self.drf_view_class(
+            request=drf_request, args=(), kwargs=kwargs, format_kwarg=None
+        )
+
+    async def render(self, request, view):
+        raise NotImplementedError
+
+    async def get(self, request, *args, **kwargs):
+        try:
+            user = await authenticate(request) if self.etag_per_user else None
+            view = self.get_drf_view(request, user, **kwargs)
+            version = await aget_places_version()
+            last_modified = await aget_places_modified()
+            extra = [user.pk if user else None] if self.etag_per_user else []
+            etag = places_etag(version, request, *extra)
+
+            response = get_conditional_response(
+                request, etag=etag, last_modified=last_modified
+            )
+            if response is None:
+                # Validated by the places version, so read from the primary;
+                # see ConditionalGetMixin
+                with use_replicas(False):
+                    response = await self.render(request, view)
+        except APIException as exc:
+            detail = exc.detail
+            if not isinstance(detail, (list, dict)):
+                detail = {"detail": detail}
+            return json_response(_renderer.render(detail), status=exc.status_code)
+
+        if response.status_code in (200, 304):
+            response.headers.setdefault("ETag", etag)
+            if last_modified:
+                response.headers.setdefault("Last-Modified", http_date(last_modified))
+        if self.etag_per_user:
+            patch_vary_headers(response, ["Authorization"])
+        return response
+
+
+class AsyncPlaceGeoJSONView(AsyncReadView):
+    """
+    Async ``PlaceGeoJSONView``, sharing its cache entries.
+
+    Clusters are read through ``sync_to_async``; ``stream`` is not supported.
+    """
+
+    drf_view_class = PlaceGeoJSONView
+
+    async def render(self, request, view):
+        key = await aversioned_key(
+            "geojson",
+            request.get_host(),
+            [request.GET.get(param) for param in view.cache_params],
+        )
+        content = await cache.aget(key)
+        if content is None:
+            if request.GET.get("cluster") == "true":
+                features = await sync_to_async(view.get_features)()
+            else:
+                features = await alist_features(view.get_queryset(), request)
+            content = encode_feature_collection(features)
+            await cache.aset(key, content, timeout=CACHE_TIMEOUT)
+        return json_response(content)
+
+
+class AsyncPlaceDetailView(AsyncReadView):
+    """Async ``PlaceDetailView``, for reads only."""
+
+    drf_view_class = PlaceDetailView
+    etag_per_user = True
+
+    async def render(self, request, view):
+        try:
+            place = await view.get_queryset().aget(pk=view.kwargs["pk"])
+        except Place.DoesNotExist:
+            raise NotFound("No Place matches the given query.")
+        return json_response(_renderer.render(view.get_serializer(place).data))
+
+
+class AsyncNearbyPlacesView(AsyncReadView):
+    """Async ``NearbyPlacesView``."""
+
+    drf_view_class = NearbyPlacesView
+
+    async def render(self, request, view):
+        features = await anearest_features(
+            view.get_queryset(), request, *view.get_params()
+        )
+        return json_response(encode_feature_collection(features))
+
+
+class AsyncTopPlacesView(AsyncReadView):
+    """Async ``TopPlacesView``."""
+
+    drf_view_class = TopPlacesView
+
+    async def render(self, request, view):
+        ids = await atop_place_ids(*view.get_params())
+        queryset = view.get_queryset().filter(id__in=ids)
+        features = {
+            feature["id"]: feature
+            for feature in await alist_features(queryset, request)
+        }
+        return json_response(
+            encode_feature_collection([features[pk] for pk in ids if pk in features])
+        )
@@ -0,0 +1,114 @@
+"""
+Versioned caching for the map endpoints.
+
+Every cache key built here is tagged with a global "places version" counter.
+Signals bump the counter when a change to a Place or PlaceImage commits, which makes
+all previously cached entries unreachable at once; stale entries then age
+out through the backend's own expiry and culling. Only the portable cache API
+is used, so any backend works, but it must be shared by every process that
+serves requests or writes places; see ``require_shared_cache``. The ``a``
+prefixed functions are the async equivalents, for the async views.
+"""
+
+import hashlib
+import secrets
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+
+PLACES_VERSION_KEY = "posts:places_version"
+PLACES_MODIFIED_KEY = "posts:places_modified"
+
+# Versioned entries never go stale, this only bounds how long unused ones live
+CACHE_TIMEOUT = 60 * 60 * 24
+
+# Backends whose entries are private to one process
+PER_PROCESS_BACKENDS = ("django.core.cache.backends.locmem.LocMemCache",)
+
+
+def require_shared_cache():
+    """
+    Refuse to run on a cache that each process keeps to itself.
+
+    Versions bumped by one worker or management command would never reach
+    the others, which would keep serving stale map data and 304s until
+    CACHE_TIMEOUT. Skipped when the REQUIRE_SHARED_CACHE setting is off.
+    """
+    if not getattr(settings, "REQUIRE_SHARED_CACHE", True):
+        return
+    backend = settings.CACHES["default"]["BACKEND"]
+    if backend in PER_PROCESS_BACKENDS:
+        raise ImproperlyConfigured(
+            f"The default cache backend {backend} is not shared between "
+            "processes, so places changes would not invalidate cached map data "
+            "in other workers. Set CACHE_BACKEND to a shared backend."
+        )
+
+
+def get_places_version():
+    version = cache.get(PLACES_VERSION_KEY)
+    if version is None:
+        # Seeded from the clock so a counter lost to eviction or a restart
+        # cannot come back at a value that older entries are tagged with
+        if cache.add(PLACES_VERSION_KEY, time.time_ns(), timeout=None):
+            # Nothing is known about earlier changes, so assume they just happened
+            cache.set(PLACES_MODIFIED_KEY, int(time.time()), timeout=None)
+        version = cache.get(PLACES_VERSION_KEY, time.time_ns())
+    return version
+
+
+async def aget_places_version():
+    version = await cache.aget(PLACES_VERSION_KEY)
+    if version is None:
+        # Seeding is rare and must stay atomic, so it is left to the sync path
+        version = await sync_to_async(get_places_version)()
+    return version
+
+
+def get_places_modified():
+    """Return when places last changed as a Unix timestamp, or None."""
+    return cache.get(PLACES_MODIFIED_KEY)
+
+
+async def aget_places_modified():
+    return await cache.aget(PLACES_MODIFIED_KEY)
+
+
+def bump_places_version(using=None):
+    """
+    Make every versioned entry unreachable once the current transaction commits.
+
+    Bumping before the commit would let a read racing the transaction cache
+    the old rows under the new version, and hand out its ETag, until the
+    next change. Outside a transaction the bump is immediate.
+    """
+    transaction.on_commit(_bump_places_version, using=using)
+
+
+def _bump_places_version():
+    # A fresh random version rather than an increment: incr is a read then a
+    # write on some backends, so two processes bumping at once could land on
+    # the same value, and entries cached between their commits would survive
+    cache.set(PLACES_VERSION_KEY, secrets.randbits(63), timeout=None)
+    cache.set(PLACES_MODIFIED_KEY, int(time.time()), timeout=None)
+
+
+def versioned_key(name, *parts):
+    """
+    Build a cache key for ``name`` tagged with the current places version.
+
+    Parts are hashed, so they may hold arbitrary query parameter values.
+    """
+    return f"posts:{name}:{get_places_version()}:{_digest(parts)}"
+
+
+async def aversioned_key(name, *parts):
+    return f"posts:{name}:{await aget_places_version()}:{_digest(parts)}"
+
+
+def _digest(parts):
+    return hashlib.md5(repr(parts).encode()).hexdigest()
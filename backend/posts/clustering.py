@@ -0,0 +1,285 @@
+"""
+Server-side point clustering for the low zoom levels of the map.
+
+Places are bucketed into a Web Mercator grid at MAX_CLUSTER_ZOOM, and each
+coarser zoom merges the four child cells of the level below. Every non-empty
+cell of every level is stored as a PlaceCluster row, precomputed off the
+request path by the ``update_clusters`` and ``rebuild_clusters`` jobs, so a
+clustered request only reads the rows of its zoom inside its viewport.
+
+Saving or deleting a place queues ``update_clusters`` for the leaf cells it
+left and entered; the job recomputes those leaves from their places and each
+of their ancestors from its four children. Bulk writes send no signals, so
+code using them must queue ``rebuild_clusters``, which recomputes every cell
+in one pass. Until the table has been filled, ``update_clusters`` runs a
+full rebuild instead, and ``get_clusters`` queues one and clusters the places
+directly, so a database from before the table never serves partial counts.
+Both jobs bump the places version, so cached responses built from the
+previous clusters are dropped once the new ones commit.
+"""
+
+from django.db.models import Q
+
+from .caching import bump_places_version
+from .geo import bbox_contains, bbox_filter, mercator, tile_bbox
+from .jobs import enqueue
+from .models import Job, Place, PlaceCluster
+
+# Zoom levels above this are served as individual places
+MAX_CLUSTER_ZOOM = 14
+
+# Grid cells per tile edge; 4 gives 128px cells on 512px Mapbox tiles
+CELLS_PER_TILE = 4
+
+# The cells of zoom z are the tiles of zoom z + 2
+CELL_TILE_OFFSET = CELLS_PER_TILE.bit_length() - 1
+
+CATEGORIES = [None] + [value for value, _ in Place._meta.get_field("category").choices]
+
+PLACE_FIELDS = ["id", "name", "longitude", "latitude", "rating", "category"]
+
+CLUSTER_FIELDS = ["point_count", "longitude", "latitude"]
+CLUSTER_FIELDS += ["top_place_id", "top_name", "top_rating"]
+
+UNIQUE_FIELDS = ["category", "zoom", "x", "y"]
+
+BATCH_SIZE = 1000
+
+
+def cell_key(longitude, latitude):
+    """Return the (x, y) leaf cell, at MAX_CLUSTER_ZOOM, holding the point."""
+    size = 2**MAX_CLUSTER_ZOOM * CELLS_PER_TILE
+    x, y = mercator(longitude, latitude)
+    return min(int(x * size), size - 1), min(int(y * size), size - 1)
+
+
+def _top(place_id, name, rating):
+    # Ranked by rating, then lowest id; unrated places rank last
+    return (float(rating) if rating is not None else -1.0, -place_id, name)
+
+
+def _merge(cell, other):
+    """Merge ``other`` into ``cell``; cells are [count, lon_sum, lat_sum, top]."""
+    cell[0] += other[0]
+    cell[1] += other[1]
+    cell[2] += other[2]
+    if other[3] > cell[3]:
+        cell[3] = other[3]
+
+
+def _add_place(cells, place_id, name, longitude, latitude, rating):
+    key = cell_key(longitude, latitude)
+    point = [1, longitude, latitude, _top(place_id, name, rating)]
+    if key in cells:
+        _merge(cells[key], point)
+    else:
+        cells[key] = point
+
+
+def _parents(cells):
+    parents = {}
+    for (x, y), cell in cells.items():
+        parent_key = (x >> 1, y >> 1)
+        if parent_key in parents:
+            _merge(parents[parent_key], cell)
+        else:
+            parents[parent_key] = list(cell)
+    return parents
+
+
+def _to_row(category, zoom, key, cell):
+    count, lon_sum, lat_sum, (rating, neg_id, name) = cell
+    return PlaceCluster(
+        category=category,
+        zoom=zoom,
+        x=key[0],
+        y=key[1],
+        point_count=count,
+        longitude=lon_sum / count,
+        latitude=lat_sum / count,
+        top_place_id=-neg_id,
+        top_name=name,
+        top_rating=rating if rating >= 0 else None,
+    )
+
+
+def _from_row(row):
+    count = row.point_count
+    rating = float(row.top_rating) if row.top_rating is not None else -1.0
+    return [
+        count,
+        row.longitude * count,
+        row.latitude * count,
+        (rating, -row.top_place_id, row.top_name),
+    ]
+
+
+def _to_feature(row):
+    return {
+        "type": "Feature",
+        "id": f"{row.zoom}/{row.x}/{row.y}",
+        "geometry": {
+            "type": "Point",
+            "coordinates": [row.longitude, row.latitude],
+        },
+        "properties": {
+            "cluster": True,
+            "point_count": row.point_count,
+            "top_place": {
+                "id": row.top_place_id,
+                "name": row.top_name,
+                "rating": (
+                    float(row.top_rating) if row.top_rating is not None else None
+                ),
+            },
+        },
+    }
+
+
+def _cells_filter(keys):
+    q = Q()
+    for x, y in keys:
+        q |= Q(x=x, y=y)
+    return q
+
+
+def _write_level(category, zoom, keys, cells):
+    """Store ``cells`` and delete the rows of the ``keys`` left empty."""
+    PlaceCluster.objects.bulk_create(
+        [_to_row(category, zoom, key, cells[key]) for key in keys if key in cells],
+        update_conflicts=True,
+        unique_fields=UNIQUE_FIELDS,
+        update_fields=CLUSTER_FIELDS,
+    )
+    empty = [key for key in keys if key not in cells]
+    if empty:
+        PlaceCluster.objects.filter(
+            _cells_filter(empty), category=category, zoom=zoom
+        ).delete()
+
+
+def _leaf_cells(category, keys):
+    """Recompute the leaf cells ``keys`` of ``category`` from their places."""
+    # Each cell's tile, padded so rounding cannot lose a place on its edge;
+    # cell_key then keeps exactly the places of the cell
+    q = Q()
+    for x, y in keys:
+        q |= bbox_filter(
+            tile_bbox(MAX_CLUSTER_ZOOM + CELL_TILE_OFFSET, x, y, buffer=0.01)
+        )
+    places = Place.objects.filter(q)
+    if category:
+        places = places.filter(category=category)
+
+    cells = {}
+    for place_id, name, longitude, latitude, rating, _ in places.values_list(
+        *PLACE_FIELDS
+    ):
+        if cell_key(longitude, latitude) in keys:
+            _add_place(cells, place_id, name, longitude, latitude, rating)
+    return cells
+
+
+def update_clusters(cells, categories=()):
+    """
+    Recompute the leaf ``cells`` and all their ancestors.
+
+    Args:
+        cells: (x, y) leaf cells whose places changed.
+        categories: Categories of the changed places; the clusters of all
+            categories together are always updated.
+    """
+    if not PlaceCluster.objects.exists():
+        # Never built: ancestors would be summed from missing siblings
+        rebuild_clusters()
+        return
+
+    keys = {tuple(key) for key in cells}
+    for category in {"", *categories}:
+        level = keys
+        children = _leaf_cells(category, level)
+        _write_level(category, MAX_CLUSTER_ZOOM, level, children)
+        for zoom in range(MAX_CLUSTER_ZOOM - 1, -1, -1):
+            level = {(x >> 1, y >> 1) for x, y in level}
+            rows = PlaceCluster.objects.filter(
+                _cells_filter(
+                    (2 * x + dx, 2 * y + dy)
+                    for x, y in level
+                    for dx in (0, 1)
+                    for dy in (0, 1)
+                ),
+                category=category,
+                zoom=zoom + 1,
+            )
+            children = _parents({(row.x, row.y): _from_row(row) for row in rows})
+            _write_level(category, zoom, level, children)
+    bump_places_version()
+
+
+def rebuild_clusters():
+    """Recompute every cluster from all places in one pass."""
+    leaves = {category or "": {} for category in CATEGORIES}
+    places = Place.objects.values_list(*PLACE_FIELDS)
+    for place_id, name, longitude, latitude, rating, category in places.iterator():
+        for cells in (leaves[""], leaves[category]):
+            _add_place(cells, place_id, name, longitude, latitude, rating)
+
+    PlaceCluster.objects.all().delete()
+    for category, cells in leaves.items():
+        for zoom in range(MAX_CLUSTER_ZOOM, -1, -1):
+            PlaceCluster.objects.bulk_create(
+                (_to_row(category, zoom, key, cell) for key, cell in cells.items()),
+                batch_size=BATCH_SIZE,
+            )
+            cells = _parents(cells)
+    bump_places_version()
+
+
+def _is_built():
+    return PlaceCluster.objects.exists() or not Place.objects.exists()
+
+
+def _queue_rebuild():
+    pending = Job.objects.filter(name="rebuild_clusters", status=Job.PENDING)
+    if not pending.exists():
+        enqueue("rebuild_clusters")
+
+
+def _computed_rows(zoom, category):
+    """Cluster the places of ``category`` at ``zoom`` without the table."""
+    places = Place.objects.values_list(*PLACE_FIELDS)
+    if category:
+        places = places.filter(category=category)
+    cells = {}
+    for place_id, name, longitude, latitude, rating, _ in places.iterator():
+        _add_place(cells, place_id, name, longitude, latitude, rating)
+    for _ in range(MAX_CLUSTER_ZOOM - zoom):
+        cells = _parents(cells)
+    return [_to_row(category or "", zoom, key, cells[key]) for key in sorted(cells)]
+
+
+def get_clusters(zoom, category=None, bbox=None):
+    """
+    Return the precomputed cluster features for ``zoom``.
+
+    Args:
+        zoom (float): Map zoom level, floored and capped at MAX_CLUSTER_ZOOM.
+        category (str): Optional category to cluster on its own.
+        bbox (BBox): Optional viewport; clusters are kept by centroid.
+    """
+    if category not in CATEGORIES:
+        return []
+
+    zoom = min(int(zoom), MAX_CLUSTER_ZOOM)
+    clusters = PlaceCluster.objects.filter(category=category or "", zoom=zoom)
+    if bbox:
+        clusters = clusters.filter(bbox_filter(bbox))
+    rows = list(clusters.order_by("x", "y"))
+    if not rows and not _is_built():
+        _queue_rebuild()
+        rows = _computed_rows(zoom, category)
+        if bbox:
+            rows = [
+                row for row in rows if bbox_contains(bbox, row.longitude, row.latitude)
+            ]
+    return [_to_feature(row) for row in rows]
@@ -0,0 +1,258 @@
+"""
+Geographic helpers shared by the map endpoints.
+
+Coordinates follow the GeoJSON convention used throughout the API:
+longitude first, then latitude, both in WGS84 degrees.
+"""
+
+import math
+from collections import namedtuple
+
+from django.db.models import Q
+
+MIN_ZOOM = 0
+MAX_ZOOM = 24
+
+# Web Mercator is undefined at the poles
+MAX_MERCATOR_LATITUDE = 85.05112878
+
+# Zoom of the Web Mercator tile a place's quadkey identifies; about 2.4m
+# across at the equator
+QUADKEY_ZOOM = 24
+
+# Most tiles a bbox is covered with when translated into quadkey ranges
+MAX_COVER_TILES = 16
+
+EARTH_RADIUS_KM = 6371.0088
+
+# Number of features returned at zoom 0. Each zoom level shows a quarter of
+# the area of the previous one, so the cap grows by 4x per level.
+FEATURES_AT_ZOOM_0 = 500
+
+BBox = namedtuple("BBox", ["min_lon", "min_lat", "max_lon", "max_lat"])
+
+
+def parse_bbox(value):
+    """
+    Parse a ``minLon,minLat,maxLon,maxLat`` query parameter into a BBox.
+
+    A bbox whose minLon is greater than its maxLon crosses the antimeridian
+    and is kept as-is; ``bbox_filter`` handles the wrap.
+
+    Raises:
+        ValueError: If the value is malformed or out of range.
+    """
+    parts = value.split(",")
+    if len(parts) != 4:
+        raise ValueError("bbox must be minLon,minLat,maxLon,maxLat.")
+    try:
+        bbox = BBox(*(float(part) for part in parts))
+    except ValueError:
+        raise ValueError("bbox values must be numbers.")
+
+    if not (-180 <= bbox.min_lon <= 180 and -180 <= bbox.max_lon <= 180):
+        raise ValueError("bbox longitudes must be between -180 and 180.")
+    if not (-90 <= bbox.min_lat <= 90 and -90 <= bbox.max_lat <= 90):
+        raise ValueError("bbox latitudes must be between -90 and 90.")
+    if bbox.min_lat > bbox.max_lat:
+        raise ValueError("bbox minLat must not exceed maxLat.")
+    return bbox
+
+
+def parse_zoom(value):
+    """
+    Parse a ``zoom`` query parameter into a float.
+
+    Raises:
+        ValueError: If the value is not a number within the Mapbox zoom range.
+    """
+    try:
+        zoom = float(value)
+    except ValueError:
+        raise ValueError("zoom must be a number.")
+    if not MIN_ZOOM <= zoom <= MAX_ZOOM:
+        raise ValueError(f"zoom must be between {MIN_ZOOM} and {MAX_ZOOM}.")
+    return zoom
+
+
+def bbox_filter(bbox):
+    """
+    Return a Q object matching places inside ``bbox``.
+
+    Both branches are plain range lookups, so the database can answer them
+    from the composite latitude/longitude indexes on Place.
+    """
+    latitude = Q(latitude__gte=bbox.min_lat, latitude__lte=bbox.max_lat)
+    if bbox.min_lon <= bbox.max_lon:
+        longitude = Q(longitude__gte=bbox.min_lon, longitude__lte=bbox.max_lon)
+    else:
+        # Crosses the antimeridian: split into [minLon, 180] and [-180, maxLon]
+        longitude = Q(longitude__gte=bbox.min_lon) | Q(longitude__lte=bbox.max_lon)
+    return latitude & longitude
+
+
+def bbox_contains(bbox, longitude, latitude):
+    """Return whether the point lies inside ``bbox``, honouring the wrap."""
+    if not bbox.min_lat <= latitude <= bbox.max_lat:
+        return False
+    if bbox.min_lon <= bbox.max_lon:
+        return bbox.min_lon <= longitude <= bbox.max_lon
+    return longitude >= bbox.min_lon or longitude <= bbox.max_lon
+
+
+def mercator(longitude, latitude):
+    """Project WGS84 degrees onto the unit Web Mercator square."""
+    latitude = max(-MAX_MERCATOR_LATITUDE, min(MAX_MERCATOR_LATITUDE, latitude))
+    x = (longitude + 180) / 360
+    sin_lat = math.sin(math.radians(latitude))
+    y = 0.5 - math.log((1 + sin_lat) / (1 - sin_lat)) / (4 * math.pi)
+    return x, y
+
+
+def tile_bbox(z, x, y, buffer=0.0):
+    """
+    Return the BBox covered by tile ``z/x/y``.
+
+    Args:
+        buffer (float): Extra margin as a fraction of the tile size, so
+            points just outside the tile can still be drawn across its edge.
+    """
+    n = 2**z
+
+    def longitude(tile_x):
+        return max(-180.0, min(180.0, tile_x / n * 360 - 180))
+
+    def latitude(tile_y):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * tile_y / n))))
+
+    # The edge rows of the grid also own the polar caps Mercator cannot show
+    max_lat = 90.0 if y == 0 else latitude(y - buffer)
+    min_lat = -90.0 if y == n - 1 else latitude(y + 1 + buffer)
+    return BBox(longitude(x - buffer), min_lat, longitude(x + 1 + buffer), max_lat)
+
+
+def _spread_bits(value):
+    """Move bit i of a 24 bit ``value`` to bit 2i."""
+    value = (value | value << 16) & 0x0000FFFF0000FFFF
+    value = (value | value << 8) & 0x00FF00FF00FF00FF
+    value = (value | value << 4) & 0x0F0F0F0F0F0F0F0F
+    value = (value | value << 2) & 0x3333333333333333
+    value = (value | value << 1) & 0x5555555555555555
+    return value
+
+
+def _tile(longitude, latitude, zoom):
+    n = 2**zoom
+    x, y = mercator(longitude, latitude)
+    return min(int(x * n), n - 1), min(int(y * n), n - 1)
+
+
+def tile_quadkey(z, x, y):
+    """Return the quadkey of tile ``z/x/y`` as an integer of ``z`` base 4 digits."""
+    return _spread_bits(x) | _spread_bits(y) << 1
+
+
+def quadkey(longitude, latitude):
+    """
+    Return the integer quadkey of the QUADKEY_ZOOM tile holding the point.
+
+    Each base 4 digit picks a quadrant, so every tile at a coarser zoom owns
+    one contiguous range of quadkeys; see ``tile_range``.
+    """
+    return tile_quadkey(QUADKEY_ZOOM, *_tile(longitude, latitude, QUADKEY_ZOOM))
+
+
+def tile_range(z, x, y):
+    """Return the ``[start, end)`` quadkeys of places inside tile ``z/x/y``."""
+    shift = 2 * (QUADKEY_ZOOM - z)
+    start = tile_quadkey(z, x, y) << shift
+    return start, start + (1 << shift)
+
+
+def quadkey_ranges(bbox, max_tiles=MAX_COVER_TILES):
+    """
+    Return sorted, merged ``[start, end)`` quadkey ranges covering ``bbox``.
+
+    The bbox is covered with tiles of the finest zoom that needs at most
+    ``max_tiles`` of them, and the tiles' ranges are merged where they touch.
+    The cover may overshoot the bbox, so results still need ``bbox_filter``.
+    """
+    if bbox.min_lon > bbox.max_lon:
+        # Crosses the antimeridian: cover both halves
+        boxes = [
+            BBox(bbox.min_lon, bbox.min_lat, 180, bbox.max_lat),
+            BBox(-180, bbox.min_lat, bbox.max_lon, bbox.max_lat),
+        ]
+    else:
+        boxes = [bbox]
+
+    ranges = []
+    for box in boxes:
+        for zoom in range(QUADKEY_ZOOM, -1, -1):
+            min_x, min_y = _tile(box.min_lon, box.max_lat, zoom)
+            max_x, max_y = _tile(box.max_lon, box.min_lat, zoom)
+            if (max_x - min_x + 1) * (max_y - min_y + 1) <= max_tiles:
+                break
+        ranges.extend(
+            tile_range(zoom, x, y)
+            for x in range(min_x, max_x + 1)
+            for y in range(min_y, max_y + 1)
+        )
+
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return [tuple(quadkey_range) for quadkey_range in merged]
+
+
+def quadkey_filter(bbox):
+    """
+    Return a Q object narrowing places to the quadkey ranges covering ``bbox``.
+
+    Each range is a lookup on the Place.quadkey index. The ranges overshoot
+    the bbox, so combine this with ``bbox_filter`` for exact results. Places
+    saved before the column was backfilled have no quadkey and always match.
+
+    On SQLite the planner prefers the composite longitude/latitude index for
+    viewport sized boxes whatever the quadkey ranges, so the map endpoints
+    use ``bbox_filter`` alone. The nearby search narrows its candidates with
+    the ranges before its distance test; see ``posts.nearby``.
+    """
+    q = Q(quadkey__isnull=True)
+    for start, end in quadkey_ranges(bbox):
+        q |= Q(quadkey__gte=start, quadkey__lt=end)
+    return q
+
+
+def radius_bbox(longitude, latitude, radius_km):
+    """
+    Return a BBox enclosing the circle of ``radius_km`` around the point.
+
+    The box spans every longitude when the circle reaches a pole, and wraps
+    the antimeridian like any other BBox when it crosses it.
+    """
+    delta_lat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    min_lat, max_lat = latitude - delta_lat, latitude + delta_lat
+    if min_lat <= -90 or max_lat >= 90:
+        return BBox(-180, max(min_lat, -90), 180, min(max_lat, 90))
+
+    # Widest at the latitude of the circle's edge nearest the pole
+    widest = math.radians(max(abs(min_lat), abs(max_lat)))
+    delta_lon = math.degrees(radius_km / (EARTH_RADIUS_KM * math.cos(widest)))
+    if delta_lon >= 180:
+        return BBox(-180, min_lat, 180, max_lat)
+
+    def wrap(lon):
+        return (lon + 180) % 360 - 180
+
+    return BBox(
+        wrap(longitude - delta_lon), min_lat, wrap(longitude + delta_lon), max_lat
+    )
+
+
+def max_features_for_zoom(zoom):
+    """Return how many of the top-rated features to send at ``zoom``."""
+    return int(FEATURES_AT_ZOOM_0 * 4**zoom)
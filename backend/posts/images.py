@@ -0,0 +1,102 @@
+"""
+Derivative image pipeline for PlaceImage uploads.
+
+Each upload is resized into a fixed set of variants, each saved as JPEG and
+WebP next to the original. EXIF orientation is applied to the pixels and no
+metadata is copied into the derivatives. The work runs in the background
+``process_place_image`` job rather than in the upload request.
+"""
+
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+# Variant name -> (max width, max height, crop to exactly that size)
+VARIANTS = {
+    "thumb": (320, 320, True),
+    "card": (800, 600, False),
+    "full": (1600, 1600, False),
+}
+
+# Format name -> (Pillow format, file extension, save options)
+FORMATS = {
+    "jpeg": ("JPEG", "jpg", {"quality": 82, "optimize": True, "progressive": True}),
+    "webp": ("WEBP", "webp", {"quality": 80, "method": 4}),
+}
+
+# Errors meaning the upload itself is unusable, so retrying cannot help
+UNREADABLE_IMAGE_ERRORS = (UnidentifiedImageError, Image.DecompressionBombError)
+
+
+def variant_path(name, variant, extension):
+    """Return the storage path for a derivative of the image at ``name``."""
+    directory, filename = os.path.split(name)
+    stem = os.path.splitext(filename)[0]
+    return os.path.join(directory, "variants", f"{stem}_{variant}.{extension}")
+
+
+def _load(file):
+    image = Image.open(file)
+    # Let the JPEG decoder downscale while reading; far cheaper than a resize
+    largest = max(max(width, height) for width, height, _ in VARIANTS.values())
+    image.draft("RGB", (largest, largest))
+    image = ImageOps.exif_transpose(image)
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+    return image
+
+
+def _resize(image, width, height, crop):
+    if crop:
+        return ImageOps.fit(image, (width, height), Image.Resampling.LANCZOS)
+    resized = image.copy()
+    resized.thumbnail((width, height), Image.Resampling.LANCZOS)
+    return resized
+
+
+def _encode(image, pillow_format, options):
+    if pillow_format == "JPEG" and image.mode == "RGBA":
+        background = Image.new("RGB", image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel("A"))
+        image = background
+    buffer = BytesIO()
+    # No exif or icc_profile is passed, so the derivative carries no metadata
+    image.save(buffer, pillow_format, **options)
+    return buffer.getvalue()
+
+
+def generate_variants(place_image):
+    """
+    Create every derivative of ``place_image`` in its storage.
+
+    Returns:
+        dict: ``{variant: {format: storage name}}``, to be recorded on
+        ``place_image.variants``.
+
+    Raises:
+        One of UNREADABLE_IMAGE_ERRORS when the original is not a usable image.
+    """
+    storage = place_image.image.storage
+    with place_image.image.open("rb") as file:
+        image = _load(file)
+
+    variants = {}
+    for variant, (width, height, crop) in VARIANTS.items():
+        resized = _resize(image, width, height, crop)
+        variants[variant] = {}
+        for format_name, (pillow_format, extension, options) in FORMATS.items():
+            name = variant_path(place_image.image.name, variant, extension)
+            content = ContentFile(_encode(resized, pillow_format, options))
+            variants[variant][format_name] = storage.save(name, content)
+    return variants
+
+
+def variant_names(name):
+    """Return the storage names every derivative of ``name`` would have."""
+    return [
+        variant_path(name, variant, extension)
+        for variant in VARIANTS
+        for _, extension, _ in FORMATS.values()
+    ]
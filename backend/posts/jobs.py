@@ -0,0 +1,137 @@
+"""
+Database-backed background job queue.
+
+Jobs are rows of ``posts.models.Job``, so queueing one is part of the
+caller's transaction and a job for a rolled back request never runs. Handlers
+are registered by name with ``@task`` and run by ``manage.py process_jobs``.
+Claiming a job is a conditional UPDATE, which lets several workers share the
+queue on SQLite and PostgreSQL alike. Successful jobs are deleted; failures
+are retried with exponential backoff and kept once they run out of attempts.
+"""
+
+import logging
+import traceback
+from collections import namedtuple
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+# Seconds before the first retry, doubled for every further attempt
+RETRY_DELAY = 10
+
+# Running jobs not finished within this many seconds are assumed to belong
+# to a worker that died, and are handed out again
+JOB_TIMEOUT = 10 * 60
+
+Task = namedtuple("Task", ["func", "max_attempts", "on_failure"])
+
+TASKS = {}
+
+
+def task(name, max_attempts=3, on_failure=None):
+    """
+    Register the decorated function as the handler for jobs called ``name``.
+
+    The handler is called with the job payload as keyword arguments, inside a
+    transaction. Any exception it raises counts as a failed attempt.
+
+    Args:
+        max_attempts (int): Attempts before the job is marked failed.
+        on_failure: Called with the payload once the last attempt has failed.
+    """
+
+    def register(func):
+        TASKS[name] = Task(func, max_attempts, on_failure)
+        return func
+
+    return register
+
+
+def enqueue(name, /, **payload):
+    """Queue the task ``name`` to run with ``payload``, which must be JSON."""
+    return Job.objects.create(
+        name=name, payload=payload, max_attempts=TASKS[name].max_attempts
+    )
+
+
+def enqueue_many(name, payloads):
+    """Queue the task ``name`` once for each payload, in a single query."""
+    max_attempts = TASKS[name].max_attempts
+    return Job.objects.bulk_create(
+        Job(name=name, payload=payload, max_attempts=max_attempts)
+        for payload in payloads
+    )
+
+
+def _claimable(now):
+    stale = now - timedelta(seconds=JOB_TIMEOUT)
+    return Q(status=Job.PENDING, run_at__lte=now) | Q(
+        status=Job.RUNNING, updated_at__lt=stale
+    )
+
+
+def claim_next_job():
+    """Mark the next due job as running and return it, or None."""
+    now = timezone.now()
+    candidates = (
+        Job.objects.filter(_claimable(now))
+        .order_by("run_at", "id")
+        .values_list("id", flat=True)
+    )
+    for job_id in candidates[:10]:
+        # Only one worker's update can match, the others move on
+        claimed = Job.objects.filter(_claimable(now), id=job_id).update(
+            status=Job.RUNNING, attempts=F("attempts") + 1, updated_at=now
+        )
+        if claimed:
+            return Job.objects.get(id=job_id)
+    return None
+
+
+def run_job(job):
+    """Run a claimed job, returning whether it succeeded."""
+    registered = TASKS.get(job.name)
+    try:
+        if registered is None:
+            raise LookupError(f"No task is registered as {job.name!r}.")
+        with transaction.atomic():
+            registered.func(**job.payload)
+    except Exception:
+        logger.exception("Job %s failed on attempt %d", job, job.attempts)
+        job.last_error = traceback.format_exc()
+        if registered is not None and job.attempts < job.max_attempts:
+            job.status = Job.PENDING
+            delay = RETRY_DELAY * 2 ** (job.attempts - 1)
+            job.run_at = timezone.now() + timedelta(seconds=delay)
+        else:
+            job.status = Job.FAILED
+            if registered is not None and registered.on_failure:
+                registered.on_failure(**job.payload)
+        job.save(update_fields=["status", "run_at", "last_error", "updated_at"])
+        return False
+
+    job.delete()
+    return True
+
+
+def run_pending_jobs(limit=None):
+    """
+    Run due jobs until none are left or ``limit`` have run.
+
+    Returns:
+        int: The number of jobs run, successful or not.
+    """
+    count = 0
+    while limit is None or count < limit:
+        job = claim_next_job()
+        if job is None:
+            break
+        run_job(job)
+        count += 1
+    return count
@@ -0,0 +1,143 @@
+"""
+Per-category "top places" leaderboards.
+
+Each board is a cached list of the (rating, id) pairs of the LEADERBOARD_SIZE
+best rated places in one category, best first; ties go to the newer place.
+A board is built on first read by one query walking the (category, rating,
+id) index, then maintained incrementally by the Place signals once the
+write commits: a save moves or inserts one entry and a delete removes one,
+with no query at all. A full
+board that loses an entry cannot know which place should take its slot, so
+it is dropped and rebuilt on the next read. The leaderboard across all
+categories is merged from the category boards.
+
+Boards are read from the primary, as a replica lagging behind a signal
+would cache a board missing that update. Bulk writes send no signals, so
+code using them must call ``reset_leaderboards``. Boards expire after
+CACHE_TIMEOUT, which also bounds the life of an update lost to two writers
+racing on the same board.
+"""
+
+import heapq
+from bisect import insort
+from itertools import islice
+
+from django.core.cache import cache
+
+from .caching import CACHE_TIMEOUT
+from .models import Place
+from .routers import use_replicas
+
+# Entries kept per category; the most a single request may ask for
+LEADERBOARD_SIZE = 200
+
+CATEGORIES = [value for value, _ in Place._meta.get_field("category").choices]
+
+
+def _cache_key(category):
+    return f"posts:top:{category}"
+
+
+def _rank(entry):
+    rating, pk = entry
+    return (-rating, -pk)
+
+
+def _board_query(category):
+    places = Place.objects.filter(category=category, rating__isnull=False)
+    places = places.order_by("-rating", "-id")
+    return places.values_list("rating", "id")[:LEADERBOARD_SIZE]
+
+
+def _merge(boards, limit):
+    ranked = heapq.merge(*boards, key=_rank)
+    return [pk for _, pk in islice(ranked, limit)]
+
+
+def build_leaderboard(category):
+    """Rebuild and cache the board for ``category`` from the primary database."""
+    with use_replicas(False):
+        entries = list(_board_query(category))
+    cache.set(_cache_key(category), entries, timeout=CACHE_TIMEOUT)
+    return entries
+
+
+def top_place_ids(category=None, limit=LEADERBOARD_SIZE):
+    """
+    Return the ids of the best rated places, best first.
+
+    Args:
+        category (str): Only rank places in this category; all when None.
+        limit (int): Most ids to return, up to LEADERBOARD_SIZE.
+    """
+    categories = [category] if category else CATEGORIES
+    boards = cache.get_many([_cache_key(name) for name in categories])
+    entries = []
+    for name in categories:
+        board = boards.get(_cache_key(name))
+        entries.append(build_leaderboard(name) if board is None else board)
+    return _merge(entries, limit)
+
+
+async def atop_place_ids(category=None, limit=LEADERBOARD_SIZE):
+    """``top_place_ids`` on the async ORM and cache APIs."""
+    categories = [category] if category else CATEGORIES
+    boards = await cache.aget_many([_cache_key(name) for name in categories])
+    entries = []
+    for name in categories:
+        board = boards.get(_cache_key(name))
+        if board is None:
+            with use_replicas(False):
+                board = [entry async for entry in _board_query(name)]
+            await cache.aset(_cache_key(name), board, timeout=CACHE_TIMEOUT)
+        entries.append(board)
+    return _merge(entries, limit)
+
+
+def update_leaderboards(place_id, category=None, rating=None):
+    """
+    Move ``place_id`` to its place on the cached boards.
+
+    Args:
+        category (str): The place's category, or None once it is deleted.
+        rating: The place's rating; unrated places are on no board.
+    """
+    if rating is not None:
+        rating = Place._meta.get_field("rating").to_python(rating)
+    keys = {name: _cache_key(name) for name in CATEGORIES}
+    boards = cache.get_many(keys.values())
+    updated, dropped = {}, []
+
+    for name, key in keys.items():
+        entries = boards.get(key)
+        if entries is None:
+            continue
+        kept = [entry for entry in entries if entry[1] != place_id]
+        was_full = len(entries) >= LEADERBOARD_SIZE
+        removed = len(kept) < len(entries)
+
+        if name == category and rating is not None:
+            entry = (rating, place_id)
+            # A full board only ranks places above its last entry
+            if not was_full or (kept and _rank(entry) < _rank(kept[-1])):
+                insort(kept, entry, key=_rank)
+                del kept[LEADERBOARD_SIZE:]
+            elif removed:
+                dropped.append(key)
+                continue
+        elif removed and was_full:
+            dropped.append(key)
+            continue
+
+        if kept != entries:
+            updated[key] = kept
+
+    if updated:
+        cache.set_many(updated, timeout=CACHE_TIMEOUT)
+    if dropped:
+        cache.delete_many(dropped)
+
+
+def reset_leaderboards():
+    """Drop every board, to be rebuilt on the next read."""
+    cache.delete_many([_cache_key(name) for name in CATEGORIES])
@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand
+from posts.geo import quadkey
+from posts.models import Place
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill in Place.quadkey for places saved before the column existed. "
+        "Safe to run repeatedly and while the site is live."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=2000,
+            help="Places updated per query.",
+        )
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Recompute every quadkey, not only missing ones.",
+        )
+
+    def handle(self, *args, **options):
+        places = Place.objects.order_by("id")
+        if not options["all"]:
+            places = places.filter(quadkey__isnull=True)
+
+        updated = 0
+        last_id = 0
+        while True:
+            # Keyset batches keep memory flat and never rescan finished rows
+            batch = list(
+                places.filter(id__gt=last_id).values_list(
+                    "id", "longitude", "latitude"
+                )[: options["batch_size"]]
+            )
+            if not batch:
+                break
+            Place.objects.bulk_update(
+                [
+                    Place(id=place_id, quadkey=quadkey(longitude, latitude))
+                    for place_id, longitude, latitude in batch
+                ],
+                ["quadkey"],
+            )
+            updated += len(batch)
+            last_id = batch[-1][0]
+            if options["verbosity"] >= 2:
+                self.stdout.write(f"Backfilled {updated} places...")
+
+        self.stdout.write(self.style.SUCCESS(f"Backfilled {updated} places."))
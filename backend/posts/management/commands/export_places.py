@@ -0,0 +1,91 @@
+import sys
+from io import TextIOWrapper
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+from django.http import HttpRequest
+from posts.geojson import iter_features
+from posts.models import Place
+from posts.transfer import CSV_FIELDS, FORMATS, detect_format, write_csv, write_features
+
+
+class BaseURLRequest(HttpRequest):
+    """Request stand-in for building absolute thumbnail URLs outside a request"""
+
+    def __init__(self, base_url):
+        super().__init__()
+        url = urlsplit(base_url)
+        self._scheme = url.scheme or "http"
+        self.META["HTTP_HOST"] = url.netloc
+
+    def _get_scheme(self):
+        return self._scheme
+
+
+class Command(BaseCommand):
+    help = (
+        "Export every place as GeoJSON, NDJSON or CSV. Places are streamed from "
+        "the database in batches, so memory use stays flat."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="File to write, or - for standard output.")
+        parser.add_argument(
+            "--format",
+            choices=FORMATS,
+            help="File format; taken from the file extension by default.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=2000,
+            help="Places fetched from the database per round trip.",
+        )
+        parser.add_argument(
+            "--base-url",
+            default="http://localhost:8000",
+            help="Scheme and host that thumbnail URLs are built with.",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        try:
+            file_format = options["format"] or detect_format(path)
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        self.verbosity = options["verbosity"]
+        self.batch_size = options["batch_size"]
+        # Progress must not end up in the export when it goes to stdout
+        self.progress = self.stderr if path == "-" else self.stdout
+        self.exported = 0
+
+        if path == "-":
+            self.export(sys.stdout.buffer, file_format, options["base_url"])
+            sys.stdout.buffer.flush()
+        else:
+            with open(path, "wb") as output:
+                self.export(output, file_format, options["base_url"])
+            self.stdout.write(self.style.SUCCESS(f"Exported {self.exported} places."))
+
+    def export(self, output, file_format, base_url):
+        if file_format == "csv":
+            rows = Place.objects.order_by("id").values_list(*CSV_FIELDS)
+            text = TextIOWrapper(output, encoding="utf-8", newline="")
+            write_csv(self.count(rows.iterator(chunk_size=self.batch_size)), text)
+            # Flush without closing the underlying stream
+            text.detach()
+            return
+
+        queryset = Place.objects.with_thumbnail().order_by("id")
+        features = iter_features(
+            queryset, BaseURLRequest(base_url), chunk_size=self.batch_size
+        )
+        write_features(self.count(features), output, file_format)
+
+    def count(self, records):
+        for record in records:
+            yield record
+            self.exported += 1
+            if self.verbosity >= 1 and self.exported % self.batch_size == 0:
+                self.progress.write(f"Exported {self.exported} places...")
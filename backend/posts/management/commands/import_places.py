@@ -0,0 +1,124 @@
+import sys
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from posts.caching import bump_places_version
+from posts.jobs import enqueue
+from posts.leaderboard import reset_leaderboards
+from posts.models import Place, PlaceChange
+from posts.transfer import FORMATS, detect_format, read_records
+
+
+class Command(BaseCommand):
+    help = (
+        "Import places from a GeoJSON, NDJSON or CSV file. Records are read one "
+        "at a time, validated, and inserted in batches."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="File to read, or - for standard input.")
+        parser.add_argument(
+            "--format",
+            choices=FORMATS,
+            help="File format; taken from the file extension by default.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Places validated and inserted per transaction.",
+        )
+        parser.add_argument(
+            "--author", help="Username to set as author of every place."
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        try:
+            file_format = options["format"] or detect_format(path)
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        author = None
+        if options["author"]:
+            User = get_user_model()
+            try:
+                author = User.objects.get(username=options["author"])
+            except User.DoesNotExist:
+                raise CommandError(f"User {options['author']!r} does not exist.")
+
+        self.verbosity = options["verbosity"]
+        self.imported = self.skipped = 0
+        if path == "-":
+            self.import_file(sys.stdin, file_format, author, options["batch_size"])
+        else:
+            with open(path, encoding="utf-8", newline="") as file:
+                self.import_file(file, file_format, author, options["batch_size"])
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {self.imported} places, skipped {self.skipped}."
+            )
+        )
+
+    def import_file(self, file, file_format, author, batch_size):
+        records, to_fields = read_records(file, file_format)
+        batch = []
+        error = None
+        try:
+            for number, record in enumerate(records, start=1):
+                place = self.build_place(number, record, to_fields, author)
+                if place is None:
+                    continue
+                batch.append(place)
+                if len(batch) >= batch_size:
+                    self.save_batch(batch)
+                    batch = []
+        except ValueError as e:
+            # The file itself is malformed; keep what was read before it
+            error = e
+
+        if batch:
+            self.save_batch(batch)
+        if self.imported:
+            bump_places_version()
+            reset_leaderboards()
+            enqueue("rebuild_clusters")
+        if error:
+            raise CommandError(f"{error} Imported {self.imported} places before it.")
+
+    def build_place(self, number, record, to_fields, author):
+        """Return a validated, unsaved Place, or None if the record is invalid."""
+        try:
+            place = Place(author=author, **to_fields(record))
+            # Author may be empty; the description is absent from GeoJSON
+            place.clean_fields(exclude=["author", "description"])
+            place.set_quadkey()
+        except ValidationError as e:
+            errors = "; ".join(
+                f"{field}: {' '.join(messages)}"
+                for field, messages in e.message_dict.items()
+            )
+            self.report_skipped(number, errors)
+            return None
+        except (KeyError, TypeError, ValueError) as e:
+            self.report_skipped(number, f"malformed record ({e!r})")
+            return None
+        return place
+
+    def report_skipped(self, number, reason):
+        self.skipped += 1
+        self.stderr.write(f"Record {number} skipped: {reason}")
+
+    def save_batch(self, batch):
+        # bulk_create sends no signals, so log the changes for delta sync here
+        with transaction.atomic():
+            places = Place.objects.bulk_create(batch)
+            PlaceChange.objects.bulk_create(
+                PlaceChange(place_id=place.pk) for place in places
+            )
+        self.imported += len(places)
+        if self.verbosity >= 1:
+            self.stdout.write(f"Imported {self.imported} places...")
@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+from posts.jobs import run_pending_jobs
+
+
+class Command(BaseCommand):
+    help = "Run queued background jobs such as image processing and file deletion."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Run the jobs that are due now, then exit.",
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=1.0,
+            help="Seconds to wait before polling an empty queue again.",
+        )
+
+    def handle(self, *args, **options):
+        if options["once"]:
+            count = run_pending_jobs()
+            self.stdout.write(f"Ran {count} job(s).")
+            return
+
+        self.stdout.write("Waiting for jobs. Press Ctrl+C to stop.")
+        try:
+            while True:
+                if not run_pending_jobs():
+                    time.sleep(options["sleep"])
+        except KeyboardInterrupt:
+            self.stdout.write("Stopped.")
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from posts.clustering import rebuild_clusters
+from posts.models import PlaceCluster
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute every precomputed map cluster from the places. Run once to "
+        "fill the table; afterwards the Place signals keep it current."
+    )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            rebuild_clusters()
+        count = PlaceCluster.objects.count()
+        self.stdout.write(self.style.SUCCESS(f"Stored {count} clusters."))
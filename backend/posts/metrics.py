@@ -0,0 +1,158 @@
+"""
+Per-view request metrics, recorded by the opt-in MetricsMiddleware.
+
+Samples live in process memory: for each view and method, running totals
+plus a rolling window of the last WINDOW_SIZE samples of each measurement,
+from which percentiles are computed when read. Every worker process keeps
+and reports its own numbers.
+"""
+
+import math
+import threading
+from collections import deque
+
+from rest_framework.renderers import BaseRenderer
+
+# Samples kept per view, method and measurement for percentiles
+WINDOW_SIZE = 1000
+
+PERCENTILES = (0.5, 0.95, 0.99)
+
+PROMETHEUS_PREFIX = "mapmates_"
+
+# Measurement -> (Prometheus name, help text, factor to the Prometheus unit)
+MEASUREMENTS = {
+    "duration_ms": (
+        "request_duration_seconds",
+        "Time to build the response.",
+        0.001,
+    ),
+    "db_ms": (
+        "request_db_duration_seconds",
+        "Time spent in database queries.",
+        0.001,
+    ),
+    "serialize_ms": (
+        "request_serialize_duration_seconds",
+        "Time spent in the view and rendering, outside database queries.",
+        0.001,
+    ),
+    "queries": (
+        "request_db_queries",
+        "Database queries run by the request.",
+        1,
+    ),
+    "response_bytes": (
+        "response_size_bytes",
+        "Size of the response body; not recorded for streamed responses.",
+        1,
+    ),
+}
+
+
+def percentile(values, fraction):
+    """Return the nearest-rank percentile of sorted ``values``."""
+    return values[max(0, math.ceil(fraction * len(values)) - 1)]
+
+
+class Series:
+    """Running totals and a rolling window of one measurement."""
+
+    def __init__(self):
+        self.count = 0
+        self.sum = 0
+        self.window = deque(maxlen=WINDOW_SIZE)
+
+    def add(self, value):
+        self.count += 1
+        self.sum += value
+        self.window.append(value)
+
+    def summary(self):
+        values = sorted(self.window)
+        summary = {"count": self.count, "sum": self.sum}
+        for fraction in PERCENTILES:
+            summary[f"p{round(fraction * 100)}"] = percentile(values, fraction)
+        return summary
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def record(self, view, method, sample):
+        """
+        Add one request's measurements.
+
+        Args:
+            sample (dict): Values keyed by MEASUREMENTS names; missing ones
+                are not recorded.
+        """
+        with self._lock:
+            series = self._series.setdefault(
+                (view, method), {name: Series() for name in MEASUREMENTS}
+            )
+            for name, value in sample.items():
+                series[name].add(value)
+
+    def snapshot(self):
+        """Return the summaries of every view and method seen, sorted."""
+        with self._lock:
+            return [
+                {
+                    "view": view,
+                    "method": method,
+                    **{
+                        name: values.summary()
+                        for name, values in series.items()
+                        if values.count
+                    },
+                }
+                for (view, method), series in sorted(self._series.items())
+            ]
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+
+registry = MetricsRegistry()
+
+
+def _label(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def render_prometheus(snapshot):
+    """Render a registry snapshot as Prometheus summaries in text format."""
+    lines = []
+    for name, (metric, help_text, factor) in MEASUREMENTS.items():
+        metric = PROMETHEUS_PREFIX + metric
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} summary")
+        for entry in snapshot:
+            if name not in entry:
+                continue
+            summary = entry[name]
+            labels = f'view="{_label(entry["view"])}",method="{entry["method"]}"'
+            for fraction in PERCENTILES:
+                value = summary[f"p{round(fraction * 100)}"] * factor
+                lines.append(f'{metric}{{{labels},quantile="{fraction}"}} {value:g}')
+            lines.append(f"{metric}_sum{{{labels}}} {summary['sum'] * factor:g}")
+            lines.append(f"{metric}_count{{{labels}}} {summary['count']}")
+    return "\n".join(lines) + "\n"
+
+
+class PrometheusRenderer(BaseRenderer):
+    """Renders a registry snapshot in the Prometheus text exposition format."""
+
+    media_type = "text/plain"
+    format = "prometheus"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, list):
+            return render_prometheus(data).encode()
+        # Errors, such as a missing permission, as plain text
+        return str(data.get("detail", data)).encode()
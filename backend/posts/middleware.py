@@ -0,0 +1,169 @@
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.db import connections
+from django.urls import Resolver404, resolve
+
+from .metrics import registry
+from .routers import use_replicas
+
+
+class RequestTally:
+    """Database work of one request, counted by a connection execute wrapper."""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.view_start = None
+        self.db_time_before_view = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_time += time.perf_counter() - start
+
+
+class MetricsMiddleware:
+    """
+    Records the cost of every request, per view, in ``posts.metrics``.
+
+    Measured are the number of database queries and the time they took, the
+    time spent in the view and rendering outside of queries, which for these
+    API views is mostly serialization, the total time and the response size.
+    Each response carries them in a Server-Timing header.
+
+    Opt-in with METRICS_ENABLED; it should be first in MIDDLEWARE so that
+    the total covers the other middleware. Queries run while a streamed
+    response is consumed happen after the middleware returns and are not
+    counted. Works under WSGI and ASGI, so async views keep running on the
+    event loop.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+            # Django calls process_view in the mode it is defined in
+            self.process_view = self.aprocess_view
+
+    def track_queries(self, tally):
+        """Return an ExitStack counting this thread's queries into ``tally``."""
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(tally))
+        return stack
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        tally = request.metrics_tally = RequestTally()
+        start = time.perf_counter()
+        with self.track_queries(tally):
+            response = self.get_response(request)
+        return self.record(request, response, tally, start)
+
+    async def __acall__(self, request):
+        tally = request.metrics_tally = RequestTally()
+        start = time.perf_counter()
+        # Connections are per thread, and the async ORM queries from the
+        # thread that thread sensitive sync_to_async calls of this request
+        # share, so the wrappers are installed there
+        stack = await sync_to_async(self.track_queries)(tally)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+        return self.record(request, response, tally, start)
+
+    def record(self, request, response, tally, start):
+        end = time.perf_counter()
+        sample = {
+            "duration_ms": (end - start) * 1000,
+            "db_ms": tally.db_time * 1000,
+            "serialize_ms": 0.0,
+            "queries": tally.queries,
+        }
+        if tally.view_start is not None:
+            db_in_view = tally.db_time - tally.db_time_before_view
+            sample["serialize_ms"] = (
+                max(0.0, end - tally.view_start - db_in_view) * 1000
+            )
+        if not response.streaming:
+            sample["response_bytes"] = len(response.content)
+
+        timings = [
+            f'db;dur={sample["db_ms"]:.1f};desc="{tally.queries} queries"',
+            f'serialize;dur={sample["serialize_ms"]:.1f}',
+            f'total;dur={sample["duration_ms"]:.1f}',
+        ]
+        if "Server-Timing" in response.headers:
+            timings.insert(0, response.headers["Server-Timing"])
+        response.headers["Server-Timing"] = ", ".join(timings)
+
+        match = request.resolver_match
+        if match is not None:
+            # Unresolved requests are not recorded, keeping the views bounded
+            registry.record(match._func_path, request.method, sample)
+        return response
+
+    def start_view(self, request):
+        tally = request.metrics_tally
+        tally.view_start = time.perf_counter()
+        tally.db_time_before_view = tally.db_time
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        self.start_view(request)
+
+    async def aprocess_view(self, request, view_func, view_args, view_kwargs):
+        self.start_view(request)
+
+
+class ReplicaReadsMiddleware:
+    """
+    Routes the reads of GET and HEAD requests to the posts views to a replica.
+
+    The view is resolved from the path up front, so with the middleware
+    first in MIDDLEWARE the reads of the other middleware are routed too.
+    Rows of a streamed response are read after the middleware returns, from
+    the primary, as are the bodies of responses carrying validators. Works
+    under WSGI and ASGI; see ``posts.routers``.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    # Modules of the views whose reads may be served by a replica
+    view_modules = ("posts.views", "posts.async_views")
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def reads_from_replica(self, request):
+        if request.method not in ("GET", "HEAD"):
+            return False
+        try:
+            match = resolve(request.path_info, getattr(request, "urlconf", None))
+        except Resolver404:
+            return False
+        return match.func.__module__ in self.view_modules
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        with use_replicas(self.reads_from_replica(request)):
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        with use_replicas(self.reads_from_replica(request)):
+            return await self.get_response(request)
@@ -0,0 +1,97 @@
+import hashlib
+import uuid
+
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+
+from .caching import get_places_modified, get_places_version
+from .models import ImageUpload
+from .routers import use_replicas
+from .uploads import discard_upload, open_upload
+
+
+def places_etag(version, request, *extra):
+    """Return the ETag of a GET for ``request`` at the places ``version``."""
+    parts = [version, request.get_host(), request.path, sorted(request.GET.lists())]
+    return '"%s"' % hashlib.md5(repr([*parts, *extra]).encode()).hexdigest()
+
+
+class ConditionalGetMixin:
+    """
+    Adds ETag and Last-Modified validators to GET requests.
+
+    Validators come from the places version counter rather than the response
+    body, so a matching If-None-Match or If-Modified-Since is answered with
+    304 Not Modified before any query runs or the serializer is touched.
+
+    The body is read from the primary: a lagging replica would pair older
+    rows with the validators of the newer version, and clients would then
+    revalidate that stale body until the next change.
+    """
+
+    # Set on views whose output depends on the requesting user (is_owner)
+    etag_per_user = False
+
+    def get_etag(self, request):
+        user = [request.user.pk] if self.etag_per_user else []
+        return places_etag(get_places_version(), request, *user)
+
+    def get(self, request, *args, **kwargs):
+        etag = self.get_etag(request)
+        last_modified = get_places_modified()
+
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            with use_replicas(False):
+                response = super().get(request, *args, **kwargs)
+
+        if response.status_code in (200, 304):
+            response.headers.setdefault("ETag", etag)
+            if last_modified:
+                response.headers.setdefault("Last-Modified", http_date(last_modified))
+        if self.etag_per_user:
+            patch_vary_headers(response, ["Authorization"])
+        return response
+
+
+class ImageUploadsMixin:
+    """
+    Lets create and update views take finished resumable uploads, referenced
+    by id in ``images_uploads``, as well as ``images_files`` in the request.
+
+    Uploads are consumed, and deleted, only when the response is successful.
+    """
+
+    def get_image_files(self):
+        """Return the files in the request followed by the referenced uploads."""
+        files = self.request.FILES.getlist("images_files")
+        ids = self.request.data.getlist("images_uploads")
+        if not ids:
+            return files
+
+        try:
+            ids = [uuid.UUID(upload_id) for upload_id in ids]
+        except ValueError:
+            raise ValidationError({"images_uploads": "Invalid upload id."})
+        uploads = ImageUpload.objects.filter(user_id=self.request.user.pk, id__in=ids)
+        uploads = {upload.id: upload for upload in uploads}
+        if len(uploads) != len(set(ids)):
+            raise ValidationError({"images_uploads": "Unknown upload id."})
+        if not all(upload.is_complete for upload in uploads.values()):
+            raise ValidationError({"images_uploads": "Upload is not complete."})
+
+        self.opened_uploads = [
+            (uploads[upload_id], open_upload(uploads[upload_id])) for upload_id in ids
+        ]
+        return files + [file for _, file in self.opened_uploads]
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        for upload, file in getattr(self, "opened_uploads", []):
+            file.close()
+            if status.is_success(response.status_code):
+                discard_upload(upload)
+        return super().finalize_response(request, response, *args, **kwargs)
@@ -1,3 +1,5 @@
+import uuid
+
 from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.core.validators import (
@@ -5,7 +7,30 @@ from django.core.validators import (
     MaxValueValidator,
     MinValueValidator,
 )
-from django.db import models
+from django.db import models, transaction
+from django.db.models import OuterRef, Subquery
+from django.db.models.fields.json import KT
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .geo import quadkey
+from .storage import content_hash, content_path, place_image_storage
+
+
+class PlaceQuerySet(models.QuerySet):
+    def with_thumbnail(self):
+        """
+        Annotate each place with the file name of its thumbnail image.
+
+        The thumbnail is resolved with a correlated subquery, so serializing
+        the whole queryset costs a single query instead of one per place.
+        The small JPEG derivative is preferred over the original upload.
+        """
+        thumbnails = PlaceImage.objects.filter(place=OuterRef("pk"), is_thumbnail=True)
+        name = Coalesce(
+            KT("variants__thumb__jpeg"), "image", output_field=models.CharField()
+        )
+        return self.annotate(thumbnail_name=Subquery(thumbnails.values(name=name)[:1]))
 
 
 class Place(models.Model):
@@ -51,21 +76,80 @@ class Place(models.Model):
     )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Web Mercator quadkey of the coordinates, kept in sync by save(); see
+    # posts.geo.quadkey. Null until backfilled with backfill_quadkeys.
+    quadkey = models.BigIntegerField(null=True, blank=True, editable=False)
+
+    objects = PlaceQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Back the bbox range lookups of the map endpoints
+            models.Index(fields=["latitude", "longitude"]),
+            models.Index(fields=["longitude", "latitude"]),
+            # Backs the quadkey range lookups of posts.geo.quadkey_filter
+            models.Index(fields=["quadkey"]),
+            # Backs the cursor pagination of PlaceList
+            models.Index(fields=["created_at", "id"]),
+            # Backs the top-N reads of posts.leaderboard; id breaks rating ties
+            models.Index(fields=["category", "rating", "id"]),
+        ]
 
     def __str__(self):
         return self.name
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Where the place was when loaded, so saves can update the clusters
+        # it leaves; see posts.clustering
+        loaded = dict(zip(field_names, values))
+        if {"longitude", "latitude", "category"} <= loaded.keys():
+            instance._loaded_location = (
+                loaded["longitude"],
+                loaded["latitude"],
+                loaded["category"],
+            )
+        return instance
+
+    def set_quadkey(self):
+        """Compute ``quadkey`` from the coordinates; bulk_create skips save()"""
+        self.quadkey = quadkey(float(self.longitude), float(self.latitude))
+
+    def save(self, *args, **kwargs):
+        self.set_quadkey()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and {"longitude", "latitude"} & set(update_fields):
+            kwargs["update_fields"] = {*update_fields, "quadkey"}
+        super().save(*args, **kwargs)
+
     def get_thumbnail(self):
         """Return the image marked as thumbnail"""
         return self.images.filter(is_thumbnail=True).first()
 
+    def get_thumbnail_url(self):
+        """
+        Return the relative URL of the thumbnail image, or None.
+
+        Uses the ``thumbnail_name`` annotation from ``with_thumbnail()`` when
+        present, falling back to a query for a single instance.
+        """
+        if hasattr(self, "thumbnail_name"):
+            name = self.thumbnail_name
+        else:
+            thumbnail = self.get_thumbnail()
+            name = thumbnail.get_variant_name("thumb") if thumbnail else None
+        if not name:
+            return None
+        return PlaceImage._meta.get_field("image").storage.url(name)
+
     def get_images(self):
         """Return all images associated with a place, used in carousel"""
         return self.images.all()
 
 
 def place_image_path(instance, filename):
-    return f"place_pics/{instance.place.id}/{filename}"
+    return content_path(instance.checksum, filename)
 
 
 def validate_image_size(image):
@@ -78,11 +162,23 @@ class PlaceImage(models.Model):
     """
     Represents an image associated with a specific place.
     One image/place marked as thumbnail.
+
+    ``variants`` records the resized derivatives generated from the upload
+    as ``{variant: {format: file name}}``; see ``posts.images``. They are
+    generated by a background job, and ``status`` tracks its progress.
+
+    Files are content addressed by ``checksum``, so images with identical
+    bytes share one file; see ``posts.storage``.
     """
 
+    PENDING = "pending"
+    READY = "ready"
+    FAILED = "failed"
+
     place = models.ForeignKey(Place, related_name="images", on_delete=models.CASCADE)
     image = models.ImageField(
         upload_to=place_image_path,
+        storage=place_image_storage,
         validators=[
             FileExtensionValidator(["jpg", "jpeg", "png"]),
             validate_image_size,
@@ -91,16 +187,211 @@ class PlaceImage(models.Model):
     is_thumbnail = models.BooleanField(default=False)
     caption = models.CharField(max_length=100, blank=True)
     order = models.PositiveIntegerField(default=0)
+    variants = models.JSONField(default=dict, blank=True)
+    checksum = models.CharField(max_length=64, blank=True)
+    status = models.CharField(
+        max_length=10,
+        choices=[
+            (PENDING, "Pending"),
+            (READY, "Ready"),
+            (FAILED, "Failed"),
+        ],
+        default=PENDING,
+    )
 
     class Meta:
         ordering = ["order"]
+        indexes = [
+            models.Index(fields=["place", "is_thumbnail"]),
+            # Backs the reference checks made before a shared file is deleted
+            models.Index(fields=["image"]),
+        ]
+
+    def set_checksum(self):
+        """Hash a new upload; done before it is stored, as it names the file"""
+        if self.image and not self.image._committed:
+            self.checksum = content_hash(self.image)
+
+    def file_name(self):
+        """Return the name the image's file is, or will be, stored under"""
+        if self.image._committed:
+            return self.image.name
+        return self.image.field.generate_filename(self, self.image.name)
 
     def save(self, *args, **kwargs):
-        if self.is_thumbnail:
-            PlaceImage.objects.filter(place=self.place).exclude(pk=self.pk).update(
-                is_thumbnail=False
-            )
-        super().save(*args, **kwargs)
+        self.set_checksum()
+        update_fields = kwargs.get("update_fields")
+        with transaction.atomic(savepoint=False):
+            if self.image and not self.image._committed:
+                ImageFile.objects.lock([self.file_name()])
+            if self.is_thumbnail and (
+                update_fields is None or "is_thumbnail" in update_fields
+            ):
+                PlaceImage.objects.filter(place=self.place).exclude(pk=self.pk).update(
+                    is_thumbnail=False
+                )
+            super().save(*args, **kwargs)
+
+    def get_variant_name(self, variant, image_format="jpeg"):
+        """Return the file name of a derivative, falling back to the original"""
+        return self.variants.get(variant, {}).get(image_format) or self.image.name
 
     def __str__(self):
         return f"{self.place.name} - Image {self.order}"
+
+
+class ImageFileQuerySet(models.QuerySet):
+    def lock(self, names):
+        """
+        Lock the rows of the file ``names`` until the transaction ends.
+
+        Missing rows are created first. Rows are locked in name order, so two
+        transactions locking overlapping names cannot deadlock.
+        """
+        names = sorted(set(names))
+        if names:
+            self.bulk_create(
+                [ImageFile(name=name) for name in names], ignore_conflicts=True
+            )
+            list(self.select_for_update().filter(name__in=names).order_by("name"))
+
+
+class ImageFile(models.Model):
+    """
+    Lock row for a content-addressed image file; see ``posts.storage``.
+
+    Storing an upload and deleting a file both lock the row of its name for
+    the rest of their transaction. The ``delete_image_files`` job therefore
+    sees every image stored with the file before it, and an upload made
+    after it finds the file gone and writes it again.
+    """
+
+    name = models.CharField(max_length=255, primary_key=True)
+
+    objects = ImageFileQuerySet.as_manager()
+
+    def __str__(self):
+        return self.name
+
+
+class PlaceChange(models.Model):
+    """
+    Change log entry recorded whenever a place or one of its images is saved
+    or deleted. Entry ids serve as delta sync cursors.
+
+    Places are hard deleted, so ``place_id`` is a plain column rather than a
+    foreign key; a logged place that no longer exists has been deleted.
+    """
+
+    place_id = models.BigIntegerField(db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Change {self.id} to place {self.place_id}"
+
+
+class PlaceCluster(models.Model):
+    """
+    Precomputed cluster of the places in one grid cell at one zoom level.
+
+    ``category`` is empty for the clusters of all categories together. Rows
+    are maintained by background jobs; see ``posts.clustering``.
+    """
+
+    category = models.CharField(max_length=10, blank=True)
+    zoom = models.PositiveSmallIntegerField()
+    x = models.PositiveIntegerField()
+    y = models.PositiveIntegerField()
+    point_count = models.PositiveIntegerField()
+    # Centroid of the places in the cell
+    longitude = models.FloatField()
+    latitude = models.FloatField()
+    top_place_id = models.BigIntegerField()
+    top_name = models.CharField(max_length=50)
+    top_rating = models.DecimalField(
+        max_digits=2, decimal_places=1, null=True, blank=True
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["category", "zoom", "x", "y"], name="unique_cluster_cell"
+            ),
+        ]
+        indexes = [
+            # Backs the viewport reads of clustered requests
+            models.Index(fields=["category", "zoom", "latitude", "longitude"]),
+        ]
+
+    def __str__(self):
+        return f"Cluster {self.zoom}/{self.x}/{self.y} of {self.point_count} places"
+
+
+class Job(models.Model):
+    """
+    Background job run by the ``process_jobs`` worker; see ``posts.jobs``.
+
+    Failed jobs are retried with a growing delay until ``max_attempts`` is
+    reached, after which they stay failed with the last error recorded.
+    """
+
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(
+        max_length=10,
+        choices=[
+            (PENDING, "Pending"),
+            (RUNNING, "Running"),
+            (DONE, "Done"),
+            (FAILED, "Failed"),
+        ],
+        default=PENDING,
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    run_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Backs the worker's lookup of the next due job
+            models.Index(fields=["status", "run_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.id} ({self.status})"
+
+
+class ImageUpload(models.Model):
+    """
+    Resumable upload of a single image file, received in chunks.
+
+    Chunks are appended to a temporary file outside the media root; see
+    ``posts.uploads``. Once ``offset`` reaches ``size`` the upload can be
+    referenced by id when creating or editing a place, which turns it into a
+    PlaceImage and removes the upload.
+    """
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="uploads"
+    )
+    filename = models.CharField(max_length=100)
+    size = models.PositiveIntegerField()
+    offset = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.filename} ({self.offset}/{self.size} bytes)"
+
+    @property
+    def is_complete(self):
+        return self.offset == self.size
@@ -0,0 +1,91 @@
+"""
+Nearest place search around a point.
+
+Candidates are pruned with the quadkey ranges covering the bbox around a
+search circle, then the exact bbox, and ranked by haversine distance inside
+the database, which sorts them and keeps only the nearest. The circle starts
+small and doubles until it holds enough places or reaches the requested
+radius, so dense areas never rank more than a few times ``limit`` rows,
+however many places exist.
+"""
+
+import math
+
+from django.db.models.functions import ASin, Cos, Least, Power, Radians, Sin, Sqrt
+
+from .geo import EARTH_RADIUS_KM, bbox_filter, quadkey_filter, radius_bbox
+from .geojson import alist_features, iter_features
+
+# Radius of the first search circle
+INITIAL_RADIUS_KM = 1.0
+
+
+def haversine_km(longitude, latitude, other_longitude, other_latitude):
+    """Return the great circle distance between two points in kilometres."""
+    phi, other_phi = math.radians(latitude), math.radians(other_latitude)
+    a = (
+        math.sin((other_phi - phi) / 2) ** 2
+        + math.cos(phi)
+        * math.cos(other_phi)
+        * math.sin(math.radians(other_longitude - longitude) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def distance_expression(longitude, latitude):
+    """Return an expression for each place's haversine distance in kilometres."""
+    phi = math.radians(latitude)
+    a = Power(Sin((Radians("latitude") - phi) / 2), 2) + math.cos(phi) * Cos(
+        Radians("latitude")
+    ) * Power(Sin((Radians("longitude") - math.radians(longitude)) / 2), 2)
+    # Rounding can push a just past 1 for antipodal points
+    return 2 * EARTH_RADIUS_KM * ASin(Sqrt(Least(a, 1.0)))
+
+
+def _within(queryset, longitude, latitude, search_km, limit):
+    """Return the ``limit`` places nearest the point within ``search_km``."""
+    bbox = radius_bbox(longitude, latitude, search_km)
+    return (
+        queryset.filter(quadkey_filter(bbox), bbox_filter(bbox))
+        .alias(distance=distance_expression(longitude, latitude))
+        .filter(distance__lte=search_km)
+        .order_by("distance", "id")[:limit]
+    )
+
+
+def _add_distances(features, longitude, latitude):
+    for feature in features:
+        feature["properties"]["distance_km"] = round(
+            haversine_km(longitude, latitude, *feature["geometry"]["coordinates"]), 3
+        )
+    return features
+
+
+def nearest_features(queryset, request, longitude, latitude, radius_km, limit):
+    """
+    Return GeoJSON features of the ``limit`` places nearest the point.
+
+    Only places within ``radius_km`` are returned, nearest first, each with
+    a ``distance_km`` property. ``queryset`` must come from
+    ``Place.objects.with_thumbnail()``.
+    """
+    search_km = min(INITIAL_RADIUS_KM, radius_km)
+    while True:
+        nearest = _within(queryset, longitude, latitude, search_km, limit)
+        features = list(iter_features(nearest, request))
+        if len(features) >= limit or search_km >= radius_km:
+            break
+        search_km = min(search_km * 2, radius_km)
+    return _add_distances(features, longitude, latitude)
+
+
+async def anearest_features(queryset, request, longitude, latitude, radius_km, limit):
+    """``nearest_features`` on the async ORM."""
+    search_km = min(INITIAL_RADIUS_KM, radius_km)
+    while True:
+        nearest = _within(queryset, longitude, latitude, search_km, limit)
+        features = await alist_features(nearest, request)
+        if len(features) >= limit or search_km >= radius_km:
+            break
+        search_km = min(search_km * 2, radius_km)
+    return _add_distances(features, longitude, latitude)
@@ -0,0 +1,87 @@
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, CursorPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class PlaceCursorPagination(CursorPagination):
+    """
+    Cursor pagination over places, newest first.
+
+    DRF's cursor holds only the created_at of the page edge, the first
+    ordering field. Pages are fetched with a ``created_at < position`` range
+    condition on the (created_at, id) index, so depth costs nothing. Places
+    sharing that created_at are skipped with an OFFSET counted in the
+    cursor, so only a run of identical timestamps is scanned again. The id
+    orders those ties, which keeps the offset stable from page to page.
+    """
+
+    ordering = ("-created_at", "-id")
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 200
+
+
+class RankedPagination(BasePagination):
+    """
+    Page number pagination for ranked results, such as search matches.
+
+    Ranks are not stable keys, so pages are taken by offset. No total is
+    counted, since counting every match of a short prefix costs more than
+    the page itself; one extra result is fetched to tell if a next page exists.
+    """
+
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 50
+    page_query_param = "page"
+
+    def get_int_param(self, request, name, default, maximum=None):
+        try:
+            value = int(request.query_params[name])
+        except (KeyError, ValueError):
+            return default
+        if value < 1:
+            return default
+        return min(value, maximum) if maximum else value
+
+    def paginate_ranked(self, fetch, request):
+        """
+        Return one page of results.
+
+        Args:
+            fetch (callable): ``fetch(limit, offset)`` returning ranked results.
+        """
+        self.request = request
+        self.page = self.get_int_param(request, self.page_query_param, 1)
+        page_size = self.get_int_param(
+            request, self.page_size_query_param, self.page_size, self.max_page_size
+        )
+        results = fetch(page_size + 1, (self.page - 1) * page_size)
+        if self.page > 1 and not results:
+            raise NotFound("Invalid page.")
+        self.has_next = len(results) > page_size
+        return results[:page_size]
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.page_query_param, self.page + 1)
+
+    def get_previous_link(self):
+        if self.page == 1:
+            return None
+        url = self.request.build_absolute_uri()
+        if self.page == 2:
+            return remove_query_param(url, self.page_query_param)
+        return replace_query_param(url, self.page_query_param, self.page - 1)
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                "next": self.get_next_link(),
+                "previous": self.get_previous_link(),
+                "results": data,
+            }
+        )
@@ -0,0 +1,68 @@
+"""
+Read replica routing.
+
+The aliases in the DATABASE_REPLICAS setting are read-only copies of
+``default``. Reads go to one of them only inside ``use_replicas()``, which
+ReplicaReadsMiddleware enters for GET and HEAD requests to the posts views;
+everything else, and every write, goes to ``default``. One replica is picked
+per block, so all reads of a request see the same snapshot.
+
+Replicas lag the primary, so a read just after a write may miss it. Reads
+tagged with the places version must not: a shared cache entry or an ETag
+of the version bumped by that write, paired with the older data, would be
+served, or revalidated with 304, until the next change. They run in
+``use_replicas(False)``, which sends them to the primary; see the cache
+builders and ConditionalGetMixin. Replicas serve the remaining reads, such
+as the changes feed and the reads of other middleware.
+"""
+
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+_read_alias = ContextVar("posts_read_alias", default=None)
+
+
+def get_replicas():
+    return list(getattr(settings, "DATABASE_REPLICAS", []))
+
+
+def current_read_alias():
+    """Return the replica reads are routed to, or None for the default."""
+    return _read_alias.get()
+
+
+@contextmanager
+def use_replicas(enabled=True):
+    """Route the reads in the block to a random replica, when there is one."""
+    replicas = get_replicas()
+    alias = random.choice(replicas) if enabled and replicas else None
+    token = _read_alias.set(alias)
+    try:
+        yield alias
+    finally:
+        _read_alias.reset(token)
+
+
+class ReplicaRouter:
+    """Sends reads inside ``use_replicas()`` to a replica, and never migrates one."""
+
+    def db_for_read(self, model, **hints):
+        # None leaves the choice to Django, which falls back to "default"
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {"default", *get_replicas()}
+        if {obj1._state.db, obj2._state.db} <= databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in get_replicas():
+            return False
+        return None
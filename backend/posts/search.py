@@ -0,0 +1,143 @@
+"""
+Full-text search over place names, subtitles and descriptions.
+
+On PostgreSQL the index is a stored generated tsvector column with a GIN
+index, which the database keeps current on every write. On SQLite it is an
+external content FTS5 table kept in sync by triggers, so bulk inserts and
+queryset updates are indexed too. Neither can be declared as a model field
+that works on both backends, so ``install_search_index`` creates them after
+every migrate. Other backends fall back to unranked substring matching.
+
+Every term of a query matches as a prefix, which gives typeahead. Matches on
+the name rank above the subtitle, and the subtitle above the description.
+"""
+
+import re
+
+from django.db import connections, router
+from django.db.models import Q
+
+from .models import Place
+
+SEARCH_TABLE = "posts_place_search"
+
+# Longest queries are cut to this many terms
+MAX_TERMS = 8
+
+POSTGRES_SQL = [
+    """
+    ALTER TABLE {table} ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(name, '')), 'A')
+        || setweight(to_tsvector('simple', coalesce(subtitle, '')), 'B')
+        || setweight(to_tsvector('simple', coalesce(description, '')), 'C')
+    ) STORED
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS {table}_search_idx
+    ON {table} USING GIN (search_vector)
+    """,
+]
+
+SQLITE_SQL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS {search} USING fts5(
+        name, subtitle, description,
+        content='{table}', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS {search}_insert AFTER INSERT ON {table} BEGIN
+        INSERT INTO {search} (rowid, name, subtitle, description)
+        VALUES (new.id, new.name, new.subtitle, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS {search}_delete AFTER DELETE ON {table} BEGIN
+        INSERT INTO {search} ({search}, rowid, name, subtitle, description)
+        VALUES ('delete', old.id, old.name, old.subtitle, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS {search}_update
+    AFTER UPDATE OF name, subtitle, description ON {table} BEGIN
+        INSERT INTO {search} ({search}, rowid, name, subtitle, description)
+        VALUES ('delete', old.id, old.name, old.subtitle, old.description);
+        INSERT INTO {search} (rowid, name, subtitle, description)
+        VALUES (new.id, new.name, new.subtitle, new.description);
+    END
+    """,
+]
+
+
+def search_terms(query):
+    """Split a query into lowercase word terms, safe to embed in either syntax."""
+    return re.findall(r"\w+", query.lower())[:MAX_TERMS]
+
+
+def install_search_index(using="default", **kwargs):
+    """Create the search index for the database ``using``; a post_migrate receiver."""
+    connection = connections[using]
+    table = Place._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            for sql in POSTGRES_SQL:
+                cursor.execute(sql.format(table=table))
+        elif connection.vendor == "sqlite":
+            exists = SEARCH_TABLE in connection.introspection.table_names(cursor)
+            for sql in SQLITE_SQL:
+                cursor.execute(sql.format(table=table, search=SEARCH_TABLE))
+            if not exists:
+                # Index the places saved before the table existed
+                cursor.execute(
+                    f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}) VALUES ('rebuild')"
+                )
+
+
+def search_place_ids(query, limit, offset=0, using=None):
+    """
+    Return the ids of the places best matching ``query``, best first.
+
+    Args:
+        using (str): Database to search; the one the routers pick for
+            reading places by default.
+        limit (int): Most ids to return.
+        offset (int): Ranked matches to skip, for pagination.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return []
+
+    using = using or router.db_for_read(Place)
+    connection = connections[using]
+    if connection.vendor == "postgresql":
+        sql = f"""
+            SELECT id FROM {Place._meta.db_table}, to_tsquery('simple', %s) query
+            WHERE search_vector @@ query
+            ORDER BY ts_rank(search_vector, query) DESC, id
+            LIMIT %s OFFSET %s
+        """
+        params = [" & ".join(f"{term}:*" for term in terms), limit, offset]
+    elif connection.vendor == "sqlite":
+        # bm25 scores are negative, lower is better; columns weighted 10:5:1
+        sql = f"""
+            SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s
+            ORDER BY bm25({SEARCH_TABLE}, 10.0, 5.0, 1.0), rowid
+            LIMIT %s OFFSET %s
+        """
+        params = [" ".join(f'"{term}"*' for term in terms), limit, offset]
+    else:
+        matches = Q()
+        for term in terms:
+            matches &= (
+                Q(name__icontains=term)
+                | Q(subtitle__icontains=term)
+                | Q(description__icontains=term)
+            )
+        places = Place.objects.using(using).filter(matches).order_by("id")
+        return list(places.values_list("id", flat=True)[offset : offset + limit])
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [row[0] for row in cursor.fetchall()]
@@ -1,6 +1,11 @@
+import os
+
+from django.conf import settings
+from django.db import transaction
 from rest_framework import serializers
 
-from .models import Place, PlaceImage
+from .jobs import enqueue_many
+from .models import ImageFile, ImageUpload, Place, PlaceImage
 
 
 class PlaceImageSerializer(serializers.ModelSerializer):
@@ -9,20 +14,42 @@ class PlaceImageSerializer(serializers.ModelSerializer):
 
     Handles the creation, update, and representation of images associated with a
     Place. Includes fields for image (file) upload, URL for frontend access,
-    captioning, and thumbnail designation.
+    resized variant URLs, captioning, and thumbnail designation. ``status``
+    reports whether the variants have been generated yet.
     """
 
     image = serializers.ImageField(write_only=True)
     url = serializers.ImageField(source="image", read_only=True)
+    variants = serializers.SerializerMethodField()
     caption = serializers.CharField(max_length=100, required=False, allow_blank=True)
     is_thumbnail = serializers.BooleanField(default=False)
 
     class Meta:
         model = PlaceImage
-        fields = ["id", "image", "url", "caption", "is_thumbnail"]
+        fields = ["id", "image", "url", "variants", "status", "caption", "is_thumbnail"]
+        read_only_fields = ["status"]
+
+    def get_variants(self, image):
+        """Absolute URLs of each derivative, by variant and format"""
+        request = self.context.get("request")
+        storage = image.image.storage
+        return {
+            variant: {
+                image_format: request.build_absolute_uri(storage.url(name))
+                for image_format, name in formats.items()
+            }
+            for variant, formats in image.variants.items()
+        }
 
 
 class PlaceDetailSerializer(serializers.ModelSerializer):
+    """
+    Serializer for the Place model, including its images.
+
+    Accepts an optional ``fields`` argument to render a sparse subset of the
+    declared fields.
+    """
+
     images = PlaceImageSerializer(many=True, required=False)
     author = serializers.CharField(source="author.username", read_only=True)
     rating = serializers.FloatField(min_value=0, max_value=5)
@@ -44,6 +71,12 @@ class PlaceDetailSerializer(serializers.ModelSerializer):
             "is_owner",
         )
 
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for field_name in set(self.fields) - set(fields):
+                self.fields.pop(field_name)
+
     def create(self, validated_data):
         """
         Creates a Place instance and associated PlaceImage instances
@@ -55,18 +88,40 @@ class PlaceDetailSerializer(serializers.ModelSerializer):
                                     for creating PlaceImage objects.
         Returns:
             place: The newly created Place instance.
+
+        Images are inserted with one bulk_create, so the query count does not
+        grow with the number of images. When several images are marked as
+        thumbnail, the last one wins.
         """
-        images_data = validated_data.pop("images", [])
-        place = Place.objects.create(**validated_data)
-        for image_data in images_data:
-            PlaceImage.objects.create(place=place, **image_data)
+        images = [
+            PlaceImage(**image_data) for image_data in validated_data.pop("images", [])
+        ]
+        thumbnails = [image for image in images if image.is_thumbnail]
+        for image in thumbnails[:-1]:
+            image.is_thumbnail = False
+
+        with transaction.atomic():
+            place = Place.objects.create(**validated_data)
+            if images:
+                for image in images:
+                    image.place = place
+                    image.set_checksum()
+                # Kept from queued file deletions until the images commit
+                ImageFile.objects.lock(image.file_name() for image in images)
+                # bulk_create skips save() and post_save, so queue the
+                # derivative jobs here; creating the place has already bumped
+                # the places version and logged the change
+                PlaceImage.objects.bulk_create(images)
+                enqueue_many(
+                    "process_place_image", [{"image_id": image.pk} for image in images]
+                )
         return place
 
     def get_is_owner(self, obj):
         request = self.context.get("request")
         if not request or not request.user.is_authenticated:
             return False
-        return obj.author == request.user
+        return obj.author_id == request.user.pk
 
     # not sure this is needed... see when i implement creation
     def validate_rating(self, value):
@@ -105,11 +160,10 @@ class PlaceGeoJSONSerializer(serializers.ModelSerializer):
         return {"type": "Point", "coordinates": [place.longitude, place.latitude]}
 
     def get_properties(self, place):
-        thumbnail = place.get_thumbnail()
-        thumbnail_url = None
-        if thumbnail and thumbnail.image:
+        thumbnail_url = place.get_thumbnail_url()
+        if thumbnail_url:
             request = self.context.get("request")
-            thumbnail_url = request.build_absolute_uri(thumbnail.image.url)
+            thumbnail_url = request.build_absolute_uri(thumbnail_url)
         return {
             "name": place.name,
             "subtitle": place.subtitle,
@@ -117,3 +171,29 @@ class PlaceGeoJSONSerializer(serializers.ModelSerializer):
             "thumbnail_url": thumbnail_url,
             "rating": place.rating,
         }
+
+
+class ImageUploadSerializer(serializers.ModelSerializer):
+    """
+    Serializer for resumable uploads: starts one from a file name and size,
+    and reports how many bytes have been received.
+    """
+
+    class Meta:
+        model = ImageUpload
+        fields = ["id", "filename", "size", "offset"]
+        read_only_fields = ["id", "offset"]
+
+    def validate_filename(self, value):
+        value = os.path.basename(value)
+        extension = os.path.splitext(value)[1].lower()
+        if extension not in (".jpg", ".jpeg", ".png"):
+            raise serializers.ValidationError("Only JPEG and PNG images are allowed.")
+        return value
+
+    def validate_size(self, value):
+        if value == 0:
+            raise serializers.ValidationError("The file is empty.")
+        if value > settings.MAX_IMAGE_UPLOAD_SIZE:
+            raise serializers.ValidationError("Image size should not exceed 5MB.")
+        return value
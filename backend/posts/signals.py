@@ -1,10 +1,98 @@
-from django.db.models.signals import pre_delete
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
 from django.dispatch import receiver
 
-from .models import PlaceImage
+from .caching import bump_places_version
+from .clustering import cell_key
+from .jobs import enqueue
+from .leaderboard import update_leaderboards
+from .models import Place, PlaceChange, PlaceImage
 
 
 @receiver(pre_delete, sender=PlaceImage)
 def delete_place_image_file(sender, instance, **kwargs):
     if instance.image:
-        instance.image.delete(save=False)
+        # Checked for other references when the job runs, not now, so an
+        # identical upload made in the meantime keeps the file
+        enqueue("delete_image_files", name=instance.image.name)
+
+
+@receiver(post_save, sender=PlaceImage)
+def create_place_image_variants(sender, instance, created, **kwargs):
+    if created and instance.image:
+        enqueue("process_place_image", image_id=instance.pk)
+
+
+@receiver(post_save, sender=Place)
+@receiver(post_delete, sender=Place)
+@receiver(post_save, sender=PlaceImage)
+@receiver(post_delete, sender=PlaceImage)
+def invalidate_place_caches(sender, using=None, **kwargs):
+    bump_places_version(using)
+
+
+@receiver(post_save, sender=Place)
+@receiver(post_delete, sender=Place)
+def log_place_change(sender, instance, **kwargs):
+    PlaceChange.objects.create(place_id=instance.pk)
+
+
+# Fields that feed the precomputed clusters; see posts.clustering
+CLUSTER_FIELDS = {"name", "longitude", "latitude", "category", "rating"}
+
+
+@receiver(post_save, sender=Place)
+@receiver(post_delete, sender=Place)
+def recluster_place(sender, instance, created=False, update_fields=None, **kwargs):
+    if update_fields is not None and not CLUSTER_FIELDS & set(update_fields):
+        return
+
+    loaded = getattr(instance, "_loaded_location", None)
+    if loaded is None and not created:
+        # Saved from an instance that was not loaded with its location, so
+        # the cells it left are unknown
+        enqueue("rebuild_clusters")
+    else:
+        cells = {cell_key(float(instance.longitude), float(instance.latitude))}
+        categories = {instance.category}
+        if loaded is not None:
+            longitude, latitude, category = loaded
+            cells.add(cell_key(longitude, latitude))
+            categories.add(category)
+        enqueue(
+            "update_clusters",
+            cells=sorted(cells),
+            categories=sorted(categories),
+        )
+
+    if kwargs["signal"] is post_save:
+        # A later save of the same instance starts from here
+        instance._loaded_location = (
+            instance.longitude,
+            instance.latitude,
+            instance.category,
+        )
+
+
+# Boards are shared, so they only move once the write commits; a rolled
+# back save must not leave its rating on them
+@receiver(post_save, sender=Place)
+def rank_place(sender, instance, using=None, **kwargs):
+    transaction.on_commit(
+        partial(update_leaderboards, instance.pk, instance.category, instance.rating),
+        using=using,
+    )
+
+
+@receiver(post_delete, sender=Place)
+def unrank_place(sender, instance, using=None, **kwargs):
+    # The pk is cleared once the delete finishes, so it is bound now
+    transaction.on_commit(partial(update_leaderboards, instance.pk), using=using)
+
+
+@receiver(post_save, sender=PlaceImage)
+@receiver(post_delete, sender=PlaceImage)
+def log_place_image_change(sender, instance, **kwargs):
+    PlaceChange.objects.create(place_id=instance.place_id)
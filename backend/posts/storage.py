@@ -0,0 +1,52 @@
+"""
+Content-addressed storage for place images.
+
+Uploads are named after the SHA-256 of their bytes, so identical photos map
+to the same file and are stored once however many PlaceImages use them.
+Derivative names are built from the original's name and are shared as well.
+A file is only deleted once no PlaceImage references it any more; see the
+``delete_image_files`` task. Uploads lock the file's ImageFile row before
+storing it, inside the transaction that creates their image, so the job
+cannot delete a file between an upload finding it and its image committing.
+"""
+
+import hashlib
+import os
+
+from django.core.files.storage import FileSystemStorage, storages
+
+
+def content_hash(file):
+    """Return the hex SHA-256 of ``file``, read one chunk at a time."""
+    digest = hashlib.sha256()
+    for chunk in file.chunks():
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def content_path(checksum, filename):
+    """Return the storage name for content with ``checksum``."""
+    extension = os.path.splitext(filename)[1].lower()
+    return f"place_pics/{checksum[:2]}/{checksum}{extension}"
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    File system storage where a name always refers to the same content.
+
+    Saving under a name that already exists keeps the stored file instead of
+    writing a renamed copy.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault("allow_overwrite", True)
+        super().__init__(**kwargs)
+
+    def _save(self, name, content):
+        if self.exists(name):
+            return name
+        return super()._save(name, content)
+
+
+def place_image_storage():
+    return storages["place_images"]
@@ -0,0 +1,35 @@
+"""
+Incremental rendering of GeoJSON FeatureCollections.
+
+Features are encoded one at a time and written out in chunks, so a collection
+never has to be held in memory as a whole. The output is byte-for-byte what
+JSONRenderer produces for the complete collection.
+"""
+
+from .geojson import encode_feature
+
+# Rows fetched per database round trip, and features per written chunk
+STREAM_CHUNK_SIZE = 2000
+
+
+def stream_feature_collection(features, chunk_size=None):
+    """
+    Yield a FeatureCollection as JSON bytes, ``chunk_size`` features at a time.
+
+    Args:
+        features: Iterable of GeoJSON Point feature dicts.
+        chunk_size (int): Features per chunk, STREAM_CHUNK_SIZE by default.
+    """
+    chunk_size = chunk_size or STREAM_CHUNK_SIZE
+    yield b'{"type":"FeatureCollection","features":['
+    separator = b""
+    chunk = []
+    for feature in features:
+        chunk.append(encode_feature(feature))
+        if len(chunk) >= chunk_size:
+            yield separator + b",".join(chunk)
+            separator = b","
+            chunk = []
+    if chunk:
+        yield separator + b",".join(chunk)
+    yield b"]}"
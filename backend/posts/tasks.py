@@ -0,0 +1,64 @@
+"""Background tasks run by the job queue; see ``posts.jobs``."""
+
+import logging
+
+from . import clustering
+from .images import UNREADABLE_IMAGE_ERRORS, generate_variants, variant_names
+from .jobs import task
+from .models import ImageFile, PlaceImage
+
+logger = logging.getLogger(__name__)
+
+
+def mark_image_failed(image_id):
+    PlaceImage.objects.filter(pk=image_id).update(status=PlaceImage.FAILED)
+
+
+@task("process_place_image", on_failure=mark_image_failed)
+def process_place_image(image_id):
+    """Generate the derivatives of an uploaded image."""
+    image = PlaceImage.objects.filter(pk=image_id).first()
+    if image is None:
+        # Deleted before the worker got to it
+        return
+
+    # Images sharing a file share its derivatives, so reuse them when present
+    shared = (
+        PlaceImage.objects.filter(image=image.image.name, status=PlaceImage.READY)
+        .exclude(pk=image.pk)
+        .values_list("variants", flat=True)
+        .first()
+    )
+    try:
+        image.variants = shared or generate_variants(image)
+        image.status = PlaceImage.READY
+    except UNREADABLE_IMAGE_ERRORS:
+        logger.warning("Could not read image %s for derivatives", image.image)
+        image.status = PlaceImage.FAILED
+    image.save(update_fields=["variants", "status"])
+
+
+@task("delete_image_files")
+def delete_image_files(name):
+    """Delete an original and its derivatives unless an image still uses them."""
+    # Held until the job commits, so an upload of the same bytes either
+    # commits its image first or waits and stores the file again
+    ImageFile.objects.lock([name])
+    if PlaceImage.objects.filter(image=name).exists():
+        return
+    storage = PlaceImage._meta.get_field("image").storage
+    for file_name in [name, *variant_names(name)]:
+        storage.delete(file_name)
+    ImageFile.objects.filter(name=name).delete()
+
+
+@task("update_clusters")
+def update_clusters(cells, categories):
+    """Recompute the clusters of the leaf cells places moved out of or into."""
+    clustering.update_clusters(cells, categories)
+
+
+@task("rebuild_clusters")
+def rebuild_clusters():
+    """Recompute every cluster, after writes that bypass the Place signals."""
+    clustering.rebuild_clusters()
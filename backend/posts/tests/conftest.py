@@ -0,0 +1,36 @@
+import pytest
+from django.core.cache import cache
+from posts.tests.query_budget import RequestQueries, format_queries
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers",
+        "query_budget(n): fail if any request made by the test runs more than n "
+        "database queries",
+    )
+
+
+@pytest.hookimpl(wrapper=True)
+def pytest_runtest_call(item):
+    """Enforce the query_budget marker on every request the test makes"""
+    marker = item.get_closest_marker("query_budget")
+    if marker is None:
+        return (yield)
+
+    budget = marker.args[0]
+    with RequestQueries() as queries:
+        result = yield
+    over = [request for request in queries.requests if len(request[1]) > budget]
+    if over:
+        details = "\n".join(format_queries(*request) for request in over)
+        pytest.fail(f"Query budget of {budget} exceeded:\n{details}", pytrace=False)
+    return result
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Start every test with an empty cache so cached map data cannot leak"""
+    cache.clear()
+    yield
+    cache.clear()
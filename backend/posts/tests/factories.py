@@ -0,0 +1,63 @@
+from io import BytesIO
+
+import factory
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image as PillowImage
+from posts.models import Place, PlaceImage
+
+User = get_user_model()
+
+
+class UserFactory(factory.django.DjangoModelFactory):
+    """Factory Boy factory class for creating User instances"""
+
+    class Meta:
+        model = User
+
+    username = factory.Sequence(lambda n: f"testuser{n}")
+    email = factory.LazyAttribute(lambda obj: f"{obj.username}@example.com")
+    first_name = factory.Faker("first_name")
+    last_name = factory.Faker("last_name")
+
+
+class PlaceFactory(factory.django.DjangoModelFactory):
+    """Factory for creating Place instances"""
+
+    class Meta:
+        model = Place
+
+    name = factory.Faker("city")
+    subtitle = factory.Faker("sentence", nb_words=4)
+    description = factory.Faker("text", max_nb_chars=200)
+    longitude = factory.Faker("longitude")
+    latitude = factory.Faker("latitude")
+    category = factory.Iterator(["nature", "city", "other"])
+    rating = factory.Faker("random_element", elements=[i * 0.5 for i in range(11)])
+    author = factory.SubFactory(UserFactory)
+
+
+class PlaceImageFactory(factory.django.DjangoModelFactory):
+    """Factory for creating PlaceImage instances"""
+
+    class Meta:
+        model = PlaceImage
+
+    place = factory.SubFactory(PlaceFactory)
+    caption = factory.Faker("sentence", nb_words=3)
+    is_thumbnail = False
+    order = factory.Sequence(lambda n: n)
+
+    # @factory.lazy_attribute generates a field(using logic, not a simple data type) when calling the factory  # noqa: E501
+    @factory.lazy_attribute
+    def image(self):
+        """Create a simple test image"""
+        image = PillowImage.new("RGB", (100, 100), color="red")
+        # Save image to an in-memory file (BytesIO)
+        temp_file = BytesIO()
+        image.save(temp_file, format="JPEG")
+        temp_file.seek(0)
+        # Return a Django SimpleUploadedFile instance(mimics a file upload)
+        return SimpleUploadedFile(
+            name="test_image.jpg", content=temp_file.read(), content_type="image/jpeg"
+        )
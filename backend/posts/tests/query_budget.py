@@ -0,0 +1,96 @@
+"""
+Query counting for tests, to catch N+1 queries before they ship.
+
+Two checks build on ``RequestQueries``, which counts the database queries
+run while Django handles each request, leaving out the test's own setup:
+
+- ``@pytest.mark.query_budget(n)`` fails a test when any request it makes
+  runs more than ``n`` queries; see ``conftest.py``.
+- ``assert_queries_constant`` makes the same request at several data sizes
+  and fails when its query count grows with the size.
+"""
+
+from contextlib import ExitStack
+
+import pytest
+from django.core.signals import request_finished, request_started
+from django.db import connections
+
+
+class RequestQueries:
+    """
+    Records the SQL of each request Django handles while active.
+
+    ``requests`` holds ``(method and path, [sql, ...])`` pairs in order.
+    """
+
+    def __init__(self):
+        self.requests = []
+        self._current = None
+        self._stack = None
+
+    def __enter__(self):
+        self._stack = ExitStack()
+        for connection in connections.all():
+            self._stack.enter_context(connection.execute_wrapper(self._record))
+        request_started.connect(self._started)
+        request_finished.connect(self._finished)
+        return self
+
+    def __exit__(self, *exc_info):
+        request_started.disconnect(self._started)
+        request_finished.disconnect(self._finished)
+        self._finished()
+        self._stack.close()
+
+    def _started(self, sender=None, environ=None, **kwargs):
+        environ = environ or {}
+        request = f"{environ.get('REQUEST_METHOD', '')} {environ.get('PATH_INFO', '')}"
+        self._current = (request, [])
+
+    def _finished(self, sender=None, **kwargs):
+        if self._current is not None:
+            self.requests.append(self._current)
+            self._current = None
+
+    def _record(self, execute, sql, params, many, context):
+        if self._current is not None:
+            self._current[1].append(sql)
+        return execute(sql, params, many, context)
+
+    @property
+    def count(self):
+        """Queries run by all of the requests together."""
+        return sum(len(queries) for _, queries in self.requests)
+
+
+def format_queries(request, queries):
+    lines = [f"{request}: {len(queries)} queries"]
+    lines += [f"  {number}. {sql}" for number, sql in enumerate(queries, 1)]
+    return "\n".join(lines)
+
+
+def assert_queries_constant(make_request, sizes=(1, 5, 20), grow=None):
+    """
+    Fail if the queries of the requests made by ``make_request`` grow with N.
+
+    For each size N in turn, ``grow(N)`` brings the data up to size N, then
+    ``make_request(N)`` makes the requests measured; either may ignore N.
+    Every size must cost no more queries than the first.
+
+    Returns:
+        dict: The query count at each size.
+    """
+    counts = {}
+    largest = None
+    for size in sizes:
+        if grow is not None:
+            grow(size)
+        with RequestQueries() as queries:
+            make_request(size)
+        counts[size] = queries.count
+        largest = queries
+    if max(counts.values()) > counts[sizes[0]]:
+        details = "\n".join(format_queries(*request) for request in largest.requests)
+        pytest.fail(f"Queries grow with the data size: {counts}\n{details}")
+    return counts
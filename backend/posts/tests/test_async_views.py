@@ -0,0 +1,142 @@
+import pytest
+from django.urls import reverse
+from posts.jobs import run_pending_jobs
+from posts.tests.factories import PlaceFactory, PlaceImageFactory, UserFactory
+from rest_framework import status
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+
+@pytest.mark.django_db
+class TestAsyncViews:
+    """Tests for the async read endpoints"""
+
+    def setup_method(self):
+        self.client = APIClient()
+        self.author = UserFactory()
+        self.places = [
+            PlaceFactory(
+                author=self.author,
+                longitude=2.35 + i * 0.01,
+                latitude=48.85,
+                category=["city", "nature"][i % 2],
+                rating=i,
+            )
+            for i in range(4)
+        ]
+        PlaceImageFactory(place=self.places[0], is_thumbnail=True)
+
+    def assert_same(self, sync_name, async_name, params=None, kwargs=None, **extra):
+        """Assert that both endpoints give the same status and bytes."""
+        sync = self.client.get(
+            reverse(sync_name, kwargs=kwargs), params, format="json", **extra
+        )
+        response = self.client.get(reverse(async_name, kwargs=kwargs), params, **extra)
+        assert response.status_code == sync.status_code
+        assert response["Content-Type"] == "application/json"
+        assert response.content == sync.content
+        return response
+
+    @pytest.mark.parametrize(
+        "params, count",
+        [
+            ({}, 4),
+            ({"category": "city"}, 2),
+            ({"bbox": "2.365,48,3,49", "zoom": 12}, 2),
+        ],
+    )
+    def test_geojson_matches_sync(self, params, count):
+        """Test that the async GeoJSON matches the sync endpoint byte for byte"""
+        response = self.assert_same("geojson", "async_geojson", params)
+        assert len(response.json()["features"]) == count
+
+    def test_geojson_clusters(self, settings, tmp_path):
+        """Test that clusters are served by the async GeoJSON endpoint"""
+        settings.MEDIA_ROOT = tmp_path
+        run_pending_jobs()
+        response = self.assert_same(
+            "geojson", "async_geojson", {"cluster": "true", "zoom": 3}
+        )
+        assert response.json()["features"][0]["properties"]["point_count"] == 4
+
+    def test_detail_matches_sync(self):
+        """Test that the async detail matches the sync endpoint byte for byte"""
+        place = self.places[0]
+        response = self.assert_same(
+            "place_detail", "async_place_detail", kwargs={"pk": place.pk}
+        )
+        assert response.json()["is_owner"] is False
+
+    def test_detail_authenticated(self):
+        """Test that a JWT is honoured for is_owner"""
+        token = str(AccessToken.for_user(self.author))
+        response = self.assert_same(
+            "place_detail",
+            "async_place_detail",
+            kwargs={"pk": self.places[0].pk},
+            HTTP_AUTHORIZATION=f"Bearer {token}",
+        )
+        assert response.json()["is_owner"] is True
+        assert "Authorization" in response["Vary"]
+
+    def test_detail_invalid_token(self):
+        """Test that an invalid JWT is rejected like the sync endpoint does"""
+        response = self.assert_same(
+            "place_detail",
+            "async_place_detail",
+            kwargs={"pk": self.places[0].pk},
+            HTTP_AUTHORIZATION="Bearer nonsense",
+        )
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_detail_not_found(self):
+        """Test that a missing place is a 404"""
+        response = self.assert_same(
+            "place_detail", "async_place_detail", kwargs={"pk": 0}
+        )
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_nearby_matches_sync(self):
+        """Test that the async nearby matches the sync endpoint byte for byte"""
+        response = self.assert_same(
+            "nearby", "async_nearby", {"lat": 48.85, "lon": 2.35, "limit": 3}
+        )
+        assert [f["id"] for f in response.json()["features"]] == [
+            place.id for place in self.places[:3]
+        ]
+
+    def test_top_matches_sync(self):
+        """Test that the async top places match the sync endpoint byte for byte"""
+        response = self.assert_same("top", "async_top", {"limit": 3})
+        assert [f["id"] for f in response.json()["features"]] == [
+            place.id for place in reversed(self.places[1:])
+        ]
+
+    @pytest.mark.parametrize(
+        "name, params",
+        [
+            ("nearby", {"lat": 100, "lon": 0}),
+            ("top", {"category": "nowhere"}),
+            ("geojson", {"bbox": "nonsense"}),
+        ],
+    )
+    def test_invalid_params(self, name, params):
+        """Test that invalid parameters give the sync endpoint's 400"""
+        response = self.assert_same(name, f"async_{name}", params)
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_conditional_get(self, django_assert_num_queries):
+        """Test that a matching ETag is answered with 304 without queries"""
+        url = reverse("async_geojson")
+        response = self.client.get(url)
+        assert response.status_code == status.HTTP_200_OK
+        assert response.has_header("Last-Modified")
+
+        with django_assert_num_queries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    def test_post_not_allowed(self):
+        """Test that the async endpoints only serve reads"""
+        response = self.client.post(reverse("async_geojson"))
+        assert response.status_code == status.HTTP_405_METHOD_NOT_ALLOWED
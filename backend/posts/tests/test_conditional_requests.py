@@ -0,0 +1,86 @@
+import pytest
+from django.urls import reverse
+from posts.tests.factories import PlaceFactory, UserFactory
+from rest_framework import status
+from rest_framework.test import APIClient
+
+
+@pytest.mark.django_db
+class TestConditionalRequests:
+    """Tests for ETag and Last-Modified support on the posts API"""
+
+    def setup_method(self):
+        self.client = APIClient()
+        self.user = UserFactory()
+        self.place = PlaceFactory(author=self.user)
+
+    def urls(self):
+        return [
+            reverse("geojson"),
+            reverse("place_list"),
+            reverse("place_detail", args=[self.place.id]),
+        ]
+
+    def test_validators_are_emitted(self):
+        """Test that every read endpoint returns an ETag and Last-Modified"""
+        for url in self.urls():
+            response = self.client.get(url)
+
+            assert response.status_code == status.HTTP_200_OK
+            assert response["ETag"].startswith('"')
+            assert "Last-Modified" in response
+
+    def test_matching_etag_returns_304_without_queries(self, django_assert_num_queries):
+        """Test that a matching If-None-Match skips the database entirely"""
+        for url in self.urls():
+            etag = self.client.get(url)["ETag"]
+
+            with django_assert_num_queries(0):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+            assert response.status_code == status.HTTP_304_NOT_MODIFIED
+            assert response["ETag"] == etag
+            assert response.content == b""
+
+    def test_if_modified_since_returns_304(self):
+        """Test that an up to date If-Modified-Since returns 304"""
+        for url in self.urls():
+            last_modified = self.client.get(url)["Last-Modified"]
+
+            response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+
+            assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    @pytest.mark.django_db(transaction=True)
+    def test_place_change_invalidates_etag(self):
+        """Test that editing a place changes every endpoint's ETag"""
+        etags = [self.client.get(url)["ETag"] for url in self.urls()]
+
+        self.place.name = "Renamed"
+        self.place.save()
+
+        for url, etag in zip(self.urls(), etags):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            assert response.status_code == status.HTTP_200_OK
+            assert response["ETag"] != etag
+
+    def test_etag_depends_on_query_params(self):
+        """Test that filtered collections get their own ETag"""
+        url = reverse("geojson")
+        etag = self.client.get(url)["ETag"]
+
+        response = self.client.get(url, {"category": "city"}, HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == status.HTTP_200_OK
+
+    def test_etag_depends_on_user(self):
+        """Test that is_owner responses are not shared between users"""
+        url = reverse("place_detail", args=[self.place.id])
+        anonymous_etag = self.client.get(url)["ETag"]
+
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=anonymous_etag)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["is_owner"] is True
+        assert "Authorization" in response["Vary"]
@@ -0,0 +1,111 @@
+import random
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from posts.geo import (
+    BBox,
+    bbox_contains,
+    bbox_filter,
+    quadkey,
+    quadkey_filter,
+    quadkey_ranges,
+    radius_bbox,
+    tile_quadkey,
+    tile_range,
+)
+from posts.models import Place
+from posts.tests.factories import PlaceFactory
+
+
+class TestQuadkeys:
+    """Tests for the quadkey helpers in posts.geo"""
+
+    def test_tile_quadkey(self):
+        """Test against the base 4 quadkey of the Bing Maps tile system docs"""
+        # Tile 3/3/5 has quadkey "213"
+        assert tile_quadkey(3, 3, 5) == int("213", 4)
+
+    def test_tile_range_contains_its_points(self):
+        """Test that a point's quadkey falls in the range of its tiles"""
+        key = quadkey(2.3522, 48.8566)  # Paris, in tile 10/518/352
+
+        start, end = tile_range(10, 518, 352)
+        assert start <= key < end
+        assert not tile_range(10, 519, 352)[0] <= key < tile_range(10, 519, 352)[1]
+
+    @pytest.mark.parametrize(
+        "bbox",
+        [
+            BBox(2.2, 48.8, 2.5, 48.9),
+            BBox(-10, -10, 10, 10),
+            BBox(170, -20, -170, 20),
+            BBox(-180, -90, 180, 90),
+        ],
+    )
+    def test_ranges_cover_the_bbox(self, bbox):
+        """Test that every point inside a bbox lies in one of its few ranges"""
+        ranges = quadkey_ranges(bbox)
+        assert 0 < len(ranges) <= 32
+
+        rng = random.Random(0)
+        for _ in range(2000):
+            longitude = rng.uniform(-180, 180)
+            latitude = rng.uniform(bbox.min_lat, bbox.max_lat)
+            if not bbox_contains(bbox, longitude, latitude):
+                continue
+            key = quadkey(longitude, latitude)
+            assert any(start <= key < end for start, end in ranges)
+
+    def test_radius_bbox(self):
+        """Test the bbox around a radius, including the wrap and the poles"""
+        bbox = radius_bbox(0, 0, 111.195)
+        assert bbox.min_lat == pytest.approx(-1, abs=1e-3)
+        assert bbox.max_lon == pytest.approx(1, abs=1e-3)
+
+        wrapped = radius_bbox(179.9, 0, 50)
+        assert wrapped.min_lon > wrapped.max_lon
+
+        assert radius_bbox(0, 89.9, 50) == BBox(
+            -180, pytest.approx(89.45, 0.01), 180, 90
+        )
+
+
+@pytest.mark.django_db
+class TestPlaceQuadkey:
+    """Tests for maintaining and backfilling Place.quadkey"""
+
+    def test_saving_keeps_the_quadkey_current(self):
+        """Test that moving a place updates its quadkey"""
+        place = PlaceFactory(longitude=2.35, latitude=48.85)
+        assert place.quadkey == quadkey(2.35, 48.85)
+
+        place.longitude = -74.0
+        place.save(update_fields=["longitude"])
+
+        place.refresh_from_db()
+        assert place.quadkey == quadkey(-74.0, 48.85)
+
+    def test_backfill(self):
+        """Test that the backfill command fills missing quadkeys in batches"""
+        PlaceFactory.create_batch(5)
+        Place.objects.update(quadkey=None)
+
+        call_command("backfill_quadkeys", "--batch-size", "2", stdout=StringIO())
+
+        for place in Place.objects.all():
+            assert place.quadkey == quadkey(place.longitude, place.latitude)
+
+    def test_quadkey_filter(self):
+        """Test that the quadkey filter narrows candidates and keeps unbackfilled places"""
+        paris = PlaceFactory(longitude=2.35, latitude=48.85)
+        PlaceFactory(longitude=-74.0, latitude=40.7)
+        legacy = PlaceFactory(longitude=139.7, latitude=35.7)
+        Place.objects.filter(id=legacy.id).update(quadkey=None)
+
+        bbox = BBox(2, 48, 3, 49)
+        candidates = Place.objects.filter(quadkey_filter(bbox))
+        exact = candidates.filter(bbox_filter(bbox))
+
+        assert sorted(candidates.values_list("id", flat=True)) == [paris.id, legacy.id]
+        assert list(exact.values_list("id", flat=True)) == [paris.id]
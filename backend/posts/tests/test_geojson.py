@@ -0,0 +1,578 @@
+import pytest
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import transaction
+from django.urls import reverse
+from posts.caching import get_places_version, require_shared_cache
+from posts.clustering import MAX_CLUSTER_ZOOM, get_clusters, rebuild_clusters
+from posts.geojson import encode_feature_collection, iter_features
+from posts.jobs import run_pending_jobs
+from posts.models import Job, Place, PlaceCluster, PlaceImage
+from posts.serializers import PlaceGeoJSONSerializer
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+
+def create_places(count, with_thumbnails=True):
+    """Bulk create ``count`` places, each with a thumbnail and a plain image"""
+    places = Place.objects.bulk_create(
+        Place(
+            name=f"Place {i}",
+            subtitle="Subtitle",
+            description="Description",
+            longitude=(i % 360) - 180,
+            latitude=(i % 180) - 90,
+            category="nature",
+            rating=(i % 11) * 0.5,
+        )
+        for i in range(count)
+    )
+    if with_thumbnails:
+        PlaceImage.objects.bulk_create(
+            PlaceImage(
+                place=place,
+                image=f"place_pics/{place.id}/{name}.jpg",
+                is_thumbnail=name == "thumb",
+            )
+            for place in places
+            for name in ("thumb", "other")
+        )
+    return places
+
+
+@pytest.mark.django_db
+class TestPlaceGeoJSONView:
+    """Tests for the GeoJSON FeatureCollection endpoint"""
+
+    def setup_method(self):
+        self.client = APIClient()
+        self.url = reverse("geojson")
+
+    def test_feature_structure(self):
+        """Test that each feature carries geometry and thumbnail properties"""
+        place = create_places(1)[0]
+
+        response = self.client.get(self.url)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["type"] == "FeatureCollection"
+        feature = response.json()["features"][0]
+        assert feature["id"] == place.id
+        assert feature["type"] == "Feature"
+        assert feature["geometry"] == {
+            "type": "Point",
+            "coordinates": [place.longitude, place.latitude],
+        }
+        assert feature["properties"]["thumbnail_url"] == (
+            f"http://testserver/media/place_pics/{place.id}/thumb.jpg"
+        )
+
+    def test_place_without_thumbnail(self):
+        """Test that places without a thumbnail report a null thumbnail_url"""
+        create_places(1, with_thumbnails=False)
+
+        response = self.client.get(self.url)
+
+        assert response.json()["features"][0]["properties"]["thumbnail_url"] is None
+
+    @pytest.mark.parametrize("count", [1, 100, 10_000])
+    def test_query_count_is_constant(self, count, django_assert_num_queries):
+        """Test that thumbnails are fetched without a query per place"""
+        create_places(count)
+
+        with django_assert_num_queries(1):
+            response = self.client.get(self.url)
+
+        assert len(response.json()["features"]) == count
+
+
+@pytest.mark.django_db
+class TestGeoJSONViewportFilters:
+    """Tests for the bbox and zoom query parameters"""
+
+    def setup_method(self):
+        self.client = APIClient()
+        self.url = reverse("geojson")
+
+    def create_place(self, longitude, latitude, rating=3.0):
+        return Place.objects.create(
+            name="Place",
+            subtitle="Subtitle",
+            description="Description",
+            longitude=longitude,
+            latitude=latitude,
+            rating=rating,
+        )
+
+    def get_ids(self, **params):
+        response = self.client.get(self.url, params)
+        assert response.status_code == status.HTTP_200_OK
+        return {feature["id"] for feature in response.json()["features"]}
+
+    def test_bbox_limits_results_to_viewport(self):
+        """Test that only places inside the bbox are returned"""
+        paris = self.create_place(2.35, 48.85)
+        self.create_place(-74.0, 40.7)
+
+        assert self.get_ids(bbox="-10,35,30,60") == {paris.id}
+
+    def test_bbox_wraps_antimeridian(self):
+        """Test that a bbox with minLon > maxLon spans the antimeridian"""
+        fiji = self.create_place(178.0, -18.0)
+        samoa = self.create_place(-172.0, -14.0)
+        self.create_place(0.0, -15.0)
+
+        assert self.get_ids(bbox="170,-25,-165,-10") == {fiji.id, samoa.id}
+
+    @pytest.mark.parametrize(
+        "bbox", ["1,2,3", "a,b,c,d", "0,50,10,40", "-200,0,10,10", "0,-95,10,10"]
+    )
+    def test_invalid_bbox(self, bbox):
+        """Test that malformed or out of range bboxes are rejected"""
+        response = self.client.get(self.url, {"bbox": bbox})
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "bbox" in response.data
+
+    def test_zoom_keeps_top_rated_places(self, monkeypatch):
+        """Test that low zoom levels only return the highest rated places"""
+        monkeypatch.setattr("posts.geo.FEATURES_AT_ZOOM_0", 1)
+        best = self.create_place(0, 0, rating=5.0)
+        second = self.create_place(1, 1, rating=4.0)
+        self.create_place(2, 2, rating=1.0)
+
+        assert self.get_ids(zoom="0") == {best.id}
+        assert self.get_ids(zoom="0.5") == {best.id, second.id}
+        assert len(self.get_ids(zoom="3")) == 3
+
+    @pytest.mark.parametrize("zoom", ["abc", "-1", "25"])
+    def test_invalid_zoom(self, zoom):
+        """Test that non-numeric or out of range zooms are rejected"""
+        response = self.client.get(self.url, {"zoom": zoom})
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "zoom" in response.data
+
+
+@pytest.mark.django_db
+class TestGeoJSONClustering:
+    """Tests for the cluster=true mode of the GeoJSON endpoint"""
+
+    def setup_method(self):
+        self.client = APIClient()
+        self.url = reverse("geojson")
+
+    def create_place(self, longitude, latitude, rating, category="nature"):
+        return Place.objects.create(
+            name=f"Place {longitude},{latitude}",
+            subtitle="Subtitle",
+            description="Description",
+            longitude=longitude,
+            latitude=latitude,
+            rating=rating,
+            category=category,
+        )
+
+    def get_features(self, **params):
+        run_pending_jobs()
+        response = self.client.get(self.url, {"cluster": "true", **params})
+        assert response.status_code == status.HTTP_200_OK
+        return response.json()["features"]
+
+    def test_nearby_places_are_clustered(self):
+        """Test that close places merge into one cluster at low zoom"""
+        self.create_place(2.0, 48.0, rating=3.0)
+        best = self.create_place(2.2, 48.2, rating=4.5)
+        self.create_place(-74.0, 40.7, rating=5.0)
+
+        features = sorted(
+            self.get_features(zoom="2"),
+            key=lambda feature: feature["properties"]["point_count"],
+        )
+
+        assert [f["properties"]["point_count"] for f in features] == [1, 2]
+        cluster = features[1]
+        assert cluster["properties"]["cluster"] is True
+        assert cluster["properties"]["top_place"] == {
+            "id": best.id,
+            "name": best.name,
+            "rating": 4.5,
+        }
+        assert cluster["geometry"]["coordinates"] == pytest.approx([2.1, 48.1])
+
+    def test_clusters_split_at_higher_zoom(self):
+        """Test that the same places separate as the grid gets finer"""
+        self.create_place(2.0, 48.0, rating=3.0)
+        self.create_place(2.2, 48.2, rating=4.5)
+
+        assert len(self.get_features(zoom="2")) == 1
+        assert len(self.get_features(zoom="12")) == 2
+
+    def test_clusters_filtered_by_category_and_bbox(self):
+        """Test that category and bbox narrow the clustered result"""
+        self.create_place(2.0, 48.0, rating=3.0, category="city")
+        self.create_place(2.2, 48.2, rating=4.5)
+        self.create_place(-74.0, 40.7, rating=5.0)
+
+        city = self.get_features(zoom="2", category="city")
+        europe = self.get_features(zoom="2", bbox="-10,35,30,60")
+
+        assert [f["properties"]["point_count"] for f in city] == [1]
+        assert [f["properties"]["point_count"] for f in europe] == [2]
+
+    @pytest.mark.django_db(transaction=True)
+    def test_clusters_refresh_after_place_changes(self):
+        """Test that saving or deleting a place invalidates cached clusters"""
+        place = self.create_place(2.0, 48.0, rating=3.0)
+        assert len(self.get_features(zoom="2")) == 1
+
+        self.create_place(-74.0, 40.7, rating=5.0)
+        assert len(self.get_features(zoom="2")) == 2
+
+        place.delete()
+        assert len(self.get_features(zoom="2")) == 1
+
+    def test_clusters_follow_moved_places(self):
+        """Test that a moved place leaves its old cells and joins its new ones"""
+        place = self.create_place(2.0, 48.0, rating=3.0)
+        self.create_place(2.2, 48.2, rating=4.5)
+        run_pending_jobs()
+
+        place.longitude, place.latitude = -74.0, 40.7
+        place.category = "city"
+        place.save()
+        place = Place.objects.get(pk=place.pk)
+        place.name = "Renamed"
+        place.save(update_fields=["name"])
+
+        features = self.get_features(zoom="2")
+        assert sorted(f["properties"]["point_count"] for f in features) == [1, 1]
+        assert [
+            f["properties"]["top_place"]["name"]
+            for f in self.get_features(zoom="2", category="city")
+        ] == ["Renamed"]
+        assert self.get_features(zoom="2", category="nature")[0]["geometry"][
+            "coordinates"
+        ] == pytest.approx([2.2, 48.2])
+
+    def test_updates_match_rebuild(self):
+        """Test that incremental cluster updates agree with a full rebuild"""
+        places = [
+            self.create_place(2.0 + i * 0.3, 48.0 - i * 0.2, rating=i % 5, category=c)
+            for i, c in enumerate(["city", "nature", "other"] * 4)
+        ]
+        places[0].delete()
+        places[1].longitude = 150.0
+        places[1].save()
+        run_pending_jobs()
+
+        def snapshot():
+            return {
+                (category, zoom): get_clusters(zoom, category)
+                for category in [None, "city", "nature", "other"]
+                for zoom in range(MAX_CLUSTER_ZOOM + 1)
+            }
+
+        incremental = snapshot()
+        rebuild_clusters()
+        rebuilt = snapshot()
+
+        assert incremental.keys() == rebuilt.keys()
+        for key, features in incremental.items():
+            assert [f["id"] for f in features] == [f["id"] for f in rebuilt[key]]
+            assert [f["properties"] for f in features] == [
+                f["properties"] for f in rebuilt[key]
+            ]
+        # The moved place sits apart from the rest even at zoom 0
+        assert [f["properties"]["point_count"] for f in rebuilt[None, 0]] == [10, 1]
+
+    def test_bulk_writes_rebuild_clusters(self, tmp_path):
+        """Test that imported places are clustered by the queued rebuild"""
+        path = tmp_path / "places.csv"
+        path.write_text(
+            "name,subtitle,longitude,latitude,category,rating\n"
+            "A,Sub,2.0,48.0,city,4.0\n"
+            "B,Sub,2.2,48.2,nature,4.5\n"
+        )
+        call_command("import_places", str(path), verbosity=0)
+
+        assert not PlaceCluster.objects.exists()
+        features = self.get_features(zoom="2")
+        assert [f["properties"]["point_count"] for f in features] == [2]
+
+    def test_unbuilt_table_clusters_places_directly(self):
+        """Test that clusters are computed and a rebuild queued before a build"""
+        self.create_place(2.0, 48.0, rating=3.0)
+        self.create_place(2.2, 48.2, rating=4.5, category="city")
+        self.create_place(-74.0, 40.7, rating=5.0)
+        PlaceCluster.objects.all().delete()
+        Job.objects.all().delete()
+
+        response = self.client.get(self.url, {"cluster": "true", "zoom": "2"})
+        features = response.json()["features"]
+        assert sorted(f["properties"]["point_count"] for f in features) == [1, 2]
+        response = self.client.get(
+            self.url,
+            {"cluster": "true", "zoom": "2", "category": "city", "bbox": "0,40,10,50"},
+        )
+        assert [
+            f["properties"]["point_count"] for f in response.json()["features"]
+        ] == [1]
+        assert Job.objects.filter(name="rebuild_clusters").count() == 1
+
+        assert [f["properties"] for f in self.get_features(zoom="2")] == [
+            f["properties"] for f in features
+        ]
+        assert PlaceCluster.objects.exists()
+
+    def test_updates_on_unbuilt_table_rebuild(self):
+        """Test that a place update before the first build counts every place"""
+        self.create_place(2.0, 48.0, rating=3.0)
+        self.create_place(2.2, 48.2, rating=4.5)
+        run_pending_jobs()
+        PlaceCluster.objects.all().delete()
+
+        self.create_place(2.1, 48.1, rating=4.0)
+        features = self.get_features(zoom="0")
+
+        assert [f["properties"]["point_count"] for f in features] == [3]
+
+    def test_cluster_requires_zoom(self):
+        """Test that clustering without a zoom level is rejected"""
+        response = self.client.get(self.url, {"cluster": "true"})
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "zoom" in response.data
+
+    def test_high_zoom_returns_places(self):
+        """Test that zooms past the clustering range return plain features"""
+        place = self.create_place(2.0, 48.0, rating=3.0)
+
+        features = self.get_features(zoom="16")
+
+        assert [feature["id"] for feature in features] == [place.id]
+        assert "cluster" not in features[0]["properties"]
+
+
+@pytest.fixture(params=["locmem", "filebased"])
+def cache_backend(request, tmp_path, settings):
+    """Run a test against both the local-memory and file-based cache backends"""
+    if request.param == "locmem":
+        settings.CACHES = {
+            "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+        }
+    else:
+        settings.CACHES = {
+            "default": {
+                "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+                "LOCATION": str(tmp_path / "cache"),
+            }
+        }
+    cache.clear()
+    yield request.param
+    cache.clear()
+
+
+@pytest.mark.django_db
+class TestGeoJSONResponseCache:
+    """Tests for the versioned GeoJSON response cache"""
+
+    def setup_method(self):
+        self.client = APIClient()
+        self.url = reverse("geojson")
+
+    def get_names(self, **params):
+        response = self.client.get(self.url, params)
+        assert response.status_code == status.HTTP_200_OK
+        return [f["properties"]["name"] for f in response.json()["features"]]
+
+    def test_repeated_request_is_cached(self, cache_backend, django_assert_num_queries):
+        """Test that an unchanged collection is served without queries"""
+        create_places(3)
+        first = self.client.get(self.url).content
+
+        with django_assert_num_queries(0):
+            assert self.client.get(self.url).content == first
+
+    def test_cache_keyed_by_query_params(self, cache_backend):
+        """Test that category and bbox results are cached separately"""
+        create_places(1)
+        Place.objects.create(
+            name="City",
+            subtitle="Subtitle",
+            description="Description",
+            longitude=2,
+            latitude=48,
+            category="city",
+        )
+
+        assert len(self.get_names()) == 2
+        assert self.get_names(category="city") == ["City"]
+        assert self.get_names(bbox="0,40,10,50") == ["City"]
+
+    @pytest.mark.django_db(transaction=True)
+    def test_place_changes_invalidate_cache(self, cache_backend):
+        """Test that saving or deleting a place bumps the places version"""
+        place = create_places(1)[0]
+        assert self.get_names() == ["Place 0"]
+
+        place.name = "Renamed"
+        place.save()
+        assert self.get_names() == ["Renamed"]
+
+        place.delete()
+        assert self.get_names() == []
+
+    @pytest.mark.django_db(transaction=True)
+    def test_image_changes_invalidate_cache(self, cache_backend):
+        """Test that saving or deleting an image bumps the places version"""
+        place = create_places(1, with_thumbnails=False)[0]
+        self.client.get(self.url)
+
+        image = PlaceImage.objects.create(
+            place=place, image="place_pics/new.jpg", is_thumbnail=True
+        )
+        response = self.client.get(self.url)
+        assert response.json()["features"][0]["properties"]["thumbnail_url"] == (
+            "http://testserver/media/place_pics/new.jpg"
+        )
+
+        image.delete()
+        response = self.client.get(self.url)
+        assert response.json()["features"][0]["properties"]["thumbnail_url"] is None
+
+    @pytest.mark.django_db(transaction=True)
+    def test_version_bumped_after_commit(self, cache_backend):
+        """Test that reads during a write's transaction cannot cache it as new"""
+        place = create_places(1)[0]
+        version = get_places_version()
+
+        with transaction.atomic():
+            place.name = "Renamed"
+            place.save()
+            # Whatever another request reads now is still cached under the
+            # old version, so it is dropped once the rename commits
+            assert get_places_version() == version
+        assert get_places_version() != version
+
+    @pytest.mark.django_db(transaction=True)
+    def test_rolled_back_change_keeps_version(self, cache_backend):
+        """Test that a rolled back write does not invalidate the cache"""
+        place = create_places(1)[0]
+        version = get_places_version()
+
+        with pytest.raises(RuntimeError), transaction.atomic():
+            place.delete()
+            raise RuntimeError
+        assert get_places_version() == version
+
+    def test_per_process_cache_is_refused(self, settings, tmp_path):
+        """Test that a cache private to each process is refused outside tests"""
+        settings.REQUIRE_SHARED_CACHE = True
+        with pytest.raises(ImproperlyConfigured):
+            require_shared_cache()
+
+        settings.CACHES = {
+            "default": {
+                "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+                "LOCATION": str(tmp_path / "cache"),
+            }
+        }
+        require_shared_cache()
+
+
+@pytest.mark.django_db
+class TestGeoJSONStreaming:
+    """Tests for the stream=true mode of the GeoJSON endpoint"""
+
+    def setup_method(self):
+        self.client = APIClient()
+        self.url = reverse("geojson")
+
+    def get_streamed(self, **params):
+        response = self.client.get(self.url, {"stream": "true", **params})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.streaming
+        assert response["Content-Type"] == "application/json"
+        return b"".join(response.streaming_content)
+
+    @pytest.mark.parametrize("count", [0, 1, 7])
+    def test_stream_matches_rendered_collection(self, count, monkeypatch):
+        """Test that streamed bytes equal the regular response across chunks"""
+        monkeypatch.setattr("posts.streaming.STREAM_CHUNK_SIZE", 3)
+        create_places(count)
+        Place.objects.filter(pk__in=Place.objects.values("pk")[:1]).update(
+            name="Café   «unicode»"
+        )
+
+        expected = self.client.get(self.url).content
+
+        assert self.get_streamed() == expected
+
+    def test_stream_applies_filters(self):
+        """Test that streaming honours the same filters as the list"""
+        create_places(5)
+
+        expected = self.client.get(self.url, {"zoom": "0", "bbox": "-180,-90,0,0"})
+
+        assert self.get_streamed(zoom="0", bbox="-180,-90,0,0") == expected.content
+
+    def test_stream_rejects_invalid_parameters(self):
+        """Test that invalid filters fail before streaming starts"""
+        response = self.client.get(self.url, {"stream": "true", "bbox": "bad"})
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+class TestGeoJSONFastPath:
+    """Tests that the fast path matches PlaceGeoJSONSerializer byte for byte"""
+
+    def setup_method(self):
+        self.request = Request(APIRequestFactory().get("/api/v1/geojson/"))
+        places = create_places(4)
+        create_places(1, with_thumbnails=False)
+        tricky = [
+            # Python writes these floats in exponent form, orjson does not
+            {"longitude": 0.00001, "latitude": -3e-07},
+            {"name": "Line\u2028separator", "subtitle": "Para\u2029graph"},
+            {"name": "Café «ünïcödé» 東京", "rating": None},
+            {"longitude": 179.99999999999997, "latitude": -89.123456789},
+        ]
+        for place, values in zip(places, tricky):
+            Place.objects.filter(pk=place.pk).update(**values)
+        # File names the URL shortcut must leave to the storage
+        for place, name in zip(places, ["ümlaut photo.jpg", "a..b.jpg", "c%20.jpg"]):
+            place.images.filter(is_thumbnail=True).update(
+                image=f"place_pics/{place.id}/{name}"
+            )
+
+    def render_with_serializer(self, queryset):
+        serializer = PlaceGeoJSONSerializer(
+            queryset, many=True, context={"request": self.request}
+        )
+        return JSONRenderer().render(
+            {"type": "FeatureCollection", "features": serializer.data}
+        )
+
+    @pytest.mark.parametrize("use_orjson", [True, False])
+    def test_output_is_byte_for_byte_compatible(self, use_orjson, monkeypatch):
+        """Test the fast path with and without orjson against the serializer"""
+        if not use_orjson:
+            monkeypatch.setattr("posts.geojson.orjson", None)
+        queryset = Place.objects.with_thumbnail().order_by("-rating", "id")
+
+        fast = encode_feature_collection(iter_features(queryset, self.request))
+
+        assert fast == self.render_with_serializer(queryset)
+
+    def test_iterator_chunks_match(self):
+        """Test that chunked iteration yields the same features"""
+        queryset = Place.objects.with_thumbnail().order_by("id")
+
+        chunked = list(iter_features(queryset, self.request, chunk_size=2))
+
+        assert chunked == list(iter_features(queryset, self.request))
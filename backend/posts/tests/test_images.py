@@ -0,0 +1,250 @@
+from io import BytesIO
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.urls import reverse
+from PIL import Image as PillowImage
+from posts.images import VARIANTS
+from posts.jobs import run_pending_jobs
+from posts.models import ImageFile, ImageFileQuerySet, Job, PlaceImage
+from posts.storage import ContentAddressedStorage
+from posts.tests.factories import PlaceFactory
+from rest_framework import status
+from rest_framework.test import APIClient
+
+EXIF_ORIENTATION = 0x0112
+
+
+def create_upload(size=(1200, 900), orientation=None, name="photo.jpg"):
+    """Create a JPEG upload, optionally tagged with an EXIF orientation"""
+    image = PillowImage.new("RGB", size, color="blue")
+    exif = PillowImage.Exif()
+    exif[0x010F] = "Test Camera"
+    if orientation:
+        exif[EXIF_ORIENTATION] = orientation
+    buffer = BytesIO()
+    image.save(buffer, format="JPEG", exif=exif)
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type="image/jpeg")
+
+
+def open_variant(image, variant, image_format):
+    with image.image.storage.open(image.variants[variant][image_format]) as file:
+        opened = PillowImage.open(file)
+        opened.load()
+        return opened
+
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    return tmp_path
+
+
+@pytest.mark.django_db
+class TestImageVariants:
+    """Tests for the derivative images generated on upload"""
+
+    def setup_method(self):
+        self.place = PlaceFactory()
+
+    def create_image(self, **kwargs):
+        image = PlaceImage.objects.create(
+            place=self.place, image=create_upload(**kwargs), is_thumbnail=True
+        )
+        run_pending_jobs()
+        image.refresh_from_db()
+        return image
+
+    def test_every_variant_is_generated(self):
+        """Test that each variant exists as JPEG and WebP within its bounds"""
+        image = self.create_image()
+
+        assert image.status == PlaceImage.READY
+        assert set(image.variants) == set(VARIANTS)
+        for variant, (width, height, crop) in VARIANTS.items():
+            jpeg = open_variant(image, variant, "jpeg")
+            webp = open_variant(image, variant, "webp")
+            assert jpeg.format == "JPEG"
+            assert webp.format == "WEBP"
+            assert jpeg.size == webp.size
+            if crop:
+                assert jpeg.size == (width, height)
+            else:
+                assert jpeg.width <= width and jpeg.height <= height
+
+    def test_aspect_ratio_is_kept(self):
+        """Test that non-cropped variants keep the original aspect ratio"""
+        image = self.create_image(size=(2000, 1000))
+
+        assert open_variant(image, "card", "jpeg").size == (800, 400)
+        assert open_variant(image, "full", "jpeg").size == (1600, 800)
+
+    def test_exif_orientation_is_applied_and_stripped(self):
+        """Test that rotated photos are upright and carry no metadata"""
+        # Orientation 6: stored landscape, displayed rotated 90 degrees
+        image = self.create_image(size=(1000, 500), orientation=6)
+
+        for image_format in ("jpeg", "webp"):
+            card = open_variant(image, "card", image_format)
+            assert card.size == (300, 600)
+            assert not card.getexif()
+            assert "exif" not in card.info
+
+    def test_unreadable_upload_has_no_variants(self):
+        """Test that files Pillow cannot read are stored without derivatives"""
+        upload = SimpleUploadedFile("broken.jpg", b"not an image")
+        image = PlaceImage.objects.create(place=self.place, image=upload)
+        run_pending_jobs()
+
+        image.refresh_from_db()
+        assert image.status == PlaceImage.FAILED
+        assert image.variants == {}
+        assert not Job.objects.exists()
+
+    def test_upload_returns_before_processing(self):
+        """Test that uploads are stored as pending and processed by the worker"""
+        image = PlaceImage.objects.create(place=self.place, image=create_upload())
+
+        assert image.status == PlaceImage.PENDING
+        assert image.variants == {}
+        assert image.image.storage.exists(image.image.name)
+        assert Job.objects.filter(name="process_place_image").count() == 1
+
+        run_pending_jobs()
+
+        image.refresh_from_db()
+        assert image.status == PlaceImage.READY
+
+    def test_files_are_deleted_in_the_background(self):
+        """Test that deleting an image queues removal of all of its files"""
+        image = self.create_image()
+        storage = image.image.storage
+        names = [image.image.name] + [
+            name for formats in image.variants.values() for name in formats.values()
+        ]
+
+        image.delete()
+
+        assert all(storage.exists(name) for name in names)
+        run_pending_jobs()
+        assert not any(storage.exists(name) for name in names)
+
+    def test_api_exposes_variants(self):
+        """Test that the detail and GeoJSON endpoints point at derivatives"""
+        image = self.create_image()
+        client = APIClient()
+
+        detail = client.get(reverse("place_detail", args=[self.place.id]))
+        geojson = client.get(reverse("geojson"))
+
+        assert detail.status_code == status.HTTP_200_OK
+        variants = detail.data["images"][0]["variants"]
+        assert set(variants) == set(VARIANTS)
+        assert variants["thumb"]["webp"].endswith(image.variants["thumb"]["webp"])
+        thumbnail_url = geojson.json()["features"][0]["properties"]["thumbnail_url"]
+        assert thumbnail_url.endswith(image.variants["thumb"]["jpeg"])
+
+
+@pytest.mark.django_db
+class TestContentAddressedImages:
+    """Tests for storing identical uploads once"""
+
+    def upload(self, place, color="blue"):
+        image = PillowImage.new("RGB", (400, 300), color=color)
+        buffer = BytesIO()
+        image.save(buffer, format="JPEG")
+        upload = SimpleUploadedFile("photo.jpg", buffer.getvalue())
+        return PlaceImage.objects.create(place=place, image=upload)
+
+    def stored_files(self, media_root):
+        return sorted(
+            path.relative_to(media_root).as_posix()
+            for path in media_root.rglob("*")
+            if path.is_file()
+        )
+
+    def test_duplicates_share_one_file(self, media_root):
+        """Test that identical bytes uploaded twice are stored once"""
+        first = self.upload(PlaceFactory())
+        second = self.upload(PlaceFactory())
+        different = self.upload(PlaceFactory(), color="red")
+
+        assert first.checksum and first.checksum == second.checksum
+        assert first.image.name == second.image.name
+        assert (
+            first.image.name == f"place_pics/{first.checksum[:2]}/{first.checksum}.jpg"
+        )
+        assert different.image.name != first.image.name
+        assert len(self.stored_files(media_root)) == 2
+
+    def test_duplicates_reuse_derivatives(self, media_root):
+        """Test that a duplicate's variants are shared rather than regenerated"""
+        first = self.upload(PlaceFactory())
+        run_pending_jobs()
+        files = self.stored_files(media_root)
+
+        second = self.upload(PlaceFactory())
+        run_pending_jobs()
+
+        first.refresh_from_db()
+        second.refresh_from_db()
+        assert second.status == PlaceImage.READY
+        assert second.variants == first.variants
+        assert self.stored_files(media_root) == files
+
+    def test_files_are_kept_until_the_last_reference_goes(self, media_root):
+        """Test that deleting one of two duplicates keeps the shared files"""
+        first = self.upload(PlaceFactory())
+        second = self.upload(PlaceFactory())
+        run_pending_jobs()
+        files = self.stored_files(media_root)
+
+        first.delete()
+        run_pending_jobs()
+        assert self.stored_files(media_root) == files
+
+        second.delete()
+        run_pending_jobs()
+        assert self.stored_files(media_root) == []
+
+    def test_reupload_before_deletion_keeps_the_file(self, media_root):
+        """Test that a queued deletion spares a file uploaded again meanwhile"""
+        place = PlaceFactory()
+        self.upload(place).delete()
+        again = self.upload(place)
+
+        run_pending_jobs()
+
+        assert again.image.storage.exists(again.image.name)
+
+    def test_file_is_locked_before_it_is_checked(self, media_root, monkeypatch):
+        """Test that uploads and deletions lock the file before touching it"""
+        calls = []
+        lock, save, delete = (
+            ImageFileQuerySet.lock,
+            ContentAddressedStorage._save,
+            ContentAddressedStorage.delete,
+        )
+
+        def record(call, method):
+            def wrapper(self, names, *args):
+                names = list(names) if call == "lock" else names
+                calls.append((call, names))
+                return method(self, names, *args)
+
+            return wrapper
+
+        monkeypatch.setattr(ImageFileQuerySet, "lock", record("lock", lock))
+        monkeypatch.setattr(ContentAddressedStorage, "_save", record("save", save))
+        monkeypatch.setattr(ContentAddressedStorage, "delete", record("delete", delete))
+
+        image = self.upload(PlaceFactory())
+        name = image.image.name
+        assert calls == [("lock", [name]), ("save", name)]
+        assert ImageFile.objects.filter(name=name).exists()
+
+        calls.clear()
+        image.delete()
+        run_pending_jobs()
+        assert calls[:2] == [("lock", [name]), ("delete", name)]
+        assert not ImageFile.objects.exists()
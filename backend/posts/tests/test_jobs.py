@@ -0,0 +1,104 @@
+from datetime import timedelta
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+from posts import jobs
+from posts.models import Job, PlaceImage
+from posts.tests.factories import PlaceFactory
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    """Register test tasks, returning the payloads they were called with"""
+    calls = []
+    monkeypatch.setattr(jobs, "TASKS", dict(jobs.TASKS))
+
+    @jobs.task("record")
+    def record(**payload):
+        calls.append(payload)
+
+    @jobs.task("explode", max_attempts=2, on_failure=lambda **p: calls.append(p))
+    def explode(**payload):
+        raise RuntimeError("boom")
+
+    return calls
+
+
+@pytest.mark.django_db
+class TestJobQueue:
+    """Tests for the database-backed job queue"""
+
+    def test_successful_jobs_run_once_and_are_removed(self, calls):
+        """Test that a job runs with its payload and is then deleted"""
+        jobs.enqueue("record", value=1)
+        jobs.enqueue("record", value=2)
+
+        assert jobs.run_pending_jobs() == 2
+        assert jobs.run_pending_jobs() == 0
+        assert calls == [{"value": 1}, {"value": 2}]
+        assert not Job.objects.exists()
+
+    def test_failed_jobs_are_retried_with_backoff(self, calls):
+        """Test that a failure schedules a later retry until attempts run out"""
+        job = jobs.enqueue("explode", value=1)
+
+        assert jobs.run_pending_jobs() == 1
+        job.refresh_from_db()
+        assert job.status == Job.PENDING
+        assert job.attempts == 1
+        assert job.run_at > timezone.now()
+        assert "boom" in job.last_error
+        assert jobs.run_pending_jobs() == 0
+
+        Job.objects.update(run_at=timezone.now())
+        jobs.run_pending_jobs()
+
+        job.refresh_from_db()
+        assert job.status == Job.FAILED
+        assert job.attempts == 2
+        assert calls == [{"value": 1}]
+
+    def test_unknown_task_fails(self):
+        """Test that a job without a registered handler fails immediately"""
+        job = Job.objects.create(name="missing")
+
+        jobs.run_pending_jobs()
+
+        job.refresh_from_db()
+        assert job.status == Job.FAILED
+        assert "missing" in job.last_error
+
+    def test_claimed_jobs_are_not_handed_out_twice(self, calls):
+        """Test that a running job is skipped by other workers until it times out"""
+        jobs.enqueue("record", value=1)
+        claimed = jobs.claim_next_job()
+
+        assert claimed.status == Job.RUNNING
+        assert jobs.claim_next_job() is None
+
+        stale = timezone.now() - timedelta(seconds=jobs.JOB_TIMEOUT + 1)
+        Job.objects.update(updated_at=stale)
+        assert jobs.claim_next_job().id == claimed.id
+
+    def test_image_marked_failed_after_last_attempt(self, monkeypatch):
+        """Test that an image whose processing keeps failing is marked failed"""
+        image = PlaceImage.objects.create(
+            place=PlaceFactory(), image="place_pics/missing.jpg"
+        )
+        monkeypatch.setattr(jobs, "RETRY_DELAY", 0)
+
+        # The file does not exist, so every attempt raises
+        jobs.run_pending_jobs()
+
+        image.refresh_from_db()
+        assert image.status == PlaceImage.FAILED
+        assert Job.objects.get().status == Job.FAILED
+
+    def test_process_jobs_command(self, calls):
+        """Test that the worker command drains the queue with --once"""
+        jobs.enqueue("record", value=1)
+
+        call_command("process_jobs", "--once")
+
+        assert calls == [{"value": 1}]
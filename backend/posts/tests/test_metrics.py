@@ -0,0 +1,186 @@
+import asyncio
+import logging
+import re
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.core.handlers.asgi import ASGIHandler
+from django.urls import reverse
+from posts.metrics import percentile, registry
+from posts.tests.factories import PlaceFactory, UserFactory
+from rest_framework import status
+from rest_framework.test import APIClient
+
+SERVER_TIMING = re.compile(
+    r'db;dur=[\d.]+;desc="(\d+) queries", serialize;dur=[\d.]+, total;dur=[\d.]+'
+)
+
+
+@pytest.fixture(autouse=True)
+def metrics_middleware(settings):
+    settings.MIDDLEWARE = ["posts.middleware.MetricsMiddleware", *settings.MIDDLEWARE]
+    registry.reset()
+    yield
+    registry.reset()
+
+
+async def asgi_get(application, path):
+    """GET ``path`` from an ASGI application, returning (headers, body)."""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"host", b"testserver")],
+        "server": ("testserver", 80),
+        "client": ("127.0.0.1", 0),
+    }
+    messages = []
+    requests = [{"type": "http.request", "body": b"", "more_body": False}]
+
+    async def receive():
+        if not requests:
+            # The client stays connected until the response is done
+            await asyncio.Future()
+        return requests.pop()
+
+    async def send(message):
+        messages.append(message)
+
+    await application(scope, receive, send)
+    headers = {
+        name.decode().lower(): value.decode() for name, value in messages[0]["headers"]
+    }
+    body = b"".join(message.get("body", b"") for message in messages[1:])
+    return headers, body
+
+
+def view_metrics(view, method="GET"):
+    for entry in registry.snapshot():
+        if entry["view"] == view and entry["method"] == method:
+            return entry
+    return None
+
+
+@pytest.mark.django_db
+class TestMetricsMiddleware:
+    """Tests for the opt-in request metrics middleware"""
+
+    def setup_method(self):
+        self.client = APIClient()
+
+    def test_server_timing_header(self, django_assert_num_queries):
+        """Test that responses report their query count and timings"""
+        PlaceFactory.create_batch(3)
+
+        with django_assert_num_queries(2) as context:
+            response = self.client.get(reverse("place_list"))
+
+        match = SERVER_TIMING.fullmatch(response.headers["Server-Timing"])
+        assert match
+        assert int(match.group(1)) == len(context.captured_queries)
+
+    def test_samples_are_recorded_per_view_and_method(self):
+        """Test that each view and method gets its own counts and sizes"""
+        PlaceFactory.create_batch(3)
+        for _ in range(3):
+            response = self.client.get(reverse("place_list"))
+        self.client.get(reverse("geojson"))
+
+        entry = view_metrics("posts.views.PlaceList")
+        assert entry["duration_ms"]["count"] == 3
+        assert entry["queries"]["p50"] == 2
+        assert entry["response_bytes"]["p99"] == len(response.content)
+        assert entry["db_ms"]["sum"] <= entry["duration_ms"]["sum"]
+        assert entry["serialize_ms"]["p50"] > 0
+        assert view_metrics("posts.views.PlaceGeoJSONView")["duration_ms"]["count"] == 1
+        assert view_metrics("posts.views.PlaceList", "POST") is None
+
+    def test_streamed_responses_have_no_size(self):
+        """Test that streamed responses are timed without reading their body"""
+        self.client.get(reverse("geojson"), {"stream": "true"})
+
+        entry = view_metrics("posts.views.PlaceGeoJSONView")
+        assert entry["duration_ms"]["count"] == 1
+        assert "response_bytes" not in entry
+
+    @pytest.mark.django_db(transaction=True)
+    def test_async_views_under_asgi(self, settings, caplog):
+        """Test that async views stay async under ASGI and their queries count"""
+        settings.DEBUG = True
+        caplog.set_level(logging.DEBUG, logger="django.request")
+        place = PlaceFactory()
+        path = reverse("async_place_detail", args=[place.pk])
+
+        headers, body = async_to_sync(asgi_get)(ASGIHandler(), path)
+
+        assert "adapted for middleware posts.middleware.MetricsMiddleware" not in (
+            caplog.text
+        )
+        match = SERVER_TIMING.fullmatch(headers["server-timing"])
+        assert match
+        assert int(match.group(1)) > 0
+        entry = view_metrics("posts.async_views.AsyncPlaceDetailView")
+        assert entry["queries"]["p50"] == int(match.group(1))
+        assert entry["response_bytes"]["p50"] == len(body)
+
+    def test_unresolved_requests_are_not_recorded(self):
+        self.client.get("/no/such/path/")
+
+        assert registry.snapshot() == []
+
+
+@pytest.mark.django_db
+class TestMetricsView:
+    """Tests for the staff-only metrics report"""
+
+    def setup_method(self):
+        self.client = APIClient()
+        self.url = reverse("metrics")
+        self.client.force_authenticate(UserFactory(is_staff=True))
+
+    def test_staff_only(self):
+        """Test that other users cannot read the metrics"""
+        client = APIClient()
+        assert client.get(self.url).status_code == status.HTTP_401_UNAUTHORIZED
+        client.force_authenticate(UserFactory())
+        assert client.get(self.url).status_code == status.HTTP_403_FORBIDDEN
+
+    def test_json_report(self):
+        """Test that the report lists percentiles of every measurement"""
+        self.client.get(reverse("place_list"))
+
+        response = self.client.get(self.url)
+
+        assert response.status_code == status.HTTP_200_OK
+        entry = next(e for e in response.json() if e["view"] == "posts.views.PlaceList")
+        assert set(entry["duration_ms"]) == {"count", "sum", "p50", "p95", "p99"}
+
+    def test_prometheus_report(self):
+        """Test that the report is available in the Prometheus text format"""
+        PlaceFactory()
+        self.client.get(reverse("place_list"))
+
+        response = self.client.get(self.url, {"format": "prometheus"})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response["Content-Type"].startswith("text/plain")
+        text = response.content.decode()
+        assert "# TYPE mapmates_request_duration_seconds summary" in text
+        labels = 'view="posts.views.PlaceList",method="GET"'
+        assert f'mapmates_request_db_queries{{{labels},quantile="0.5"}} 2' in text
+        assert f"mapmates_request_db_queries_count{{{labels}}} 1" in text
+
+
+def test_percentile_uses_nearest_rank():
+    values = list(range(1, 101))
+
+    assert percentile(values, 0.5) == 50
+    assert percentile(values, 0.95) == 95
+    assert percentile(values, 0.99) == 99
+    assert percentile([7], 0.99) == 7
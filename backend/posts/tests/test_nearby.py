@@ -0,0 +1,118 @@
+import pytest
+from django.urls import reverse
+from posts import nearby
+from posts.models import Place, PlaceImage
+from posts.nearby import haversine_km
+from posts.tests.factories import PlaceFactory
+from rest_framework import status
+from rest_framework.test import APIClient
+
+# Offsets from the search point, in degrees of latitude (~111km each)
+OFFSETS = [0.001, 0.01, 0.05, 0.2, 1.0]
+
+
+@pytest.mark.django_db
+class TestNearbyPlacesView:
+    """Tests for the nearest places endpoint"""
+
+    def setup_method(self):
+        self.client = APIClient()
+        self.url = reverse("nearby")
+        self.places = [
+            PlaceFactory(longitude=13.4, latitude=52.5 + offset) for offset in OFFSETS
+        ]
+
+    def get(self, **params):
+        params = {"lat": 52.5, "lon": 13.4, **params}
+        response = self.client.get(self.url, params)
+        assert response.status_code == status.HTTP_200_OK, response.data
+        return response.json()["features"]
+
+    def test_nearest_first_within_radius(self):
+        """Test that places come nearest first and stop at the radius"""
+        features = self.get(radius_km=30)
+
+        assert [feature["id"] for feature in features] == [
+            place.id for place in self.places[:4]
+        ]
+        distances = [feature["properties"]["distance_km"] for feature in features]
+        assert distances == sorted(distances)
+        assert distances[-1] == pytest.approx(22.24, abs=0.01)
+
+    def test_limit(self):
+        """Test that only the nearest ``limit`` places are returned"""
+        features = self.get(radius_km=500, limit=2)
+
+        assert [feature["id"] for feature in features] == [
+            place.id for place in self.places[:2]
+        ]
+
+    def test_search_expands_until_limit(self, monkeypatch):
+        """Test that a far place is found once the search circle has grown"""
+        monkeypatch.setattr(nearby, "INITIAL_RADIUS_KM", 0.01)
+
+        features = self.get(radius_km=200, limit=5)
+
+        assert len(features) == 5
+
+    def test_feature_shape(self):
+        """Test that features match the GeoJSON endpoint's, plus a distance"""
+        PlaceImage.objects.create(
+            place=self.places[0], image="place_pics/near.jpg", is_thumbnail=True
+        )
+        nearest = self.get(limit=1)[0]
+        collection = self.client.get(reverse("geojson")).json()
+        expected = next(f for f in collection["features"] if f["id"] == nearest["id"])
+
+        distance = nearest["properties"].pop("distance_km")
+        assert nearest == expected
+        assert distance == pytest.approx(0.111, abs=0.001)
+
+    def test_candidates_use_quadkey_ranges(self, django_assert_max_num_queries):
+        """Test that every search circle narrows candidates by their quadkeys"""
+        with django_assert_max_num_queries(5) as context:
+            features = self.get(radius_km=30, limit=2)
+
+        assert len(features) == 2
+        assert all('"quadkey" >=' in query["sql"] for query in context.captured_queries)
+
+    def test_places_without_quadkey_are_found(self):
+        """Test that places saved before the backfill still match"""
+        Place.objects.update(quadkey=None)
+
+        assert len(self.get(radius_km=30)) == 4
+
+    def test_across_the_antimeridian(self):
+        """Test that places across the antimeridian are found"""
+        east = PlaceFactory(longitude=179.95, latitude=0)
+        west = PlaceFactory(longitude=-179.95, latitude=0)
+
+        features = self.get(lat=0, lon=179.99, radius_km=20)
+
+        assert [feature["id"] for feature in features] == [east.id, west.id]
+
+    @pytest.mark.parametrize(
+        "params",
+        [
+            {"lat": None},
+            {"lat": "abc"},
+            {"lon": 200},
+            {"radius_km": -1},
+            {"limit": 0},
+            {"limit": 1000},
+        ],
+    )
+    def test_invalid_parameters(self, params):
+        """Test that missing or out of range parameters are rejected"""
+        params = {"lat": 52.5, "lon": 13.4, **params}
+        params = {key: value for key, value in params.items() if value is not None}
+
+        response = self.client.get(self.url, params)
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert set(response.data) & {"lat", "lon", "radius_km", "limit"}
+
+
+def test_haversine_km():
+    """Test the distance between Paris and London"""
+    assert haversine_km(2.3522, 48.8566, -0.1276, 51.5072) == pytest.approx(343.5, 0.01)
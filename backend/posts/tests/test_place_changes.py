@@ -0,0 +1,135 @@
+from datetime import timedelta
+
+import pytest
+from django.urls import reverse
+from django.utils import timezone
+from posts.models import PlaceChange, PlaceImage
+from posts.tests.factories import PlaceFactory
+from rest_framework import status
+from rest_framework.test import APIClient
+
+
+@pytest.mark.django_db
+class TestPlaceChangesView:
+    """Tests for the GeoJSON delta sync endpoint"""
+
+    def setup_method(self):
+        self.client = APIClient()
+        self.url = reverse("geojson_changes")
+        self.place = PlaceFactory()
+
+    def get_changes(self, since=None):
+        params = {} if since is None else {"since": since}
+        response = self.client.get(self.url, params)
+        assert response.status_code == status.HTTP_200_OK
+        return response.data
+
+    def upserted_ids(self, data):
+        return [feature["id"] for feature in data["upserted"]["features"]]
+
+    def age_changes(self):
+        """Move every logged change out of the overlap window"""
+        PlaceChange.objects.update(created_at=timezone.now() - timedelta(hours=1))
+
+    def test_initial_sync_returns_everything(self):
+        """Test that omitting since returns every place and a cursor"""
+        other = PlaceFactory()
+
+        data = self.get_changes()
+
+        assert sorted(self.upserted_ids(data)) == sorted([self.place.id, other.id])
+        assert data["deleted"] == []
+        assert data["cursor"] > 0
+
+    def test_old_changes_are_not_sent_again(self):
+        """Test that changes older than the overlap before the cursor are skipped"""
+        self.age_changes()
+        other = PlaceFactory()
+        cursor = self.get_changes()["cursor"]
+
+        data = self.get_changes(cursor)
+
+        # Only the cursor's own change is within the overlap
+        assert self.upserted_ids(data) == [other.id]
+        assert data["deleted"] == []
+        assert data["cursor"] == cursor
+
+    def test_created_and_updated_places_are_upserted(self):
+        """Test that new and edited places appear once in the delta"""
+        cursor = self.get_changes()["cursor"]
+        created = PlaceFactory()
+        self.place.name = "Renamed"
+        self.place.save()
+        self.place.save()
+
+        data = self.get_changes(cursor)
+
+        assert sorted(self.upserted_ids(data)) == sorted([self.place.id, created.id])
+        assert data["deleted"] == []
+        assert data["cursor"] > cursor
+
+    def test_image_changes_upsert_their_place(self):
+        """Test that adding an image re-sends the place with its thumbnail"""
+        self.age_changes()
+        cursor = self.get_changes()["cursor"]
+        PlaceImage.objects.create(
+            place=self.place, image="place_pics/new.jpg", is_thumbnail=True
+        )
+
+        data = self.get_changes(cursor)
+
+        assert self.upserted_ids(data) == [self.place.id]
+        feature = data["upserted"]["features"][0]
+        assert feature["properties"]["thumbnail_url"].endswith("place_pics/new.jpg")
+
+    def test_deleted_places_are_reported(self):
+        """Test that deleted places are returned as ids, not features"""
+        cursor = self.get_changes()["cursor"]
+        place_id = self.place.id
+        self.place.delete()
+
+        data = self.get_changes(cursor)
+
+        assert self.upserted_ids(data) == []
+        assert data["deleted"] == [place_id]
+
+    def test_invalid_cursor(self):
+        """Test that a non-integer cursor is rejected"""
+        response = self.client.get(self.url, {"since": "abc"})
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "since" in response.data
+
+    def test_recent_changes_are_sent_again(self):
+        """Test that changes within the overlap before the cursor are re-sent"""
+        cursor = self.get_changes()["cursor"]
+
+        data = self.get_changes(cursor)
+
+        assert self.upserted_ids(data) == [self.place.id]
+        assert data["cursor"] == cursor
+
+    def test_late_commit_below_cursor_is_delivered(self):
+        """Test that a change committing after a higher id is not skipped"""
+        self.age_changes()
+        late = PlaceFactory()
+        # The late write logged its change first, but has not committed yet
+        # when another write commits and a client syncs
+        pending = list(PlaceChange.objects.filter(place_id=late.id))
+        PlaceChange.objects.filter(place_id=late.id).delete()
+        other = PlaceFactory()
+        data = self.get_changes()
+        cursor = data["cursor"]
+        assert all(change.id < cursor for change in pending)
+
+        # Now the late write commits, with the ids and times it was given
+        for change in pending:
+            PlaceChange.objects.create(id=change.id, place_id=change.place_id)
+            PlaceChange.objects.filter(id=change.id).update(
+                created_at=change.created_at
+            )
+
+        data = self.get_changes(cursor)
+
+        assert late.id in self.upserted_ids(data)
+        assert other.id in self.upserted_ids(data)
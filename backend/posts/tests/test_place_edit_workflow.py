@@ -6,71 +6,22 @@
 
 from io import BytesIO
 
-import factory
 import pytest
-from django.contrib.auth import get_user_model
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import DatabaseError, connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from PIL import Image as PillowImage
-from posts.models import Place, PlaceImage
+from posts.models import Job, PlaceChange, PlaceImage
+from posts.tests.factories import PlaceFactory, PlaceImageFactory, UserFactory
 from rest_framework import status
 from rest_framework.test import APIClient
 
-User = get_user_model()
 
-
-class UserFactory(factory.django.DjangoModelFactory):
-    """Factory Boy factory class for creating User instances"""
-
-    class Meta:
-        model = User
-
-    username = factory.Sequence(lambda n: f"testuser{n}")
-    email = factory.LazyAttribute(lambda obj: f"{obj.username}@example.com")
-    first_name = factory.Faker("first_name")
-    last_name = factory.Faker("last_name")
-
-
-class PlaceFactory(factory.django.DjangoModelFactory):
-    """Factory for creating Place instances"""
-
-    class Meta:
-        model = Place
-
-    name = factory.Faker("city")
-    subtitle = factory.Faker("sentence", nb_words=4)
-    description = factory.Faker("text", max_nb_chars=200)
-    longitude = factory.Faker("longitude")
-    latitude = factory.Faker("latitude")
-    category = factory.Iterator(["nature", "city", "other"])
-    rating = factory.Faker("random_element", elements=[i * 0.5 for i in range(11)])
-    author = factory.SubFactory(UserFactory)
-
-
-class PlaceImageFactory(factory.django.DjangoModelFactory):
-    """Factory for creating PlaceImage instances"""
-
-    class Meta:
-        model = PlaceImage
-
-    place = factory.SubFactory(PlaceFactory)
-    caption = factory.Faker("sentence", nb_words=3)
-    is_thumbnail = False
-    order = factory.Sequence(lambda n: n)
-
-    # @factory.lazy_attribute generates a field(using logic, not a simple data type) when calling the factory  # noqa: E501
-    @factory.lazy_attribute
-    def image(self):
-        """Create a simple test image"""
-        image = PillowImage.new("RGB", (100, 100), color="red")
-        # Save image to an in-memory file (BytesIO)
-        temp_file = BytesIO()
-        image.save(temp_file, format="JPEG")
-        temp_file.seek(0)
-        # Return a Django SimpleUploadedFile instance(mimics a file upload)
-        return SimpleUploadedFile(
-            name="test_image.jpg", content=temp_file.read(), content_type="image/jpeg"
-        )
+@pytest.fixture(autouse=True)
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    return tmp_path
 
 
 # Pytest blocks tests from touching database unless explicitly marked @pytest.mark.django_db
@@ -427,6 +378,88 @@ class TestPlaceEditWorkflow:
         thumbnail_image = self.place.images.filter(is_thumbnail=True).first()
         assert thumbnail_image.caption == "New thumbnail"
 
+    def edit_images(self, place, count, delete=0):
+        """Delete ``delete`` images of ``place``, update the rest, add ``count``"""
+        existing = list(place.images.order_by("id"))
+        deleted, existing = existing[:delete], existing[delete:]
+        data = {
+            "name": place.name,
+            "subtitle": place.subtitle,
+            "description": place.description,
+            "longitude": place.longitude,
+            "latitude": place.latitude,
+            "category": place.category,
+            "rating": place.rating,
+            "existing_images_ids": [str(image.id) for image in existing],
+            "existing_images_captions": ["Updated"] * len(existing),
+            "existing_images_thumbnails": ["true"] + ["false"] * (len(existing) - 1),
+            "images_files": [
+                self.create_test_image_file(f"new{i}.jpg") for i in range(count)
+            ],
+            "images_captions": ["New"] * count,
+            "images_thumbnails": ["false"] * count,
+            "images_to_delete": [str(image.id) for image in deleted],
+        }
+        url = reverse("place_detail", kwargs={"pk": place.id})
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.put(url, data, format="multipart")
+        assert response.status_code == status.HTTP_200_OK
+        return len(queries)
+
+    def test_edit_place_query_count_is_constant(self):
+        """Test that editing, adding and deleting more images costs no extra queries"""
+        small = PlaceFactory(author=self.user)
+        large = PlaceFactory(author=self.user)
+        PlaceImageFactory.create_batch(2, place=small)
+        PlaceImageFactory.create_batch(20, place=large)
+        changes = PlaceChange.objects.count()
+        Job.objects.all().delete()
+
+        assert self.edit_images(small, 1, delete=1) == self.edit_images(
+            large, 10, delete=10
+        )
+        assert large.images.count() == 20
+        assert PlaceChange.objects.count() == changes + 2
+        deletions = Job.objects.filter(name="delete_image_files")
+        assert 1 <= deletions.count() <= 11
+        assert large.images.filter(caption="Updated").count() == 10
+        assert large.images.filter(caption="New").count() == 10
+        assert large.images.filter(is_thumbnail=True).count() == 1
+        assert Job.objects.filter(name="process_place_image").count() >= 10
+
+    def test_edit_place_is_atomic(self, monkeypatch):
+        """Test that a failure part way through leaves the place unchanged"""
+        image = PlaceImageFactory(place=self.place, caption="Original")
+        url = reverse("place_detail", kwargs={"pk": self.place.id})
+        data = {
+            "name": "Never saved",
+            "subtitle": self.place.subtitle,
+            "description": self.place.description,
+            "longitude": self.place.longitude,
+            "latitude": self.place.latitude,
+            "category": self.place.category,
+            "rating": self.place.rating,
+            "existing_images_ids": [str(image.id)],
+            "existing_images_captions": ["Changed"],
+            "existing_images_thumbnails": ["true"],
+            "images_files": [self.create_test_image_file()],
+            "images_captions": ["New"],
+            "images_thumbnails": ["false"],
+        }
+
+        def fail(*args, **kwargs):
+            raise DatabaseError("insert failed")
+
+        monkeypatch.setattr(PlaceImage.objects, "bulk_create", fail)
+        with pytest.raises(DatabaseError):
+            self.client.put(url, data, format="multipart")
+
+        image.refresh_from_db()
+        self.place.refresh_from_db()
+        assert image.caption == "Original"
+        assert self.place.name != "Never saved"
+        assert self.place.images.count() == 1
+
     def test_edit_place_response_structure(self):
         """Test full response structure after editing, adding and updating images"""
         existing_image_to_keep = PlaceImageFactory(
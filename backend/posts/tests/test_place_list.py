@@ -0,0 +1,76 @@
+import pytest
+from django.urls import reverse
+from posts.tests.factories import PlaceFactory, PlaceImageFactory, UserFactory
+from rest_framework import status
+from rest_framework.test import APIClient
+
+
+@pytest.mark.django_db
+class TestPlaceList:
+    """Tests for cursor pagination and sparse fieldsets on PlaceList"""
+
+    def setup_method(self):
+        self.client = APIClient()
+        self.url = reverse("place_list")
+
+    def create_places(self, count):
+        places = PlaceFactory.create_batch(count)
+        for place in places:
+            PlaceImageFactory(place=place, is_thumbnail=True)
+        return places
+
+    def test_pages_follow_created_at_and_id(self):
+        """Test that walking the cursor returns every place newest first"""
+        places = PlaceFactory.create_batch(5)
+
+        seen = []
+        response = self.client.get(self.url, {"page_size": 2})
+        while True:
+            assert response.status_code == status.HTTP_200_OK
+            assert len(response.data["results"]) <= 2
+            seen += [place["id"] for place in response.data["results"]]
+            if not response.data["next"]:
+                break
+            response = self.client.get(response.data["next"])
+
+        assert seen == [place.id for place in reversed(places)]
+
+    @pytest.mark.parametrize("count", [5, 50])
+    def test_page_query_count_is_constant(self, count, django_assert_num_queries):
+        """Test that a full page runs one page query plus one image prefetch"""
+        self.create_places(count)
+
+        with django_assert_num_queries(2):
+            response = self.client.get(self.url, {"page_size": 50})
+
+        results = response.data["results"]
+        assert len(results) == count
+        assert all(place["author"] and len(place["images"]) == 1 for place in results)
+
+    def test_sparse_fields(self, django_assert_num_queries):
+        """Test that fields= limits the output and skips the image prefetch"""
+        self.create_places(3)
+
+        with django_assert_num_queries(1):
+            response = self.client.get(self.url, {"fields": "id,name,author"})
+
+        for place in response.data["results"]:
+            assert set(place) == {"id", "name", "author"}
+            assert place["author"]
+
+    def test_sparse_is_owner(self):
+        """Test that is_owner still resolves when the author is not rendered"""
+        user = UserFactory()
+        PlaceFactory(author=user)
+        self.client.force_authenticate(user=user)
+
+        response = self.client.get(self.url, {"fields": "is_owner"})
+
+        assert response.data["results"] == [{"is_owner": True}]
+
+    def test_unknown_sparse_field(self):
+        """Test that requesting a field the serializer lacks is rejected"""
+        response = self.client.get(self.url, {"fields": "name,secret"})
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "secret" in str(response.data["fields"])
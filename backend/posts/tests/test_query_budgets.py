@@ -0,0 +1,311 @@
+"""
+Query budgets for every view in posts/urls.py and accounts/urls.py.
+
+Each test makes its requests at several data sizes with
+``assert_queries_constant``, so a query per row fails, and caps each request
+with a ``query_budget`` marker, so an extra constant query is noticed too.
+"""
+
+from io import BytesIO
+
+import pytest
+from django.core.cache import cache
+from django.urls import reverse
+from PIL import Image as PillowImage
+from posts.jobs import run_pending_jobs
+from posts.models import ImageUpload, Place
+from posts.tests.factories import PlaceFactory, PlaceImageFactory, UserFactory
+from posts.tests.query_budget import RequestQueries, assert_queries_constant
+from rest_framework import status
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+PLACE_FIELDS = ["name", "subtitle", "description", "longitude", "latitude"]
+PLACE_FIELDS += ["category", "rating"]
+
+
+def jpeg(number):
+    """Return a small JPEG upload; distinct numbers give distinct files."""
+    buffer = BytesIO()
+    PillowImage.new("RGB", (40, 30), color=(number % 256, 0, 0)).save(buffer, "JPEG")
+    buffer.name = f"photo{number}.jpg"
+    buffer.seek(0)
+    return buffer
+
+
+def grow_places(**kwargs):
+    """Return a ``grow`` callable adding places, each with a thumbnail image."""
+
+    def grow(size):
+        for _ in range(size - Place.objects.count()):
+            PlaceImageFactory(place=PlaceFactory(**kwargs), is_thumbnail=True)
+            PlaceImageFactory(place=Place.objects.latest("id"))
+
+    return grow
+
+
+@pytest.fixture(autouse=True)
+def upload_dirs(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path / "media"
+    settings.CHUNKED_UPLOAD_DIR = tmp_path / "uploads"
+
+
+@pytest.mark.django_db
+class TestPostsQueryBudgets:
+    """Query budgets for the views in posts/urls.py"""
+
+    def setup_method(self):
+        self.client = APIClient()
+        self.user = UserFactory()
+        self.author_client = APIClient()
+        self.author_client.force_authenticate(user=self.user)
+
+    def get(self, url, params=None, client=None):
+        # Each request must reach the database rather than a cached body
+        cache.clear()
+        response = (client or self.client).get(url, params)
+        assert response.status_code == status.HTTP_200_OK, response.content
+        return response
+
+    @pytest.mark.query_budget(2)
+    def test_place_list(self):
+        assert_queries_constant(
+            lambda size: self.get(reverse("place_list")), grow=grow_places()
+        )
+
+    @pytest.mark.query_budget(10)
+    def test_place_create(self):
+        def create(size):
+            data = {
+                field: getattr(PlaceFactory.build(), field) for field in PLACE_FIELDS
+            }
+            data["images_files"] = [jpeg(size * 100 + i) for i in range(size)]
+            data["images_captions"] = ["Caption"] * size
+            data["images_thumbnails"] = ["true"] * size
+            response = self.author_client.post(reverse("place_list"), data)
+            assert response.status_code == status.HTTP_201_CREATED, response.content
+
+        assert_queries_constant(create)
+
+    @pytest.mark.query_budget(2)
+    def test_place_detail(self):
+        place = PlaceFactory(author=self.user)
+
+        def grow(size):
+            for _ in range(size - place.images.count()):
+                PlaceImageFactory(place=place)
+
+        url = reverse("place_detail", args=[place.id])
+        assert_queries_constant(lambda size: self.get(url), grow=grow)
+        assert_queries_constant(lambda size: self.get(url, client=self.author_client))
+
+    @pytest.mark.query_budget(15)
+    def test_place_update(self):
+        place = PlaceFactory(author=self.user)
+        PlaceImageFactory(place=place)
+        url = reverse("place_detail", args=[place.id])
+
+        def update(size):
+            images = list(place.images.all())
+            data = {field: getattr(place, field) for field in PLACE_FIELDS}
+            data["existing_images_ids"] = [image.id for image in images]
+            data["existing_images_captions"] = ["Edited"] * len(images)
+            data["existing_images_thumbnails"] = ["false"] * len(images)
+            data["images_files"] = [jpeg(size * 100 + i) for i in range(size)]
+            data["images_captions"] = ["New"] * size
+            data["images_thumbnails"] = ["true"] * size
+            response = self.author_client.put(url, data)
+            assert response.status_code == status.HTTP_200_OK, response.content
+
+        assert_queries_constant(update)
+
+    @pytest.mark.query_budget(9)
+    def test_place_delete(self):
+        # Images are deleted through per-object signals, which queue the file
+        # deletion and log the change, so the size grown is the places
+        def delete(size):
+            place = PlaceFactory(author=self.user)
+            PlaceImageFactory(place=place, is_thumbnail=True)
+            url = reverse("place_detail", args=[place.id])
+            response = self.author_client.delete(url)
+            assert response.status_code == status.HTTP_204_NO_CONTENT
+
+        assert_queries_constant(delete, grow=grow_places())
+
+    @pytest.mark.query_budget(1)
+    def test_geojson(self):
+        assert_queries_constant(
+            lambda size: self.get(reverse("geojson")), grow=grow_places()
+        )
+
+    @pytest.mark.query_budget(1)
+    def test_geojson_clusters(self):
+        grow = grow_places()
+
+        def grow_clusters(size):
+            grow(size)
+            run_pending_jobs()
+
+        assert_queries_constant(
+            lambda size: self.get(reverse("geojson"), {"cluster": "true", "zoom": 3}),
+            grow=grow_clusters,
+        )
+
+    @pytest.mark.query_budget(4)
+    def test_geojson_changes(self):
+        cursor = self.get(reverse("geojson_changes")).json()["cursor"]
+        assert_queries_constant(
+            lambda size: self.get(reverse("geojson_changes"), {"since": cursor}),
+            grow=grow_places(),
+        )
+
+    @pytest.mark.query_budget(1)
+    def test_place_tile(self):
+        assert_queries_constant(
+            lambda size: self.get(reverse("place_tile", args=[0, 0, 0])),
+            grow=grow_places(),
+        )
+
+    @pytest.mark.query_budget(4)
+    def test_top(self):
+        assert_queries_constant(
+            lambda size: self.get(reverse("top")), grow=grow_places(rating=4)
+        )
+
+    @pytest.mark.query_budget(2)
+    def test_search(self):
+        assert_queries_constant(
+            lambda size: self.get(reverse("search"), {"q": "quillon"}),
+            grow=grow_places(name="Quillon"),
+        )
+
+    @pytest.mark.query_budget(5)
+    def test_nearby(self):
+        assert_queries_constant(
+            lambda size: self.get(reverse("nearby"), {"lat": 10, "lon": 10}),
+            grow=grow_places(latitude=10, longitude=10),
+        )
+
+    @pytest.mark.query_budget(1)
+    def test_async_geojson(self):
+        assert_queries_constant(
+            lambda size: self.get(reverse("async_geojson")), grow=grow_places()
+        )
+
+    @pytest.mark.query_budget(3)
+    def test_async_place_detail(self):
+        place = PlaceFactory(author=self.user)
+
+        def grow(size):
+            for _ in range(size - place.images.count()):
+                PlaceImageFactory(place=place)
+
+        url = reverse("async_place_detail", args=[place.id])
+        token = AccessToken.for_user(self.user)
+        self.author_client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        assert_queries_constant(lambda size: self.get(url), grow=grow)
+        assert_queries_constant(lambda size: self.get(url, client=self.author_client))
+
+    @pytest.mark.query_budget(4)
+    def test_async_top(self):
+        assert_queries_constant(
+            lambda size: self.get(reverse("async_top")), grow=grow_places(rating=4)
+        )
+
+    @pytest.mark.query_budget(5)
+    def test_async_nearby(self):
+        assert_queries_constant(
+            lambda size: self.get(reverse("async_nearby"), {"lat": 10, "lon": 10}),
+            grow=grow_places(latitude=10, longitude=10),
+        )
+
+    @pytest.mark.query_budget(3)
+    def test_uploads(self):
+        content = jpeg(0).getvalue()
+
+        def upload(size):
+            response = self.author_client.post(
+                reverse("upload_list"), {"filename": "photo.jpg", "size": len(content)}
+            )
+            assert response.status_code == status.HTTP_201_CREATED
+            url = reverse("upload_detail", args=[response.data["id"]])
+            response = self.author_client.put(
+                url,
+                content,
+                content_type="application/octet-stream",
+                HTTP_CONTENT_RANGE=f"bytes 0-{len(content) - 1}/{len(content)}",
+            )
+            assert response.status_code == status.HTTP_200_OK
+            self.get(url, client=self.author_client)
+            response = self.author_client.delete(url)
+            assert response.status_code == status.HTTP_204_NO_CONTENT
+
+        def grow(size):
+            for i in range(size - ImageUpload.objects.count()):
+                ImageUpload.objects.create(user=self.user, filename="a.jpg", size=10)
+
+        assert_queries_constant(upload, grow=grow)
+
+
+@pytest.mark.django_db
+class TestAccountsQueryBudgets:
+    """Query budgets for the views in accounts/urls.py"""
+
+    def setup_method(self):
+        self.client = APIClient()
+
+    @pytest.mark.query_budget(1)
+    def test_user_list(self):
+        def grow(size):
+            UserFactory.create_batch(size - UserFactory._meta.model.objects.count())
+
+        def list_users(size):
+            response = self.client.get("/api/v1/users/")
+            assert response.status_code == status.HTTP_200_OK
+
+        assert_queries_constant(list_users, grow=grow)
+
+    @pytest.mark.query_budget(1)
+    def test_user_detail(self):
+        user = UserFactory()
+
+        def grow(size):
+            PlaceFactory.create_batch(size - user.places.count(), author=user)
+
+        def detail(size):
+            response = self.client.get(f"/api/v1/users/{user.id}/")
+            assert response.status_code == status.HTTP_200_OK
+
+        assert_queries_constant(detail, grow=grow)
+
+
+@pytest.mark.django_db
+class TestQueryBudgetHarness:
+    """Tests for the query counting helpers themselves"""
+
+    def setup_method(self):
+        self.client = APIClient()
+
+    def test_growth_fails(self):
+        """Test that a query count growing with the size is reported"""
+        place = PlaceFactory()
+        url = reverse("place_detail", args=[place.id])
+
+        with pytest.raises(pytest.fail.Exception, match="grow with the data size"):
+            assert_queries_constant(
+                lambda size: [self.client.get(url) for _ in range(size)]
+            )
+
+    def test_only_requests_are_counted(self):
+        """Test that queries made outside of requests are left out"""
+        place = PlaceFactory()
+
+        with RequestQueries() as queries:
+            PlaceFactory()
+            self.client.get(reverse("place_detail", args=[place.id]))
+            Place.objects.count()
+
+        assert [request for request, _ in queries.requests] == [
+            f"GET /api/v1/{place.id}/"
+        ]
+        assert queries.count == 2
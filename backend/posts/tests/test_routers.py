@@ -0,0 +1,189 @@
+import pytest
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.urls import reverse
+from django.utils.connection import ConnectionDoesNotExist
+from posts.leaderboard import atop_place_ids, top_place_ids
+from posts.middleware import ReplicaReadsMiddleware
+from posts.models import Place
+from posts.routers import ReplicaRouter, current_read_alias, use_replicas
+from posts.search import search_place_ids
+from posts.tests.factories import PlaceFactory
+from rest_framework import status
+from rest_framework.test import APIClient
+
+# Not in DATABASES, so any read routed to a replica fails
+REPLICAS = ["replica1", "replica2"]
+
+
+@pytest.fixture(autouse=True)
+def replicas(settings):
+    settings.DATABASE_REPLICAS = REPLICAS
+
+
+class TestReplicaRouter:
+    """Tests for routing reads to the replicas"""
+
+    def test_reads_use_default_by_default(self):
+        """Test that reads outside use_replicas go to the default database"""
+        assert current_read_alias() is None
+        assert Place.objects.all().db == "default"
+
+    def test_reads_use_one_replica(self):
+        """Test that the reads of a block all go to the same replica"""
+        with use_replicas() as alias:
+            assert alias in REPLICAS
+            assert Place.objects.all().db == alias
+            assert Place.objects.filter(rating=5).db == alias
+        assert current_read_alias() is None
+
+    def test_writes_use_default(self):
+        """Test that writes inside use_replicas still go to the default database"""
+        with use_replicas():
+            assert ReplicaRouter().db_for_write(Place) == "default"
+
+    def test_without_replicas(self, settings):
+        """Test that use_replicas is a no-op when none are configured"""
+        settings.DATABASE_REPLICAS = []
+        with use_replicas() as alias:
+            assert alias is None
+            assert Place.objects.all().db == "default"
+
+    def test_replicas_are_not_migrated(self):
+        """Test that migrations only run on the primary"""
+        router = ReplicaRouter()
+        assert router.allow_migrate("replica1", "posts") is False
+        assert router.allow_migrate("default", "posts") is None
+
+
+class TestReplicaReadsMiddleware:
+    """Tests for choosing the requests that read from a replica"""
+
+    def setup_method(self):
+        self.factory = RequestFactory()
+        self.aliases = []
+
+    def get_response(self, request):
+        self.aliases.append(current_read_alias())
+        return HttpResponse()
+
+    def handle(self, request):
+        ReplicaReadsMiddleware(self.get_response)(request)
+        return self.aliases[-1]
+
+    @pytest.mark.parametrize(
+        "path", ["/api/v1/geojson/", "/api/v1/1/", "/api/v1/async/top/"]
+    )
+    def test_posts_reads_use_a_replica(self, path):
+        """Test that GETs to the posts views read from a replica"""
+        assert self.handle(self.factory.get(path)) in REPLICAS
+        assert self.handle(self.factory.head(path)) in REPLICAS
+        assert current_read_alias() is None
+
+    def test_writes_use_default(self):
+        """Test that other methods stay on the primary"""
+        assert self.handle(self.factory.post("/api/v1/")) is None
+        assert self.handle(self.factory.delete("/api/v1/1/")) is None
+
+    @pytest.mark.parametrize("path", ["/api/v1/users/", "/nowhere/"])
+    def test_other_views_use_default(self, path):
+        """Test that GETs outside the posts views stay on the primary"""
+        assert self.handle(self.factory.get(path)) is None
+
+    def test_async(self):
+        """Test that the middleware routes async requests too"""
+
+        async def get_response(request):
+            return self.get_response(request)
+
+        middleware = ReplicaReadsMiddleware(get_response)
+        async_to_sync(middleware)(self.factory.get("/api/v1/geojson/"))
+        assert self.aliases == [self.aliases[0]]
+        assert self.aliases[0] in REPLICAS
+
+
+@pytest.mark.django_db
+class TestReplicaReads:
+    """Tests for the reads that must not, or must, go to a replica"""
+
+    def setup_method(self):
+        cache.clear()
+        self.client = APIClient()
+        self.places = [
+            PlaceFactory(longitude=2.35, latitude=48.85, rating=4),
+            PlaceFactory(longitude=2.36, latitude=48.86, rating=5),
+        ]
+
+    def test_uncached_reads_use_a_replica(self):
+        """Test that reads without validators or caching go to the replica"""
+        with use_replicas() as alias:
+            with pytest.raises(ConnectionDoesNotExist, match=alias):
+                self.client.get(reverse("geojson_changes"))
+
+    @pytest.mark.parametrize(
+        "name, params",
+        [
+            ("geojson", {}),
+            ("geojson", {"cluster": "true", "zoom": 3}),
+            ("async_geojson", {}),
+        ],
+    )
+    def test_cached_geojson_is_built_from_primary(self, name, params):
+        """Test that the GeoJSON cached for everyone is read from the primary"""
+        with use_replicas():
+            response = self.client.get(reverse(name), params)
+        assert response.status_code == status.HTTP_200_OK
+        assert response.content == self.client.get(reverse(name), params).content
+
+    def test_cached_tile_is_built_from_primary(self):
+        """Test that cached vector tiles are read from the primary"""
+        with use_replicas():
+            response = self.client.get(
+                reverse("place_tile", kwargs={"z": 0, "x": 0, "y": 0})
+            )
+        assert response.status_code == status.HTTP_200_OK
+        assert response.content
+
+    def test_leaderboards_are_built_from_primary(self):
+        """Test that cached leaderboards are read from the primary"""
+        ids = [place.pk for place in reversed(self.places)]
+        with use_replicas():
+            assert top_place_ids() == ids
+        cache.clear()
+        with use_replicas():
+            assert async_to_sync(atop_place_ids)() == ids
+
+    @pytest.mark.django_db(databases=["default", "lagging"])
+    @pytest.mark.parametrize("name", ["place_detail", "async_place_detail"])
+    def test_validated_responses_are_read_from_primary(self, settings, name):
+        """Test that a lagging replica cannot pair stale rows with a new ETag"""
+        settings.DATABASE_REPLICAS = ["lagging"]
+        place = self.places[0]
+        stale = Place(
+            **{
+                field.attname: getattr(place, field.attname)
+                for field in Place._meta.concrete_fields
+                if field.name != "author"
+            }
+        )
+        Place.objects.using("lagging").bulk_create([stale])
+        place.name = "Renamed"
+        place.save()
+        url = reverse(name, args=[place.pk])
+
+        with use_replicas():
+            # The replica has not caught up with the rename
+            assert Place.objects.get(pk=place.pk).name == stale.name
+            response = self.client.get(url)
+            assert response.json()["name"] == "Renamed"
+            revalidated = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        assert revalidated.status_code == status.HTTP_304_NOT_MODIFIED
+
+    def test_search_is_routed(self):
+        """Test that search reads from the database the router picks"""
+        assert search_place_ids(self.places[0].name, 10) == [self.places[0].pk]
+        with use_replicas() as alias:
+            with pytest.raises(ConnectionDoesNotExist, match=alias):
+                search_place_ids(self.places[0].name, 10)
@@ -0,0 +1,148 @@
+import pytest
+from django.urls import reverse
+from posts.models import Place
+from posts.search import search_place_ids, search_terms
+from posts.tests.factories import PlaceFactory
+from rest_framework import status
+from rest_framework.test import APIClient
+
+
+def place(name, subtitle="A place", description="Nothing to see."):
+    return PlaceFactory(name=name, subtitle=subtitle, description=description)
+
+
+@pytest.mark.django_db
+class TestPlaceSearchView:
+    """Tests for the full-text place search endpoint"""
+
+    def setup_method(self):
+        self.client = APIClient()
+        self.url = reverse("search")
+
+    def search(self, **params):
+        response = self.client.get(self.url, params)
+        assert response.status_code == status.HTTP_200_OK, response.data
+        return response.json()
+
+    def ids(self, q, **params):
+        return [feature["id"] for feature in self.search(q=q, **params)["results"]]
+
+    def test_matches_every_text_field(self):
+        """Test that names, subtitles and descriptions are all searched"""
+        by_name = place("Quillon Lake")
+        by_subtitle = place("Harbour", subtitle="Quillon views")
+        by_description = place("Bridge", description="Walk to quillon point.")
+        place("Unrelated")
+
+        assert set(self.ids("quillon")) == {
+            by_name.id,
+            by_subtitle.id,
+            by_description.id,
+        }
+
+    def test_results_are_geojson_features(self):
+        """Test that results match the GeoJSON endpoint's features"""
+        match = place("Quillon Lake")
+
+        feature = self.search(q="quillon")["results"][0]
+
+        assert feature["type"] == "Feature"
+        assert feature["geometry"]["type"] == "Point"
+        assert feature["properties"]["name"] == match.name
+
+    def test_prefix_matches_for_typeahead(self):
+        """Test that every term matches as a prefix"""
+        match = place("Quillon Lake Trail")
+        other = place("Quillon Forest")
+
+        assert set(self.ids("quil")) == {match.id, other.id}
+        assert self.ids("qui lak") == [match.id]
+
+    def test_name_matches_rank_first(self):
+        """Test that a match on the name ranks above one in the description"""
+        by_description = place("Bridge", description="Walk to quillon point.")
+        by_subtitle = place("Harbour", subtitle="Quillon views")
+        by_name = place("Quillon Lake")
+
+        assert self.ids("quillon") == [by_name.id, by_subtitle.id, by_description.id]
+
+    def test_diacritics_are_ignored(self):
+        """Test that accented and plain spellings find each other"""
+        match = place("Café Zürich")
+
+        assert self.ids("cafe zurich") == [match.id]
+        assert self.ids("zür") == [match.id]
+
+    def test_index_follows_updates_and_deletes(self):
+        """Test that edited and deleted places are reflected in results"""
+        renamed = place("Quillon Lake")
+        deleted = place("Quillon Forest")
+
+        renamed.name = "Marlow Lake"
+        renamed.save()
+        deleted.delete()
+
+        assert self.ids("quillon") == []
+        assert self.ids("marlow") == [renamed.id]
+
+    def test_bulk_writes_are_indexed(self):
+        """Test that bulk_create and queryset updates reach the index"""
+        Place.objects.bulk_create(
+            [Place(name="Quillon Lake", longitude=0, latitude=0, category="other")]
+        )
+        Place.objects.filter(name="Quillon Lake").update(name="Marlow Lake")
+
+        assert self.ids("quillon") == []
+        assert len(self.ids("marlow")) == 1
+
+    def test_pagination(self):
+        """Test that pages follow the ranking and link to each other"""
+        places = [place(f"Quillon {i}") for i in range(5)]
+
+        first = self.search(q="quillon", page_size=2)
+        second = self.client.get(first["next"]).json()
+        last = self.client.get(second["next"]).json()
+
+        pages = [first, second, last]
+        ids = [feature["id"] for page in pages for feature in page["results"]]
+        assert sorted(ids) == sorted(p.id for p in places)
+        assert first["previous"] is None
+        assert last["next"] is None
+        assert self.client.get(last["previous"]).json() == second
+
+    def test_page_past_the_end_is_not_found(self):
+        """Test that an empty page after the first returns 404"""
+        place("Quillon Lake")
+
+        response = self.client.get(self.url, {"q": "quillon", "page": 3})
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_query_is_required(self):
+        """Test that a missing or blank query is rejected"""
+        assert self.client.get(self.url).status_code == status.HTTP_400_BAD_REQUEST
+        response = self.client.get(self.url, {"q": "  "})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_query_syntax_is_not_interpreted(self):
+        """Test that operators and quotes in the query are treated as text"""
+        match = place("Quillon Lake")
+
+        assert self.ids('"quillon" OR NOT*') == []
+        assert self.ids('quillon" -(') == [match.id]
+        assert self.search(q="!!!")["results"] == []
+
+
+class TestSearchTerms:
+    """Tests for query tokenizing"""
+
+    def test_words_are_lowercased_and_split(self):
+        assert search_terms("Quillon-Lake, trail!") == ["quillon", "lake", "trail"]
+
+    def test_terms_are_capped(self):
+        assert len(search_terms(" ".join("word" for _ in range(20)))) == 8
+
+    @pytest.mark.django_db
+    def test_no_terms_means_no_query(self, django_assert_num_queries):
+        with django_assert_num_queries(0):
+            assert search_place_ids("...", 10) == []
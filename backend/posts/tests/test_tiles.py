@@ -0,0 +1,201 @@
+import struct
+
+import pytest
+from django.urls import reverse
+from posts.models import Place, PlaceImage
+from posts.mvt import CONTENT_TYPE, EXTENT, encode_layer, encode_tile
+from rest_framework import status
+from rest_framework.test import APIClient
+
+
+def read_varint(data, pos):
+    result = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        shift += 7
+        if not byte & 0x80:
+            return result, pos
+
+
+def read_fields(data):
+    """Decode a protobuf message into a list of (field, value) pairs"""
+    fields = []
+    pos = 0
+    while pos < len(data):
+        key, pos = read_varint(data, pos)
+        field, wire_type = key >> 3, key & 0x7
+        if wire_type == 0:
+            value, pos = read_varint(data, pos)
+        elif wire_type == 1:
+            value = struct.unpack("<d", data[pos : pos + 8])[0]
+            pos += 8
+        else:
+            length, pos = read_varint(data, pos)
+            value = data[pos : pos + length]
+            pos += length
+        fields.append((field, value))
+    return fields
+
+
+def read_packed(data):
+    values = []
+    pos = 0
+    while pos < len(data):
+        value, pos = read_varint(data, pos)
+        values.append(value)
+    return values
+
+
+def unzigzag(value):
+    return (value >> 1) ^ -(value & 1)
+
+
+def decode_tile(data):
+    """Decode a vector tile into {layer_name: [feature dicts]}"""
+    layers = {}
+    for _, layer_data in read_fields(data):
+        layer = read_fields(layer_data)
+        name = next(value for field, value in layer if field == 1).decode()
+        keys = [value.decode() for field, value in layer if field == 3]
+        values = []
+        for field, value in layer:
+            if field == 4:
+                value_field, raw = read_fields(value)[0]
+                if value_field == 1:
+                    values.append(raw.decode())
+                elif value_field == 6:
+                    values.append(unzigzag(raw))
+                elif value_field == 7:
+                    values.append(bool(raw))
+                else:
+                    values.append(raw)
+        features = []
+        for field, value in layer:
+            if field != 2:
+                continue
+            feature = dict(read_fields(value))
+            tags = read_packed(feature[2])
+            command, x, y = read_packed(feature[4])
+            features.append(
+                {
+                    "id": feature[1],
+                    "type": feature[3],
+                    "command": command,
+                    "x": unzigzag(x),
+                    "y": unzigzag(y),
+                    "properties": {
+                        keys[tags[i]]: values[tags[i + 1]]
+                        for i in range(0, len(tags), 2)
+                    },
+                }
+            )
+        layers[name] = features
+    return layers
+
+
+class TestVectorTileEncoder:
+    """Tests for the pure Python vector tile encoder"""
+
+    def test_round_trip(self):
+        """Test that encoded features decode back to their ids and values"""
+        layer = encode_layer(
+            "places",
+            [
+                (1, 10, 20, {"name": "A", "rating": 4.5, "count": -3, "ok": True}),
+                (2, -5, 4200, {"name": "B", "rating": None}),
+            ],
+        )
+
+        features = decode_tile(encode_tile([layer]))["places"]
+
+        assert features[0] == {
+            "id": 1,
+            "type": 1,
+            "command": 9,
+            "x": 10,
+            "y": 20,
+            "properties": {"name": "A", "rating": 4.5, "count": -3, "ok": True},
+        }
+        assert features[1]["x"] == -5
+        assert features[1]["y"] == 4200
+        assert features[1]["properties"] == {"name": "B"}
+
+    def test_unsupported_value(self):
+        """Test that values without a vector tile type are rejected"""
+        with pytest.raises(TypeError):
+            encode_layer("places", [(1, 0, 0, {"bad": [1]})])
+
+
+@pytest.mark.django_db
+class TestPlaceTileView:
+    """Tests for the /tiles/{z}/{x}/{y}.pbf endpoint"""
+
+    def setup_method(self):
+        self.client = APIClient()
+        self.paris = self.create_place("Paris", 2.35, 48.85, rating=4.5)
+        self.new_york = self.create_place("New York", -74.0, 40.7, rating=None)
+        PlaceImage.objects.create(
+            place=self.paris, image="place_pics/paris.jpg", is_thumbnail=True
+        )
+
+    def create_place(self, name, longitude, latitude, rating):
+        return Place.objects.create(
+            name=name,
+            subtitle="Subtitle",
+            description="Description",
+            longitude=longitude,
+            latitude=latitude,
+            category="city",
+            rating=rating,
+        )
+
+    def get_tile(self, z, x, y):
+        response = self.client.get(reverse("place_tile", args=[z, x, y]))
+        assert response.status_code == status.HTTP_200_OK
+        assert response["Content-Type"] == CONTENT_TYPE
+        return decode_tile(response.content)["places"]
+
+    def test_world_tile_contains_every_place(self):
+        """Test the zoom 0 tile encodes every place with its properties"""
+        features = self.get_tile(0, 0, 0)
+
+        assert [feature["id"] for feature in features] == [
+            self.paris.id,
+            self.new_york.id,
+        ]
+        paris = features[0]
+        assert paris["properties"] == {
+            "name": "Paris",
+            "category": "city",
+            "rating": 4.5,
+            "thumbnail_url": "http://testserver/media/place_pics/paris.jpg",
+        }
+        assert 0 <= paris["x"] < EXTENT and 0 <= paris["y"] < EXTENT
+        assert paris["x"] > EXTENT // 2 and paris["y"] < EXTENT // 2
+        assert features[1]["properties"] == {"name": "New York", "category": "city"}
+
+    def test_tile_only_contains_its_places(self):
+        """Test that a zoom 2 tile only holds the places it covers"""
+        america = self.get_tile(2, 1, 1)
+        europe = self.get_tile(2, 2, 1)
+        antarctica = self.get_tile(2, 3, 3)
+
+        assert [feature["id"] for feature in america] == [self.new_york.id]
+        assert [feature["id"] for feature in europe] == [self.paris.id]
+        assert antarctica == []
+
+    def test_tile_is_cached(self, django_assert_num_queries):
+        """Test that repeated requests for a tile are served from cache"""
+        self.get_tile(3, 4, 2)
+
+        with django_assert_num_queries(0):
+            self.get_tile(3, 4, 2)
+
+    @pytest.mark.parametrize("z, x, y", [(1, 2, 0), (1, 0, 2), (23, 0, 0)])
+    def test_out_of_range_tile(self, z, x, y):
+        """Test that tiles outside the grid return 404"""
+        response = self.client.get(reverse("place_tile", args=[z, x, y]))
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
@@ -0,0 +1,178 @@
+from decimal import Decimal
+
+import pytest
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import transaction
+from django.urls import reverse
+from posts import leaderboard
+from posts.leaderboard import top_place_ids
+from posts.models import Place
+from posts.tests.factories import PlaceFactory
+from rest_framework import status
+from rest_framework.test import APIClient
+
+
+@pytest.mark.django_db
+class TestTopPlacesView:
+    """Tests for the top places endpoint"""
+
+    def setup_method(self):
+        self.client = APIClient()
+        self.url = reverse("top")
+
+    def get(self, **params):
+        response = self.client.get(self.url, params)
+        assert response.status_code == status.HTTP_200_OK, response.data
+        return response.json()["features"]
+
+    def test_best_rated_first(self):
+        """Test that places come best rated first, newest first on ties"""
+        low = PlaceFactory(category="city", rating=2)
+        first_tie = PlaceFactory(category="city", rating=4)
+        second_tie = PlaceFactory(category="city", rating=4)
+        best = PlaceFactory(category="city", rating=5)
+        PlaceFactory(category="nature", rating=5)
+        PlaceFactory(category="city", rating=None)
+
+        features = self.get(category="city")
+
+        assert [feature["id"] for feature in features] == [
+            best.id,
+            second_tie.id,
+            first_tie.id,
+            low.id,
+        ]
+        assert features[0]["type"] == "Feature"
+        assert features[0]["properties"]["name"] == best.name
+
+    def test_all_categories_are_merged(self):
+        """Test that without a category every category is ranked together"""
+        nature = PlaceFactory(category="nature", rating=5)
+        city = PlaceFactory(category="city", rating=4.5)
+        other = PlaceFactory(category="other", rating=3)
+
+        assert [feature["id"] for feature in self.get()] == [
+            nature.id,
+            city.id,
+            other.id,
+        ]
+
+    def test_limit(self):
+        """Test that limit caps the number of places"""
+        places = [PlaceFactory(category="city", rating=i) for i in range(5)]
+
+        features = self.get(category="city", limit=2)
+
+        assert [feature["id"] for feature in features] == [
+            places[4].id,
+            places[3].id,
+        ]
+
+    def test_invalid_parameters(self):
+        """Test that unknown categories and out of range limits are rejected"""
+        for params in [{"category": "beach"}, {"limit": 0}, {"limit": "x"}]:
+            response = self.client.get(self.url, params)
+            assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_constant_queries(self, django_assert_num_queries):
+        """Test that a warm leaderboard is read without ranking in the database"""
+        PlaceFactory.create_batch(10, category="city")
+        self.get(category="city")
+
+        with django_assert_num_queries(1):
+            self.client.get(self.url, {"category": "city", "limit": 5})
+
+
+@pytest.mark.django_db
+class TestLeaderboard:
+    """Tests for the incremental maintenance of the leaderboards"""
+
+    def assert_fresh(self, category):
+        """Assert the cached board matches one rebuilt from the database"""
+        cached = cache.get(leaderboard._cache_key(category))
+        assert cached is not None
+        assert cached == leaderboard.build_leaderboard(category)
+
+    @pytest.mark.django_db(transaction=True)
+    def test_saves_and_deletes_update_the_board(self):
+        """Test that the board follows rating, category and deletion changes"""
+        places = [PlaceFactory(category="city", rating=i) for i in range(4)]
+        top_place_ids("city")
+        top_place_ids("nature")
+
+        places[0].rating = Decimal("4.5")
+        places[0].save()
+        places[1].category = "nature"
+        places[1].save()
+        places[2].rating = None
+        places[2].save()
+        places[3].delete()
+        new = PlaceFactory(category="city", rating=1)
+
+        assert top_place_ids("city") == [places[0].id, new.id]
+        assert top_place_ids("nature") == [places[1].id]
+        self.assert_fresh("city")
+        self.assert_fresh("nature")
+
+    @pytest.mark.django_db(transaction=True)
+    def test_boards_are_updated_without_queries(self, django_assert_num_queries):
+        """Test that saves maintain a warm board rather than rebuilding it"""
+        place = PlaceFactory(category="city", rating=1)
+        top_place_ids("city")
+
+        place.rating = 5
+        place.save()
+
+        with django_assert_num_queries(0):
+            assert top_place_ids("city") == [place.id]
+
+    @pytest.mark.django_db(transaction=True)
+    def test_full_board_is_trimmed_and_refilled(self, monkeypatch):
+        """Test that a full board keeps its size and rebuilds after a loss"""
+        monkeypatch.setattr(leaderboard, "LEADERBOARD_SIZE", 3)
+        places = [PlaceFactory(category="city", rating=i) for i in range(4)]
+        top_place_ids("city")
+
+        better = PlaceFactory(category="city", rating=5)
+        assert top_place_ids("city") == [better.id, places[3].id, places[2].id]
+        self.assert_fresh("city")
+
+        better.rating = 0
+        better.save()
+        assert cache.get(leaderboard._cache_key("city")) is None
+        assert top_place_ids("city") == [places[3].id, places[2].id, places[1].id]
+
+        places[3].delete()
+        # Ties go to the newer place
+        assert top_place_ids("city") == [places[2].id, places[1].id, better.id]
+
+    @pytest.mark.django_db(transaction=True)
+    def test_rolled_back_changes_leave_the_board(self):
+        """Test that saves rolled back with their transaction are not ranked"""
+        place = PlaceFactory(category="city", rating=3)
+        board = top_place_ids("city")
+
+        with pytest.raises(RuntimeError):
+            with transaction.atomic():
+                place.rating = 5
+                place.save()
+                PlaceFactory(category="city", rating=4.5)
+                raise RuntimeError
+
+        assert top_place_ids("city") == board == [place.id]
+        self.assert_fresh("city")
+
+    def test_bulk_import_resets_the_boards(self, tmp_path):
+        """Test that imported places, which send no signals, are ranked"""
+        PlaceFactory(category="city", rating=1)
+        top_place_ids("city")
+        path = tmp_path / "places.csv"
+        path.write_text(
+            "name,subtitle,longitude,latitude,category,rating\n"
+            "Imported,Top rated,13.4,52.5,city,5\n"
+        )
+
+        call_command("import_places", str(path), verbosity=0)
+
+        assert top_place_ids("city")[0] == Place.objects.get(name="Imported").id
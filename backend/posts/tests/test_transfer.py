@@ -0,0 +1,150 @@
+import json
+from io import StringIO
+
+import pytest
+from django.core.management import CommandError, call_command
+from django.urls import reverse
+from posts import transfer
+from posts.models import Place, PlaceChange, PlaceImage
+from posts.tests.factories import PlaceFactory, UserFactory
+from rest_framework.test import APIClient
+
+
+def export(path, *args):
+    call_command("export_places", str(path), "--base-url", "http://testserver", *args)
+    return path.read_bytes()
+
+
+def run_import(path, *args):
+    stdout, stderr = StringIO(), StringIO()
+    call_command("import_places", str(path), *args, stdout=stdout, stderr=stderr)
+    return stdout.getvalue(), stderr.getvalue()
+
+
+def read_features(content):
+    if content.startswith(b'{"type":"FeatureCollection"'):
+        return json.loads(content)["features"]
+    return [json.loads(line) for line in content.splitlines()]
+
+
+def without_ids(features):
+    return sorted(
+        ({**feature, "id": None} for feature in features),
+        key=lambda feature: json.dumps(feature, sort_keys=True),
+    )
+
+
+@pytest.mark.django_db
+class TestExportPlaces:
+    """Tests for the export_places command"""
+
+    def setup_method(self):
+        self.places = PlaceFactory.create_batch(5)
+        PlaceImage.objects.create(
+            place=self.places[0], image="place_pics/a.jpg", is_thumbnail=True
+        )
+
+    def test_geojson_matches_the_api(self, tmp_path):
+        """Test that exported GeoJSON has the API's features"""
+        exported = json.loads(export(tmp_path / "places.geojson", "--batch-size", "2"))
+        api = APIClient().get(reverse("geojson")).json()
+
+        by_id = sorted(api["features"], key=lambda feature: feature["id"])
+        assert exported == {"type": "FeatureCollection", "features": by_id}
+
+    def test_ndjson_has_one_feature_per_line(self, tmp_path):
+        """Test that NDJSON holds the same features, one per line"""
+        geojson = json.loads(export(tmp_path / "places.geojson"))
+        lines = export(tmp_path / "places.ndjson").decode().splitlines()
+
+        assert [json.loads(line) for line in lines] == geojson["features"]
+
+    def test_unknown_extension(self, tmp_path):
+        """Test that the format must be given when the extension is unknown"""
+        with pytest.raises(CommandError):
+            export(tmp_path / "places.txt")
+
+
+@pytest.mark.django_db
+class TestImportPlaces:
+    """Tests for the import_places command"""
+
+    @pytest.mark.parametrize("extension", ["geojson", "ndjson", "csv"])
+    def test_round_trip(self, tmp_path, extension):
+        """Test that exported places import back into the same features"""
+        PlaceFactory.create_batch(7)
+        path = tmp_path / f"places.{extension}"
+        before = export(path)
+        descriptions = sorted(Place.objects.values_list("description", flat=True))
+        Place.objects.all().delete()
+
+        output, errors = run_import(path, "--batch-size", "3")
+
+        assert errors == ""
+        assert "Imported 7 places, skipped 0." in output
+        after = export(tmp_path / f"again.{extension}")
+        if extension == "csv":
+            # CSV carries descriptions; only the ids change
+            assert len(after.splitlines()) == len(before.splitlines())
+            imported = sorted(Place.objects.values_list("description", flat=True))
+            assert imported == descriptions
+        else:
+            assert without_ids(read_features(after)) == without_ids(
+                read_features(before)
+            )
+
+    def test_invalid_records_are_skipped(self, tmp_path):
+        """Test that invalid records are reported while valid ones import"""
+        author = UserFactory()
+        path = tmp_path / "places.csv"
+        path.write_text(
+            "name,subtitle,longitude,latitude,category,rating\n"
+            "Valid,Sub,2.35,48.85,city,4.5\n"
+            "Too far,Sub,200,48.85,city,4.5\n"
+            "Bad rating,Sub,2.35,48.85,city,9\n"
+            "No latitude,Sub,2.35,,city,\n"
+        )
+
+        output, errors = run_import(path, "--author", author.username)
+
+        assert "Imported 1 places, skipped 3." in output
+        assert "Record 2 skipped: longitude" in errors
+        assert "Record 3 skipped: rating" in errors
+        assert "Record 4 skipped: latitude" in errors
+        place = Place.objects.get()
+        assert place.author == author
+        assert PlaceChange.objects.filter(place_id=place.id).exists()
+
+    def test_geojson_is_read_incrementally(self, tmp_path, monkeypatch):
+        """Test that features split across reads are parsed correctly"""
+        monkeypatch.setattr(transfer, "READ_SIZE", 7)
+        features = [
+            {
+                "type": "Feature",
+                "geometry": {"type": "Point", "coordinates": [i, i]},
+                "properties": {"name": f"Place {i}", "subtitle": "[,]"},
+            }
+            for i in range(5)
+        ]
+        path = tmp_path / "places.geojson"
+        path.write_text(
+            json.dumps({"type": "FeatureCollection", "features": features}, indent=2)
+        )
+
+        run_import(path)
+
+        assert sorted(Place.objects.values_list("name", flat=True)) == [
+            f"Place {i}" for i in range(5)
+        ]
+
+    def test_truncated_geojson_keeps_what_was_read(self, tmp_path):
+        """Test that a truncated file fails after importing the complete features"""
+        path = tmp_path / "places.geojson"
+        path.write_text(
+            '{"features": [{"geometry": {"coordinates": [1, 2]}, "properties":'
+            ' {"name": "Complete", "subtitle": "Sub"}}, {"geometry": '
+        )
+
+        with pytest.raises(CommandError, match="Imported 1 places"):
+            run_import(path)
+        assert Place.objects.get().name == "Complete"
@@ -0,0 +1,221 @@
+import threading
+from io import BytesIO
+
+import pytest
+from django.db import connection
+from django.urls import reverse
+from PIL import Image as PillowImage
+from posts import views
+from posts.models import ImageUpload, Place, PlaceImage
+from posts.tests.factories import PlaceFactory, UserFactory
+from posts.uploads import upload_path, write_chunk
+from rest_framework import status
+from rest_framework.test import APIClient
+
+
+def image_bytes(size=(600, 400), color="green"):
+    buffer = BytesIO()
+    PillowImage.new("RGB", size, color=color).save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+
+@pytest.fixture(autouse=True)
+def upload_dirs(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path / "media"
+    settings.CHUNKED_UPLOAD_DIR = tmp_path / "uploads"
+
+
+@pytest.mark.django_db
+class TestChunkedUploads:
+    """Tests for resumable chunked image uploads"""
+
+    def setup_method(self):
+        self.client = APIClient()
+        self.user = UserFactory()
+        self.client.force_authenticate(user=self.user)
+        self.content = image_bytes()
+
+    def start(self, filename="photo.jpg", size=None):
+        return self.client.post(
+            reverse("upload_list"),
+            {"filename": filename, "size": size or len(self.content)},
+        )
+
+    def send(self, upload_id, start, end, body=None, client=None):
+        return (client or self.client).put(
+            reverse("upload_detail", args=[upload_id]),
+            self.content[start : end + 1] if body is None else body,
+            content_type="application/octet-stream",
+            HTTP_CONTENT_RANGE=f"bytes {start}-{end}/{len(self.content)}",
+        )
+
+    def upload(self, chunk_size=1000):
+        upload_id = self.start().data["id"]
+        for start in range(0, len(self.content), chunk_size):
+            end = min(start + chunk_size, len(self.content)) - 1
+            assert self.send(upload_id, start, end).status_code == status.HTTP_200_OK
+        return upload_id
+
+    def place_fields(self, place):
+        fields = ["name", "subtitle", "description", "longitude", "latitude"]
+        fields += ["category", "rating"]
+        return {field: getattr(place, field) for field in fields}
+
+    def test_chunks_are_assembled(self):
+        """Test that chunks sent in order rebuild the file"""
+        upload_id = self.upload()
+
+        upload = ImageUpload.objects.get(id=upload_id)
+        assert upload.is_complete
+        with open(upload_path(upload), "rb") as file:
+            assert file.read() == self.content
+
+    def test_resume_after_interrupted_chunk(self):
+        """Test that a chunk cut short is resumed from the reported offset"""
+        upload_id = self.start().data["id"]
+        # Claims 2000 bytes but the connection drops after 700
+        response = self.send(upload_id, 0, 1999, body=self.content[:700])
+        assert response.data["offset"] == 700
+
+        response = self.send(upload_id, 1000, len(self.content) - 1)
+        assert response.status_code == status.HTTP_409_CONFLICT
+        assert response.data["offset"] == 700
+
+        progress = self.client.get(reverse("upload_detail", args=[upload_id]))
+        self.send(upload_id, progress.data["offset"], len(self.content) - 1)
+
+        upload = ImageUpload.objects.get(id=upload_id)
+        with open(upload_path(upload), "rb") as file:
+            assert file.read() == self.content
+
+    @pytest.mark.django_db(transaction=True)
+    def test_overlapping_retry_waits_for_the_first_attempt(self, monkeypatch):
+        """Test that a chunk resent while still being written gets a 409"""
+        upload_id = self.start().data["id"]
+        writing, release = threading.Event(), threading.Event()
+
+        def slow_write_chunk(*args):
+            if not writing.is_set():
+                writing.set()
+                release.wait(5)
+            return write_chunk(*args)
+
+        monkeypatch.setattr(views, "write_chunk", slow_write_chunk)
+        responses = {}
+
+        def send(name):
+            client = APIClient()
+            client.force_authenticate(user=self.user)
+            try:
+                responses[name] = self.send(upload_id, 0, 999, client=client)
+            finally:
+                connection.close()
+
+        first = threading.Thread(target=send, args=["first"])
+        first.start()
+        assert writing.wait(5)
+        retry = threading.Thread(target=send, args=["retry"])
+        retry.start()
+        retry.join(0.5)
+        # Without the lock the retry would have written the chunk by now
+        assert retry.is_alive()
+        release.set()
+        first.join(5)
+        retry.join(5)
+
+        assert responses["first"].status_code == status.HTTP_200_OK
+        assert responses["retry"].status_code == status.HTTP_409_CONFLICT
+        assert responses["retry"].data["offset"] == 1000
+        assert ImageUpload.objects.get(pk=upload_id).offset == 1000
+        with open(upload_path(ImageUpload.objects.get(pk=upload_id)), "rb") as file:
+            assert file.read() == self.content[:1000]
+
+    def test_invalid_uploads_are_rejected(self):
+        """Test that bad file types, sizes and ranges are refused"""
+        assert self.start(filename="notes.txt").status_code == 400
+        assert self.start(size=10 * 1024 * 1024).status_code == 400
+
+        upload_id = self.start().data["id"]
+        response = self.client.put(
+            reverse("upload_detail", args=[upload_id]),
+            b"data",
+            content_type="application/octet-stream",
+            HTTP_CONTENT_RANGE="bytes 0-3/4",
+        )
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_uploads_are_private(self):
+        """Test that other users cannot see or write to an upload"""
+        upload_id = self.start().data["id"]
+        self.client.force_authenticate(user=UserFactory())
+
+        assert self.send(upload_id, 0, 99).status_code == status.HTTP_404_NOT_FOUND
+
+    def test_create_place_from_upload(self):
+        """Test that a finished upload becomes an image of a new place"""
+        upload_id = self.upload()
+
+        response = self.client.post(
+            reverse("place_list"),
+            {
+                "name": "Uploaded",
+                "subtitle": "Subtitle",
+                "description": "Description",
+                "longitude": 2.35,
+                "latitude": 48.85,
+                "category": "city",
+                "rating": 4.0,
+                "images_uploads": [upload_id],
+                "images_captions": ["Chunked"],
+                "images_thumbnails": ["true"],
+            },
+            format="multipart",
+        )
+
+        assert response.status_code == status.HTTP_201_CREATED
+        image = Place.objects.get(id=response.data["id"]).images.get()
+        assert image.caption == "Chunked"
+        with image.image.open("rb") as file:
+            assert file.read() == self.content
+        assert not ImageUpload.objects.exists()
+
+    def test_edit_place_with_upload(self):
+        """Test that an upload can be added to an existing place"""
+        place = PlaceFactory(author=self.user)
+        upload_id = self.upload()
+
+        response = self.client.put(
+            reverse("place_detail", args=[place.id]),
+            {
+                **self.place_fields(place),
+                "images_uploads": [upload_id],
+                "images_captions": ["Added"],
+                "images_thumbnails": ["false"],
+            },
+            format="multipart",
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert PlaceImage.objects.get(place=place).caption == "Added"
+        assert not ImageUpload.objects.exists()
+
+    def test_incomplete_upload_cannot_be_used(self):
+        """Test that referencing an unfinished upload is rejected and keeps it"""
+        place = PlaceFactory(author=self.user)
+        upload_id = self.start().data["id"]
+        self.send(upload_id, 0, 99)
+
+        response = self.client.put(
+            reverse("place_detail", args=[place.id]),
+            {
+                **self.place_fields(place),
+                "images_uploads": [upload_id],
+                "images_captions": [""],
+                "images_thumbnails": ["false"],
+            },
+            format="multipart",
+        )
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "images_uploads" in response.data
+        assert ImageUpload.objects.filter(id=upload_id).exists()
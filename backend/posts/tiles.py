@@ -0,0 +1,87 @@
+"""
+Mapbox Vector Tiles of places.
+
+Each tile is built from an index-backed bbox query over Place coordinates,
+encoded with the pure Python encoder in ``posts.mvt`` and cached per tile key
+under the current places version.
+"""
+
+from django.core.cache import cache
+from django.db.models import F
+
+from .caching import CACHE_TIMEOUT, versioned_key
+from .geo import bbox_filter, mercator, tile_bbox
+from .geojson import thumbnail_url_builder
+from .models import Place
+from .mvt import EXTENT, encode_layer, encode_tile
+from .routers import use_replicas
+
+LAYER_NAME = "places"
+MAX_TILE_ZOOM = 22
+
+# Margin, in tile coordinates, for points drawn across a tile edge
+TILE_BUFFER = 64
+
+# Only the top-rated places are encoded in very dense tiles
+MAX_FEATURES_PER_TILE = 4096
+
+
+def is_valid_tile(z, x, y):
+    return 0 <= z <= MAX_TILE_ZOOM and 0 <= x < 2**z and 0 <= y < 2**z
+
+
+def build_place_tile(z, x, y, request):
+    """
+    Encode the places inside tile ``z/x/y`` as a vector tile.
+
+    Each feature carries the place id and its name, category, rating and
+    absolute thumbnail URL as properties.
+    """
+    n = 2**z
+    thumbnail_url = thumbnail_url_builder(request)
+    places = (
+        Place.objects.with_thumbnail()
+        .filter(bbox_filter(tile_bbox(z, x, y, buffer=TILE_BUFFER / EXTENT)))
+        .order_by(F("rating").desc(nulls_last=True), "id")
+        .values_list(
+            "id",
+            "longitude",
+            "latitude",
+            "name",
+            "category",
+            "rating",
+            "thumbnail_name",
+        )[:MAX_FEATURES_PER_TILE]
+    )
+
+    features = []
+    for place_id, longitude, latitude, name, category, rating, thumbnail in places:
+        mercator_x, mercator_y = mercator(longitude, latitude)
+        properties = {
+            "name": name,
+            "category": category,
+            "rating": float(rating) if rating is not None else None,
+            "thumbnail_url": thumbnail_url(thumbnail) if thumbnail else None,
+        }
+        features.append(
+            (
+                place_id,
+                round((mercator_x * n - x) * EXTENT),
+                round((mercator_y * n - y) * EXTENT),
+                properties,
+            )
+        )
+    return encode_tile([encode_layer(LAYER_NAME, features)])
+
+
+def get_place_tile(z, x, y, request):
+    """Return the encoded tile ``z/x/y``, building and caching it on a miss."""
+    # Thumbnail URLs are absolute, so tiles are cached per host
+    key = versioned_key("tiles", request.get_host(), z, x, y)
+    tile = cache.get(key)
+    if tile is None:
+        # Cached for everyone, so built from the primary; see posts.routers
+        with use_replicas(False):
+            tile = build_place_tile(z, x, y, request)
+        cache.set(key, tile, timeout=CACHE_TIMEOUT)
+    return tile
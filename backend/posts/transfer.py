@@ -0,0 +1,166 @@
+"""
+Streaming readers and writers for bulk place import and export.
+
+Three formats are supported:
+
+- geojson: a FeatureCollection in PlaceGeoJSONSerializer's format
+- ndjson: one such Feature per line
+- csv: one place per row, with a header naming the columns
+
+Records are read and written one at a time, so memory use does not depend on
+the size of the file. Exported GeoJSON and NDJSON features carry no
+description, like the serializer's, and import with an empty one.
+"""
+
+import csv
+import json
+import os
+import re
+
+from .geojson import encode_feature
+from .streaming import stream_feature_collection
+
+FORMATS = ("geojson", "ndjson", "csv")
+
+EXTENSIONS = {
+    ".geojson": "geojson",
+    ".json": "geojson",
+    ".ndjson": "ndjson",
+    ".jsonl": "ndjson",
+    ".csv": "csv",
+}
+
+CSV_FIELDS = [
+    "id",
+    "name",
+    "subtitle",
+    "description",
+    "longitude",
+    "latitude",
+    "category",
+    "rating",
+]
+
+# Characters read from a GeoJSON file at a time
+READ_SIZE = 64 * 1024
+
+FEATURES_START = re.compile(r'"features"\s*:\s*\[')
+SEPARATOR = re.compile(r"[\s,]*")
+
+
+def detect_format(path):
+    """Return the format implied by the extension of ``path``."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in EXTENSIONS:
+        raise ValueError(
+            f"Cannot tell the format of {path!r}; use one of {', '.join(FORMATS)}."
+        )
+    return EXTENSIONS[extension]
+
+
+def iter_geojson_features(file):
+    """
+    Yield the features of a GeoJSON FeatureCollection one at a time.
+
+    Only the features array is parsed, each feature with its own
+    ``raw_decode`` call over a buffer refilled in READ_SIZE pieces.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    while True:
+        chunk = file.read(READ_SIZE)
+        buffer += chunk
+        match = FEATURES_START.search(buffer)
+        if match:
+            position = match.end()
+            break
+        if not chunk:
+            raise ValueError("No features array found.")
+
+    while True:
+        position = SEPARATOR.match(buffer, position).end()
+        if buffer.startswith("]", position):
+            return
+        try:
+            feature, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            # The feature continues past the buffer, or the file is invalid
+            chunk = file.read(READ_SIZE)
+            if not chunk:
+                raise ValueError("Unexpected end of GeoJSON features.")
+            buffer = buffer[position:] + chunk
+            position = 0
+            continue
+        yield feature
+        position = end
+
+
+def iter_lines(file):
+    for line in file:
+        if line.strip():
+            yield line
+
+
+def feature_to_fields(feature):
+    """Return Place field values from a GeoJSON Point feature."""
+    longitude, latitude = feature["geometry"]["coordinates"][:2]
+    properties = feature["properties"]
+    return {
+        "name": properties["name"],
+        "subtitle": properties.get("subtitle") or "",
+        "description": properties.get("description") or "",
+        "longitude": longitude,
+        "latitude": latitude,
+        "category": properties.get("category") or "other",
+        "rating": properties.get("rating"),
+    }
+
+
+def line_to_fields(line):
+    """Return Place field values from an NDJSON line holding a feature."""
+    return feature_to_fields(json.loads(line))
+
+
+def row_to_fields(row):
+    """Return Place field values from a CSV row."""
+    return {
+        "name": row["name"],
+        "subtitle": row.get("subtitle") or "",
+        "description": row.get("description") or "",
+        "longitude": row["longitude"],
+        "latitude": row["latitude"],
+        "category": row.get("category") or "other",
+        "rating": row.get("rating") or None,
+    }
+
+
+def read_records(file, file_format):
+    """
+    Return an iterator over the records of ``file``, and the function that
+    converts a record to Place field values.
+
+    Conversion is left to the caller so that a malformed record can be
+    reported and skipped rather than ending the import.
+    """
+    if file_format == "csv":
+        return csv.DictReader(file), row_to_fields
+    if file_format == "geojson":
+        return iter_geojson_features(file), feature_to_fields
+    return iter_lines(file), line_to_fields
+
+
+def write_features(features, output, file_format):
+    """Write GeoJSON feature dicts to the binary ``output`` stream."""
+    if file_format == "geojson":
+        for chunk in stream_feature_collection(features):
+            output.write(chunk)
+    else:
+        for feature in features:
+            output.write(encode_feature(feature) + b"\n")
+
+
+def write_csv(rows, output):
+    """Write ``CSV_FIELDS`` value tuples to the text ``output`` stream."""
+    writer = csv.writer(output)
+    writer.writerow(CSV_FIELDS)
+    writer.writerows(rows)
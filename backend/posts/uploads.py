@@ -0,0 +1,114 @@
+"""
+Resumable chunked image uploads.
+
+Clients create an ImageUpload with the file's name and size, then PUT the
+bytes in one or more chunks, each described by a ``Content-Range`` header.
+Chunks are streamed from the request body straight into a temporary file,
+so neither a chunk nor the image is ever held in memory. After a failure the
+client asks for the upload's ``offset`` and resends from there.
+
+The chunks of one upload are serialized by a lock on its temporary file, so
+a retry sent while the original request is still writing waits for it and
+then finds the offset moved on. The lock is an flock, so CHUNKED_UPLOAD_DIR
+must be local to the host or on a filesystem that honours it.
+"""
+
+import fcntl
+import os
+import re
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.utils import timezone
+
+from .models import ImageUpload
+
+# Bytes copied from the request body per read
+BUFFER_SIZE = 64 * 1024
+
+# Uploads not written to for this long are discarded
+UPLOAD_EXPIRY = timedelta(days=1)
+
+CONTENT_RANGE = re.compile(r"bytes (\d+)-(\d+)/(\d+)")
+
+
+def upload_path(upload):
+    return os.path.join(settings.CHUNKED_UPLOAD_DIR, f"{upload.id}.part")
+
+
+def parse_content_range(header):
+    """
+    Parse a ``bytes start-end/total`` Content-Range header.
+
+    Returns:
+        tuple: ``(start, end, total)``, with ``end`` inclusive.
+
+    Raises:
+        ValueError: If the header is missing or malformed.
+    """
+    match = CONTENT_RANGE.fullmatch(header.strip())
+    if not match:
+        raise ValueError("Content-Range must have the form 'bytes start-end/total'.")
+    start, end, total = (int(value) for value in match.groups())
+    if end < start:
+        raise ValueError("Content-Range must not end before it starts.")
+    return start, end, total
+
+
+@contextmanager
+def locked_upload(upload):
+    """Hold an exclusive lock on the upload's temporary file for the block."""
+    path = upload_path(upload)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Append mode creates the file without truncating an existing one
+    with open(path, "ab") as file:
+        fcntl.flock(file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(file, fcntl.LOCK_UN)
+
+
+def write_chunk(upload, stream, start, length):
+    """
+    Copy up to ``length`` bytes from ``stream`` into the upload at ``start``.
+
+    Returns:
+        int: The bytes written, fewer than ``length`` if the stream ended early.
+    """
+    path = upload_path(upload)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    written = 0
+    with open(path, "r+b" if os.path.exists(path) else "wb") as file:
+        file.seek(start)
+        while stream is not None and written < length:
+            data = stream.read(min(BUFFER_SIZE, length - written))
+            if not data:
+                break
+            file.write(data)
+            written += len(data)
+        # Drop anything left beyond this chunk by an earlier, failed attempt
+        file.truncate()
+    return written
+
+
+def open_upload(upload):
+    """Open a complete upload as a File named after the original."""
+    return File(open(upload_path(upload), "rb"), name=upload.filename)
+
+
+def discard_upload(upload):
+    """Delete an upload and its temporary file."""
+    try:
+        os.remove(upload_path(upload))
+    except FileNotFoundError:
+        pass
+    upload.delete()
+
+
+def delete_expired_uploads():
+    cutoff = timezone.now() - UPLOAD_EXPIRY
+    for upload in ImageUpload.objects.filter(updated_at__lt=cutoff):
+        discard_upload(upload)
@@ -1,9 +1,41 @@
 from django.urls import path
 
-from .views import PlaceDetailView, PlaceGeoJSONView, PlaceList
+from .async_views import (
+    AsyncNearbyPlacesView,
+    AsyncPlaceDetailView,
+    AsyncPlaceGeoJSONView,
+    AsyncTopPlacesView,
+)
+from .views import (
+    ImageUploadDetailView,
+    ImageUploadList,
+    NearbyPlacesView,
+    PlaceChangesView,
+    PlaceDetailView,
+    PlaceGeoJSONView,
+    PlaceList,
+    PlaceSearchView,
+    PlaceTileView,
+    TopPlacesView,
+)
 
 urlpatterns = [
     path("<int:pk>/", PlaceDetailView.as_view(), name="place_detail"),
     path("", PlaceList.as_view(), name="place_list"),
     path("geojson/", PlaceGeoJSONView.as_view(), name="geojson"),
+    path("geojson/changes/", PlaceChangesView.as_view(), name="geojson_changes"),
+    path(
+        "tiles/<int:z>/<int:x>/<int:y>.pbf",
+        PlaceTileView.as_view(),
+        name="place_tile",
+    ),
+    path("top/", TopPlacesView.as_view(), name="top"),
+    path("search/", PlaceSearchView.as_view(), name="search"),
+    path("nearby/", NearbyPlacesView.as_view(), name="nearby"),
+    path("uploads/", ImageUploadList.as_view(), name="upload_list"),
+    path("uploads/<uuid:pk>/", ImageUploadDetailView.as_view(), name="upload_detail"),
+    path("async/<int:pk>/", AsyncPlaceDetailView.as_view(), name="async_place_detail"),
+    path("async/geojson/", AsyncPlaceGeoJSONView.as_view(), name="async_geojson"),
+    path("async/top/", AsyncTopPlacesView.as_view(), name="async_top"),
+    path("async/nearby/", AsyncNearbyPlacesView.as_view(), name="async_nearby"),
 ]
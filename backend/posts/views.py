@@ -1,14 +1,99 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from django.http import HttpResponse, StreamingHttpResponse
 from rest_framework import generics, status
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
-
-from .models import Place, PlaceImage
+from rest_framework.settings import api_settings
+from rest_framework.views import APIView
+
+from .caching import CACHE_TIMEOUT, versioned_key
+from .clustering import MAX_CLUSTER_ZOOM, get_clusters
+from .geo import bbox_filter, max_features_for_zoom, parse_bbox, parse_zoom
+from .geojson import encode_feature_collection, iter_features
+from .jobs import enqueue_many
+from .leaderboard import CATEGORIES, LEADERBOARD_SIZE, top_place_ids
+from .metrics import PrometheusRenderer, registry
+from .mixins import ConditionalGetMixin, ImageUploadsMixin
+from .models import ImageFile, ImageUpload, Place, PlaceChange, PlaceImage
+from .mvt import CONTENT_TYPE as MVT_CONTENT_TYPE
+from .nearby import nearest_features
+from .pagination import PlaceCursorPagination, RankedPagination
 from .permissions import IsAuthorOrReadOnly
-from .serializers import PlaceDetailSerializer, PlaceGeoJSONSerializer
+from .search import search_place_ids
+from .serializers import (
+    ImageUploadSerializer,
+    PlaceDetailSerializer,
+    PlaceGeoJSONSerializer,
+)
+from .streaming import STREAM_CHUNK_SIZE, stream_feature_collection
+from .tiles import get_place_tile, is_valid_tile
+from .uploads import (
+    delete_expired_uploads,
+    discard_upload,
+    locked_upload,
+    parse_content_range,
+    write_chunk,
+)
+
+
+class PlaceList(ImageUploadsMixin, ConditionalGetMixin, generics.ListCreateAPIView):
+    """
+    API endpoint for listing and creating places.
 
+    Lists are cursor paginated, newest first. ``fields=`` renders a sparse
+    subset of the serializer fields; only the columns, join and prefetch those
+    fields need are loaded, so a page costs a constant number of queries.
+    Images may be sent as files or as ids of finished resumable uploads.
+    """
 
-class PlaceList(generics.ListCreateAPIView):
     queryset = Place.objects.all()
     serializer_class = PlaceDetailSerializer
+    pagination_class = PlaceCursorPagination
+    etag_per_user = True
+
+    def get_fields(self):
+        """Return the requested sparse fieldset, or None for every field."""
+        fields = self.request.query_params.get("fields", None)
+        if self.request.method != "GET" or not fields:
+            return None
+
+        fields = [field.strip() for field in fields.split(",") if field.strip()]
+        unknown = set(fields) - set(PlaceDetailSerializer.Meta.fields)
+        if unknown:
+            raise ValidationError(
+                {"fields": f"Unknown fields: {', '.join(sorted(unknown))}."}
+            )
+        return fields
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        fields = self.get_fields()
+
+        if fields is None or "author" in fields:
+            queryset = queryset.select_related("author")
+        if fields is None or "images" in fields:
+            queryset = queryset.prefetch_related("images")
+        if fields is not None:
+            # created_at is read by the paginator, author_id by is_owner
+            columns = {"id", "created_at", "author"}
+            columns.update(
+                field
+                for field in fields
+                if field not in ("images", "is_owner", "author")
+            )
+            if "author" in fields:
+                columns.add("author__username")
+            queryset = queryset.only(*columns)
+        return queryset
+
+    def get_serializer(self, *args, **kwargs):
+        kwargs.setdefault("fields", self.get_fields())
+        return super().get_serializer(*args, **kwargs)
 
     def create(self, request, *args, **kwargs):
         serializer_data = {
@@ -21,7 +106,7 @@ class PlaceList(generics.ListCreateAPIView):
             "rating": request.data.get("rating"),
         }
 
-        image_files = request.FILES.getlist("images_files")
+        image_files = self.get_image_files()
         image_captions = request.data.getlist("images_captions")
         image_thumbnails = request.data.getlist("images_thumbnails")
 
@@ -58,22 +143,26 @@ class PlaceList(generics.ListCreateAPIView):
         serializer.save(author=self.request.user)
 
 
-class PlaceDetailView(generics.RetrieveUpdateDestroyAPIView):
+class PlaceDetailView(
+    ImageUploadsMixin, ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView
+):
     """
     API endpoint for retrieving, updating, and deleting Place instances.
 
     Handles complex image management including:
     - Updating existing image metadata
-    - Adding new images with file uploads
+    - Adding new images from file uploads or finished resumable uploads
     - Deleting specified images
     - Maintaining thumbnail relationships
 
     Optimized with select_related and prefetch_related to minimize database queries.
+    Conditional GETs are answered with 304 from the places version.
     """
 
     queryset = Place.objects.select_related("author").prefetch_related("images")
     serializer_class = PlaceDetailSerializer
     permission_classes = [IsAuthorOrReadOnly]
+    etag_per_user = True
 
     def update(self, request, *args, **kwargs):
         """
@@ -85,6 +174,13 @@ class PlaceDetailView(generics.RetrieveUpdateDestroyAPIView):
         3. Deletes specified images
 
         Uses parallel arrays from FormData to associate files with metadata.
+        Everything is validated before anything is written. Existing images
+        come from the prefetch done by get_object and are written back with
+        one bulk_update, new images are inserted with one bulk_create and
+        deleted ones removed with one DELETE, so the query count does not grow
+        with the number of images edited, added or deleted. Saving the place
+        bumps the places version and logs one change for all of them. When
+        several images are marked as thumbnail, the last one wins.
         """
         instance = self.get_object()
 
@@ -98,77 +194,525 @@ class PlaceDetailView(generics.RetrieveUpdateDestroyAPIView):
             "category": request.data.get("category"),
             "rating": request.data.get("rating"),
         }
+        serializer = self.get_serializer(instance, data=serializer_data, partial=True)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
         # Existing Images
         existing_image_ids = request.data.getlist("existing_images_ids")
         existing_image_captions = request.data.getlist("existing_images_captions")
         existing_image_thumbnails = request.data.getlist("existing_images_thumbnails")
 
-        if existing_image_ids:
-            for i, image_id in enumerate(existing_image_ids):
-                try:
-                    image = PlaceImage.objects.get(id=image_id, place=instance)
-                    image.caption = existing_image_captions[i]
-                    image.is_thumbnail = existing_image_thumbnails[i] == "true"
-                    image.save()
-                except PlaceImage.DoesNotExist:
-                    pass
-
-        # Images to delete
-        images_to_delete = request.data.getlist("images_to_delete")
-        if images_to_delete:
-            PlaceImage.objects.filter(id__in=images_to_delete, place=instance).delete()
-
         # New Images
-        image_files = request.FILES.getlist("images_files")
+        image_files = self.get_image_files()
         image_captions = request.data.getlist("images_captions")
         image_thumbnails = request.data.getlist("images_thumbnails")
 
-        if image_files:
-            if not (len(image_files) == len(image_captions) == len(image_thumbnails)):
-                return Response(
-                    {
-                        "error": (
-                            "Mismatched number of image files, captions or"
-                            " thumbnail designations"
-                        )
-                    },
-                    status=status.HTTP_400_BAD_REQUEST,
+        if not (
+            len(existing_image_ids)
+            == len(existing_image_captions)
+            == len(existing_image_thumbnails)
+        ) or not (len(image_files) == len(image_captions) == len(image_thumbnails)):
+            return Response(
+                {
+                    "error": (
+                        "Mismatched number of image files, captions or"
+                        " thumbnail designations"
+                    )
+                },
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        # Images to delete
+        images_to_delete = set(request.data.getlist("images_to_delete"))
+
+        # Unknown ids, and ids of images being deleted, are ignored
+        images = {
+            str(image.id): image
+            for image in instance.images.all()
+            if str(image.id) not in images_to_delete
+        }
+        deleted_images = [
+            image
+            for image in instance.images.all()
+            if str(image.id) in images_to_delete
+        ]
+        updated_images = []
+        for image_id, caption, thumbnail in zip(
+            existing_image_ids, existing_image_captions, existing_image_thumbnails
+        ):
+            if image_id in images:
+                image = images[image_id]
+                image.caption = caption
+                image.is_thumbnail = thumbnail == "true"
+                updated_images.append(image)
+
+        new_images = [
+            PlaceImage(
+                place=instance,
+                image=image_file,
+                caption=caption,
+                is_thumbnail=thumbnail == "true",
+            )
+            for image_file, caption, thumbnail in zip(
+                image_files, image_captions, image_thumbnails
+            )
+        ]
+
+        thumbnails = [
+            image for image in updated_images + new_images if image.is_thumbnail
+        ]
+        for image in thumbnails[:-1]:
+            image.is_thumbnail = False
+
+        with transaction.atomic():
+            if thumbnails:
+                instance.images.update(is_thumbnail=False)
+            if updated_images:
+                PlaceImage.objects.bulk_update(
+                    updated_images, ["caption", "is_thumbnail"]
                 )
 
-            for i, image_file in enumerate(image_files):
-                PlaceImage.objects.create(
-                    place=instance,
-                    image=image_file,
-                    caption=image_captions[i],
-                    is_thumbnail=image_thumbnails[i] == "true",
+            if deleted_images:
+                # A raw delete sends no per-image signals, so the file
+                # deletions are queued here in one insert; nothing references
+                # PlaceImage, so there is nothing to cascade
+                PlaceImage.objects.filter(
+                    pk__in=[image.pk for image in deleted_images]
+                )._raw_delete(PlaceImage.objects.db)
+                names = {image.image.name for image in deleted_images if image.image}
+                enqueue_many(
+                    "delete_image_files", [{"name": name} for name in sorted(names)]
+                )
+
+            if new_images:
+                for image in new_images:
+                    image.set_checksum()
+                # Kept from queued file deletions until the images commit
+                ImageFile.objects.lock(image.file_name() for image in new_images)
+                # bulk_create skips save() and post_save, so queue the
+                # derivative jobs here; saving the place below bumps the
+                # places version and logs the change
+                PlaceImage.objects.bulk_create(new_images)
+                enqueue_many(
+                    "process_place_image",
+                    [{"image_id": image.pk} for image in new_images],
                 )
 
-        # Validate and update Place instance
-        serializer = self.get_serializer(instance, data=serializer_data, partial=True)
-        if serializer.is_valid():
             self.perform_update(serializer)
-            instance.refresh_from_db()
-            updated_serializer = self.get_serializer(instance)
-            return Response(updated_serializer.data, status=status.HTTP_200_OK)
 
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        instance = self.get_object()
+        updated_serializer = self.get_serializer(instance)
+        return Response(updated_serializer.data, status=status.HTTP_200_OK)
 
 
-class PlaceGeoJSONView(generics.ListAPIView):
-    queryset = Place.objects.all()
+class PlaceGeoJSONView(ConditionalGetMixin, generics.ListAPIView):
+    """
+    API endpoint returning all places as a GeoJSON FeatureCollection.
+
+    Thumbnails are annotated onto the queryset so the collection is built
+    in a constant number of queries, however many places exist.
+
+    Query parameters:
+    - category: only return places in this category
+    - bbox: minLon,minLat,maxLon,maxLat viewport; minLon > maxLon wraps the
+      antimeridian
+    - zoom: map zoom level; low zooms only receive the top-rated places
+    - cluster: "true" to return precomputed clusters for ``zoom`` instead of
+      individual places, up to MAX_CLUSTER_ZOOM
+    - stream: "true" to stream features straight from a database iterator,
+      keeping memory flat for very large collections
+
+    Features are built and encoded by the fast path in ``posts.geojson``,
+    which matches PlaceGeoJSONSerializer byte for byte. Rendered JSON is
+    cached per host and query parameters under the places version, which
+    signals bump whenever a place or image changes. The same version
+    provides the ETag for conditional GETs.
+    """
+
+    queryset = Place.objects.with_thumbnail()
     serializer_class = PlaceGeoJSONSerializer
+    cache_params = ("category", "bbox", "zoom", "cluster")
+
+    def get_bbox(self):
+        bbox = self.request.query_params.get("bbox", None)
+        if not bbox:
+            return None
+        try:
+            return parse_bbox(bbox)
+        except ValueError as e:
+            raise ValidationError({"bbox": str(e)})
+
+    def get_zoom(self):
+        zoom = self.request.query_params.get("zoom", None)
+        if not zoom:
+            return None
+        try:
+            return parse_zoom(zoom)
+        except ValueError as e:
+            raise ValidationError({"zoom": str(e)})
 
     def get_queryset(self):
         queryset = super().get_queryset()
         category = self.request.query_params.get("category", None)
+        bbox = self.get_bbox()
+        zoom = self.get_zoom()
 
         if category:
             queryset = queryset.filter(category=category)
 
-        return queryset.order_by("-rating")
+        if bbox:
+            queryset = queryset.filter(bbox_filter(bbox))
+
+        queryset = queryset.order_by("-rating")
+
+        if zoom is not None:
+            queryset = queryset[: max_features_for_zoom(zoom)]
+
+        return queryset
+
+    def get_features(self):
+        params = self.request.query_params
+        if params.get("cluster") == "true":
+            zoom = self.get_zoom()
+            if zoom is None:
+                raise ValidationError({"zoom": "zoom is required when clustering."})
+            if zoom <= MAX_CLUSTER_ZOOM:
+                return get_clusters(
+                    zoom,
+                    category=params.get("category") or None,
+                    bbox=self.get_bbox(),
+                )
+
+        return list(iter_features(self.get_queryset(), self.request))
+
+    def stream(self):
+        """Stream the collection without materializing it or caching it."""
+        features = iter_features(
+            self.get_queryset(), self.request, chunk_size=STREAM_CHUNK_SIZE
+        )
+        return StreamingHttpResponse(
+            stream_feature_collection(features), content_type="application/json"
+        )
 
     def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-        serializer = self.get_serializer(queryset, many=True)
-        return Response({"type": "FeatureCollection", "features": serializer.data})
+        params = request.query_params
+        if params.get("stream") == "true" and params.get("cluster") != "true":
+            return self.stream()
+
+        renderer = request.accepted_renderer
+        if renderer.format != "json" or "indent" in request.accepted_media_type:
+            # Browsable API, indented JSON and other formats use the renderer
+            return Response(
+                {"type": "FeatureCollection", "features": self.get_features()}
+            )
+
+        key = versioned_key(
+            "geojson",
+            request.get_host(),
+            [request.query_params.get(param) for param in self.cache_params],
+        )
+        content = cache.get(key)
+        if content is None:
+            content = encode_feature_collection(self.get_features())
+            cache.set(key, content, timeout=CACHE_TIMEOUT)
+        return HttpResponse(content, content_type=renderer.media_type)
+
+
+class NearbyPlacesView(ConditionalGetMixin, generics.GenericAPIView):
+    """
+    API endpoint returning the places nearest a point as GeoJSON.
+
+    Query parameters:
+    - lat, lon: the point to search around (required)
+    - radius_km: only return places within this distance, default 10
+    - limit: how many places to return, default 20
+
+    Features match PlaceGeoJSONSerializer's, ordered nearest first, with a
+    ``distance_km`` property added.
+    """
+
+    queryset = Place.objects.with_thumbnail()
+    serializer_class = PlaceGeoJSONSerializer
+
+    DEFAULT_RADIUS_KM = 10
+    MAX_RADIUS_KM = 1000
+    DEFAULT_LIMIT = 20
+    MAX_LIMIT = 200
+
+    def get_param(self, name, parse, default, minimum, maximum):
+        value = self.request.query_params.get(name, None)
+        if value in (None, ""):
+            if default is None:
+                raise ValidationError({name: f"{name} is required."})
+            return default
+        try:
+            value = parse(value)
+        except ValueError:
+            raise ValidationError({name: f"{name} must be a number."})
+        if not (minimum <= value <= maximum):
+            raise ValidationError(
+                {name: f"{name} must be between {minimum} and {maximum}."}
+            )
+        return value
+
+    def get_params(self):
+        """Return the validated longitude, latitude, radius_km and limit."""
+        latitude = self.get_param("lat", float, None, -90, 90)
+        longitude = self.get_param("lon", float, None, -180, 180)
+        radius_km = self.get_param(
+            "radius_km", float, self.DEFAULT_RADIUS_KM, 0, self.MAX_RADIUS_KM
+        )
+        limit = self.get_param("limit", int, self.DEFAULT_LIMIT, 1, self.MAX_LIMIT)
+        return longitude, latitude, radius_km, limit
+
+    def get(self, request, *args, **kwargs):
+        features = nearest_features(self.get_queryset(), request, *self.get_params())
+        return Response({"type": "FeatureCollection", "features": features})
+
+
+class TopPlacesView(ConditionalGetMixin, generics.GenericAPIView):
+    """
+    API endpoint returning the best rated places as GeoJSON.
+
+    Query parameters:
+    - category: only rank places in this category; all categories if omitted
+    - limit: how many places to return, default 20
+
+    Ranking is read from the leaderboards in ``posts.leaderboard``, so only
+    the returned places are loaded. Unrated places are not ranked.
+    """
+
+    queryset = Place.objects.with_thumbnail()
+    serializer_class = PlaceGeoJSONSerializer
+
+    DEFAULT_LIMIT = 20
+
+    def get_params(self):
+        """Return the validated category and limit."""
+        params = self.request.query_params
+        category = params.get("category") or None
+        if category is not None and category not in CATEGORIES:
+            raise ValidationError(
+                {"category": f"category must be one of {', '.join(CATEGORIES)}."}
+            )
+        limit = params.get("limit") or self.DEFAULT_LIMIT
+        try:
+            limit = int(limit)
+        except ValueError:
+            raise ValidationError({"limit": "limit must be a number."})
+        if not (1 <= limit <= LEADERBOARD_SIZE):
+            raise ValidationError(
+                {"limit": f"limit must be between 1 and {LEADERBOARD_SIZE}."}
+            )
+        return category, limit
+
+    def get(self, request, *args, **kwargs):
+        ids = top_place_ids(*self.get_params())
+        features = {
+            feature["id"]: feature
+            for feature in iter_features(
+                self.get_queryset().filter(id__in=ids), request
+            )
+        }
+        return Response(
+            {
+                "type": "FeatureCollection",
+                "features": [features[pk] for pk in ids if pk in features],
+            }
+        )
+
+
+class PlaceSearchView(ConditionalGetMixin, generics.GenericAPIView):
+    """
+    API endpoint for full-text place search, suitable for typeahead.
+
+    ``q`` is matched against names, subtitles and descriptions, every word as
+    a prefix. Results are GeoJSON features, best match first, paginated with
+    ``page`` and ``page_size``.
+    """
+
+    queryset = Place.objects.with_thumbnail()
+    serializer_class = PlaceGeoJSONSerializer
+    pagination_class = RankedPagination
+
+    def get(self, request, *args, **kwargs):
+        query = request.query_params.get("q", "")
+        if not query.strip():
+            raise ValidationError({"q": "q is required."})
+
+        ids = self.paginator.paginate_ranked(
+            lambda limit, offset: search_place_ids(query, limit, offset), request
+        )
+        features = {
+            feature["id"]: feature
+            for feature in iter_features(
+                self.get_queryset().filter(id__in=ids), request
+            )
+        }
+        results = [features[place_id] for place_id in ids if place_id in features]
+        return self.get_paginated_response(results)
+
+
+class PlaceChangesView(generics.GenericAPIView):
+    """
+    API endpoint for delta syncing the GeoJSON collection.
+
+    Returns the places upserted and the ids of places deleted since the
+    ``since`` cursor, plus the cursor to send next time. Without ``since``
+    the whole collection is returned as upserts, giving clients their first
+    cursor.
+
+    Change ids are assigned when a write logs its change, not when it
+    commits, so a write still open when a client syncs can commit an id
+    below the cursor that client is given. Every delta therefore also
+    re-sends the changes logged within OVERLAP before the cursor's own
+    change. A late commit is picked up as long as its transaction took less
+    than OVERLAP, including clock skew between servers. Upserts and
+    deletions are idempotent, so re-sending them is harmless.
+    """
+
+    queryset = Place.objects.with_thumbnail()
+    serializer_class = PlaceGeoJSONSerializer
+
+    OVERLAP = timedelta(minutes=2)
+
+    def get_changes(self, since, cursor):
+        """Return the changes after ``since``, with the overlap, up to ``cursor``."""
+        changes = PlaceChange.objects.filter(id__lte=cursor)
+        since_change = (
+            PlaceChange.objects.filter(id__lte=since)
+            .order_by("-id")
+            .values_list("created_at", flat=True)
+            .first()
+        )
+        if since_change is None:
+            return changes.filter(id__gt=since)
+        return changes.filter(
+            Q(id__gt=since) | Q(created_at__gte=since_change - self.OVERLAP)
+        )
+
+    def get(self, request, *args, **kwargs):
+        since = request.query_params.get("since", None)
+        cursor = PlaceChange.objects.order_by("-id").values_list("id", flat=True)
+        cursor = cursor.first() or 0
+
+        if since is None:
+            upserted = self.get_queryset()
+            deleted = []
+        else:
+            try:
+                since = int(since)
+            except ValueError:
+                raise ValidationError({"since": "since must be an integer cursor."})
+            changes = self.get_changes(since, cursor)
+            upserted = self.get_queryset().filter(id__in=changes.values("place_id"))
+            deleted = list(
+                changes.exclude(place_id__in=Place.objects.values("id"))
+                .values_list("place_id", flat=True)
+                .distinct()
+            )
+
+        features = list(iter_features(upserted, request))
+        return Response(
+            {
+                "cursor": cursor,
+                "upserted": {"type": "FeatureCollection", "features": features},
+                "deleted": deleted,
+            }
+        )
+
+
+class PlaceTileView(APIView):
+    """
+    API endpoint serving places as Mapbox Vector Tiles.
+
+    Lets Mapbox GL fetch only the tiles in view instead of the whole
+    FeatureCollection. Tiles contain a single "places" point layer.
+    """
+
+    def get(self, request, z, x, y):
+        if not is_valid_tile(z, x, y):
+            raise NotFound("Tile out of range.")
+        tile = get_place_tile(z, x, y, request)
+        return HttpResponse(tile, content_type=MVT_CONTENT_TYPE)
+
+
+class ImageUploadList(generics.CreateAPIView):
+    """
+    API endpoint starting a resumable image upload.
+
+    Takes the file's ``filename`` and ``size`` and returns the upload's id,
+    to which the bytes are then sent in chunks.
+    """
+
+    serializer_class = ImageUploadSerializer
+    permission_classes = [IsAuthenticated]
+
+    def perform_create(self, serializer):
+        delete_expired_uploads()
+        serializer.save(user=self.request.user)
+
+
+class ImageUploadDetailView(generics.RetrieveDestroyAPIView):
+    """
+    API endpoint receiving the chunks of a resumable upload.
+
+    PUT writes the raw request body at the position given by a
+    ``Content-Range: bytes start-end/total`` header. A chunk must start at
+    the upload's current ``offset``; otherwise 409 Conflict is returned with
+    the offset to resume from. GET reports progress and DELETE abandons the
+    upload. Finished uploads are passed by id in ``images_uploads`` when
+    creating or editing a place.
+    """
+
+    serializer_class = ImageUploadSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return ImageUpload.objects.filter(user=self.request.user)
+
+    def put(self, request, *args, **kwargs):
+        upload = self.get_object()
+        try:
+            start, end, total = parse_content_range(
+                request.headers.get("Content-Range", "")
+            )
+        except ValueError as e:
+            raise ValidationError({"Content-Range": str(e)})
+        if total != upload.size or end >= upload.size:
+            raise ValidationError(
+                {"Content-Range": "Content-Range does not match the upload size."}
+            )
+        # The offset check, the write and the new offset are one step, so an
+        # overlapping retry of the same chunk waits and then gets a 409
+        with locked_upload(upload):
+            upload.refresh_from_db(fields=["offset"])
+            if start != upload.offset:
+                serializer = self.get_serializer(upload)
+                return Response(serializer.data, status=status.HTTP_409_CONFLICT)
+
+            written = write_chunk(upload, request.stream, start, end - start + 1)
+            upload.offset = start + written
+            upload.save(update_fields=["offset", "updated_at"])
+        return Response(self.get_serializer(upload).data)
+
+    def perform_destroy(self, instance):
+        discard_upload(instance)
+
+
+class MetricsView(APIView):
+    """
+    Staff-only endpoint reporting the per-view request metrics.
+
+    Each view and method has the count, sum and p50/p95/p99 of its duration,
+    database time, serialization time, query count and response size, as
+    recorded by ``posts.middleware.MetricsMiddleware`` in this process.
+    ``?format=prometheus`` returns them in the Prometheus text format.
+    """
+
+    permission_classes = [IsAdminUser]
+    renderer_classes = [*api_settings.DEFAULT_RENDERER_CLASSES, PrometheusRenderer]
+
+    def get(self, request, *args, **kwargs):
+        return Response(registry.snapshot())
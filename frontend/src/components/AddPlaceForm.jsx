@@ -302,7 +302,7 @@ const AddPlaceForm = ({
                 .map((image) => (
                   <div key={image.id} className="image-entry">
                     <img
-                      src={image.url}
+                      src={image.variants?.thumb?.jpeg || image.url}
                       alt={image.caption || 'Place image'}
                       className="image-preview"
                     />
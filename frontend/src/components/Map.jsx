@@ -12,10 +12,29 @@ import '../styles/Map.css';
 
 mapboxgl.accessToken = import.meta.env.VITE_MAPBOX_ACCESS_TOKEN;
 
+/**
+ * Merges a delta sync response into the current FeatureCollection.
+ * Upserted features replace any existing feature with the same id.
+ */
+const applyPlaceChanges = (placeData, changes) => {
+  const changedIds = new Set([
+    ...changes.deleted,
+    ...changes.upserted.features.map((feature) => feature.id),
+  ]);
+  const features = (placeData?.features || []).filter(
+    (feature) => !changedIds.has(feature.id)
+  );
+  return {
+    type: 'FeatureCollection',
+    features: [...features, ...changes.upserted.features],
+  };
+};
+
 const Map = ({ isAuthenticated }) => {
   const mapRef = useRef(null);
   const mapContainerRef = useRef(null);
   const userHasInteractedRef = useRef(false);
+  const syncCursorRef = useRef(null);
   const [hasBeenInitialized, setHasBeenInitialized] = useState(false);
   const [placeData, setPlaceData] = useState();
   const [activeFeature, setActiveFeature] = useState();
@@ -25,12 +44,16 @@ const Map = ({ isAuthenticated }) => {
   const [selectedPlaceDetails, setSelectedPlaceDetails] = useState(null);
   const [placeToEdit, setPlaceToEdit] = useState(null);
 
+  // Only places changed since the last sync are downloaded after the first
   const fetchPlaces = () => {
+    const params =
+      syncCursorRef.current === null ? {} : { since: syncCursorRef.current };
     api
-      .get('api/v1/geojson/')
+      .get('api/v1/geojson/changes/', { params })
       .then((res) => res.data)
       .then((data) => {
-        setPlaceData(data);
+        syncCursorRef.current = data.cursor;
+        setPlaceData((prevData) => applyPlaceChanges(prevData, data));
       })
       .catch((err) => alert('Error fetching places geoJSON:', err));
   };
@@ -110,7 +110,10 @@ const PlaceDetails = ({
             <div className="image-container">
               <div className="image-wrapper">
                 <img
-                  src={placeData.images[currentImageIndex].url}
+                  src={
+                    placeData.images[currentImageIndex].variants?.full?.jpeg ||
+                    placeData.images[currentImageIndex].url
+                  }
                   alt={
                     placeData.images[currentImageIndex].caption ||
                     placeData.name
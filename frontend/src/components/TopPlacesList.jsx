@@ -35,11 +35,14 @@ const TopPlacesList = ({ type, onClose }) => {
   useEffect(() => {
     const fetchPlaces = () => {
       const config = getModalConfig(type);
-      const url = `api/v1/geojson/?category=${config.category}`;
+      const params = { limit: 20 };
+      if (config.category) {
+        params.category = config.category;
+      }
 
       setLoading(true);
       api
-        .get(url)
+        .get('api/v1/top/', { params })
         .then((res) => res.data)
         .then((data) => {
           setPlaces(data.features || []);
@@ -12,13 +12,19 @@ function Places() {
     getPlaces();
   }, []);
 
-  const getPlaces = () => {
+  // The list is paginated, so follow `next` until every page is loaded
+  const getPage = (url, loaded) =>
     api
-      .get('/api/v1/')
+      .get(url)
       .then((res) => res.data)
       .then((data) => {
-        setPlaces(data);
-      })
+        const all = [...loaded, ...data.results];
+        return data.next ? getPage(data.next, all) : all;
+      });
+
+  const getPlaces = () => {
+    getPage('/api/v1/', [])
+      .then((all) => setPlaces(all))
       .catch((err) => alert(err));
   };
 